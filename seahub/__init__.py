@@ -1,4 +1,8 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
+import import_profiler
+if import_profiler.is_enabled():
+    import_profiler.install()
+
 from signals import repo_created, repo_deleted
 from handlers import repo_created_cb, repo_deleted_cb
 
@@ -21,7 +21,9 @@ from seahub.api2.status import HTTP_520_OPERATION_FAILED
 from seahub.base.accounts import User
 from seahub.profile.models import Profile
 from seahub.profile.utils import refresh_cache as refresh_profile_cache
+from seahub.signals import repo_transferred
 from seahub.utils import is_valid_username
+from seahub.utils.quota import clear_quota_snapshot
 
 
 logger = logging.getLogger(__name__)
@@ -87,6 +89,7 @@ class Account(APIView):
 
         if storage is not None:
             seafile_api.set_user_quota(email, int(storage))
+            clear_quota_snapshot(email)
 
         # if sharing is not None:
         #     seafile_api.set_user_share_quota(email, int(sharing))
@@ -196,6 +199,9 @@ class Account(APIView):
             # transfer owned repos to new user
             for r in seafile_api.get_owned_repo_list(from_user):
                 seafile_api.set_repo_owner(r.id, user2.username)
+                repo_transferred.send(sender=None, org_id=-1, repo_id=r.id,
+                                      from_user=from_user,
+                                      to_user=user2.username)
 
             # transfer joined groups to new user
             for g in seaserv.get_personal_groups_by_user(from_user):
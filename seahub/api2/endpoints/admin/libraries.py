@@ -13,19 +13,24 @@ from seaserv import ccnet_api, seafile_api, seafserv_threaded_rpc
 
 from seahub.views import get_system_default_repo_id
 from seahub.utils import is_org_context
+from seahub.utils.threadpool import run_concurrently
 from seahub.base.accounts import User
+from seahub.base.models import RepoIndex
 from seahub.api2.authentication import TokenAuthentication
 from seahub.api2.throttling import UserRateThrottle
 from seahub.api2.utils import api_error
+from seahub.signals import repo_transferred
 
 logger = logging.getLogger(__name__)
 
-def get_repo_info(repo):
+def get_repo_info(repo, owner=None):
 
     result = {}
     result['id'] = repo.repo_id
     result['name'] = repo.repo_name
-    result['owner'] = seafile_api.get_repo_owner(repo.repo_id)
+    if owner is None:
+        owner = seafile_api.get_repo_owner(repo.repo_id)
+    result['owner'] = owner
     result['size'] = repo.size
     result['size_formatted'] = filesizeformat(repo.size)
     result['encrypted'] = repo.encrypted
@@ -33,12 +38,76 @@ def get_repo_info(repo):
 
     return result
 
+def get_indexed_repo_info(r):
+    return {
+        'id': r.repo_id,
+        'name': r.name,
+        'owner': r.owner,
+        'size': r.size,
+        'size_formatted': filesizeformat(r.size),
+        'encrypted': r.encrypted,
+        'file_count': r.file_count,
+    }
+
+def get_repo_owners(repo_ids):
+    """Return a dict of repo id to owner. Owners are read from repo index in
+    one query, and those missing are looked up concurrently.
+    """
+    owners = RepoIndex.objects.get_owners(repo_ids)
+    missing = [x for x in repo_ids if x not in owners]
+    for repo_id, owner in zip(missing, run_concurrently(
+            seafile_api.get_repo_owner, missing)):
+        owners[repo_id] = owner
+    return owners
+
+def get_page_args(request):
+    try:
+        current_page = int(request.GET.get('page', '1'))
+        per_page = int(request.GET.get('per_page', '100'))
+    except ValueError:
+        current_page = 1
+        per_page = 100
+
+    return current_page, per_page
+
 
 class AdminLibraries(APIView):
     authentication_classes = (TokenAuthentication, SessionAuthentication)
     throttle_classes = (UserRateThrottle,)
     permission_classes = (IsAdminUser,)
 
+    def _search_by_name(self, request, repo_name):
+        """Search repo index by keyword in name (or prefix of name if
+        ``match=prefix``), paginated.
+        """
+        current_page, per_page = get_page_args(request)
+        start = (current_page - 1) * per_page
+        prefix = request.GET.get('match', '') == 'prefix'
+
+        if not RepoIndex.objects.exists():
+            # index is not built yet, see `manage.py reconcile_repo_index`
+            logger.warning('Repo index is empty, search all libraries instead.')
+            repos_all = [r for r in seafile_api.get_repo_list(-1, -1)
+                         if r.name and repo_name in r.name]
+            owners = get_repo_owners([r.repo_id for r in repos_all])
+            return [get_repo_info(r, owners[r.repo_id]) for r in repos_all], {
+                'has_next_page': False,
+                'current_page': 1,
+            }
+
+        indexed = list(RepoIndex.objects.search_by_name(
+            repo_name, prefix=prefix)[start:start + per_page + 1])
+        if len(indexed) > per_page:
+            indexed = indexed[:per_page]
+            has_next_page = True
+        else:
+            has_next_page = False
+
+        return [get_indexed_repo_info(r) for r in indexed], {
+            'has_next_page': has_next_page,
+            'current_page': current_page,
+        }
+
     def get(self, request, format=None):
         """ List 'all' libraries (by name/owner/page)
 
@@ -57,39 +126,29 @@ class AdminLibraries(APIView):
                 if not repo.name:
                     continue
                 if repo_name in repo.name:
-                    repo_info = get_repo_info(repo)
+                    repo_info = get_repo_info(repo, owner)
                     repos.append(repo_info)
 
             return Response({"name": repo_name, "owner": owner, "repos": repos})
 
         elif repo_name:
             # search by name(keyword in name)
-            repos_all = seafile_api.get_repo_list(-1, -1)
-            for repo in repos_all:
-                if not repo.name:
-                    continue
-                if repo_name in repo.name:
-                    repo_info = get_repo_info(repo)
-                    repos.append(repo_info)
+            repos, page_info = self._search_by_name(request, repo_name)
 
-            return Response({"name": repo_name, "owner": '', "repos": repos})
+            return Response({"name": repo_name, "owner": '', "repos": repos,
+                             "page_info": page_info})
 
         elif owner:
             # search by owner
             owned_repos = seafile_api.get_owned_repo_list(owner)
             for repo in owned_repos:
-                repo_info = get_repo_info(repo)
+                repo_info = get_repo_info(repo, owner)
                 repos.append(repo_info)
 
             return Response({"name": '', "owner": owner, "repos": repos})
 
         # get libraries by page
-        try:
-            current_page = int(request.GET.get('page', '1'))
-            per_page = int(request.GET.get('per_page', '100'))
-        except ValueError:
-            current_page = 1
-            per_page = 100
+        current_page, per_page = get_page_args(request)
 
         start = (current_page - 1) * per_page
         limit = per_page + 1
@@ -106,10 +165,11 @@ class AdminLibraries(APIView):
         repos_all = filter(lambda r: not r.is_virtual, repos_all)
         repos_all = filter(lambda r: r.repo_id != default_repo_id, repos_all)
 
+        owners = get_repo_owners([r.repo_id for r in repos_all])
         return_results = []
 
         for repo in repos_all:
-            repo_info = get_repo_info(repo)
+            repo_info = get_repo_info(repo, owners[repo.repo_id])
             return_results.append(repo_info)
 
         page_info = {
@@ -146,6 +206,12 @@ class AdminLibrary(APIView):
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
+        try:
+            RepoIndex.objects.remove_repo(repo_id)
+        except Exception as e:
+            # fixed by ``reconcile_repo_index`` later
+            logger.error(e)
+
         return Response({'success': True})
 
     def put(self, request, repo_id, format=None):
@@ -184,7 +250,10 @@ class AdminLibrary(APIView):
                 error_msg = 'Internal Server Error'
                 return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
+        repo_owner = seafile_api.get_repo_owner(repo_id)
         seafile_api.set_repo_owner(repo_id, new_owner)
+        repo_transferred.send(sender=None, org_id=-1, repo_id=repo_id,
+                              from_user=repo_owner, to_user=new_owner)
         repo = seafile_api.get_repo(repo_id)
         repo_info = get_repo_info(repo)
 
@@ -11,6 +11,7 @@ from seaserv import seafile_api, ccnet_api
 from pysearpc import SearpcError
 
 from seahub.utils import is_pro_version
+from seahub.utils.commit_diff import get_commit_diff_cache_stats
 from seahub.utils.licenseparse import parse_license
 
 from seahub.api2.authentication import TokenAuthentication
@@ -123,6 +124,7 @@ class SysInfo(APIView):
             'license_expiration': license_dict.get('Expiration', ''),
             'license_maxusers': max_users,
             'license_to': license_dict.get('Name', ''),
+            'commit_diff_cache_hit_rate': get_commit_diff_cache_stats()['hit_rate'],
         }
 
         return Response(info)
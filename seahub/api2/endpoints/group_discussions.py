@@ -16,7 +16,7 @@ from seahub.api2.throttling import UserRateThrottle
 from seahub.api2.utils import api_error, get_user_common_info
 from seahub.group.models import GroupMessage
 from seahub.group.signals import grpmsg_added 
-from seahub.utils.paginator import Paginator
+from seahub.utils.paginator import Paginator, KeysetPaginator
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
 from .utils import api_check_group
@@ -48,20 +48,42 @@ class GroupDiscussions(APIView):
         if per_page < 1 or per_page > 100:
             per_page = 20
 
-        paginator = Paginator(GroupMessage.objects.filter(
-            group_id=group_id).order_by('-timestamp'), per_page)
+        try:
+            avatar_size = int(request.GET.get('avatar_size',
+                    AVATAR_DEFAULT_SIZE))
+        except ValueError:
+            avatar_size = AVATAR_DEFAULT_SIZE
+
+        group_msgs_qs = GroupMessage.objects.filter(group_id=group_id)
+
+        # keyset pagination, used when client passes ``before`` or ``after``
+        before = request.GET.get('before', None)
+        after = request.GET.get('after', None)
+        if before is not None or after is not None:
+            paginator = KeysetPaginator(group_msgs_qs, per_page)
+            group_msgs = paginator.page(before=before, after=after)
+            return HttpResponse(json.dumps({
+                "msgs": self._msgs_to_json(request, group_id, group_msgs,
+                                           avatar_size),
+                "next_cursor": group_msgs.next_cursor(),
+                "previous_cursor": group_msgs.previous_cursor(),
+                }), status=200, content_type=json_content_type)
+
+        paginator = Paginator(group_msgs_qs.order_by('-timestamp'), per_page)
 
         try:
             group_msgs = paginator.page(page)
         except (EmptyPage, InvalidPage):
             group_msgs = paginator.page(paginator.num_pages)
 
-        try:
-            avatar_size = int(request.GET.get('avatar_size',
-                    AVATAR_DEFAULT_SIZE))
-        except ValueError:
-            avatar_size = AVATAR_DEFAULT_SIZE
+        return HttpResponse(json.dumps({
+            "msgs": self._msgs_to_json(request, group_id, group_msgs,
+                                       avatar_size),
+            "current_page": page,
+            "page_num": paginator.num_pages,
+            }), status=200, content_type=json_content_type)
 
+    def _msgs_to_json(self, request, group_id, group_msgs, avatar_size):
         msgs = []
         for msg in group_msgs:
             info = get_user_common_info(msg.from_email, avatar_size)
@@ -76,12 +98,7 @@ class GroupDiscussions(APIView):
                 "content": msg.message,
                 "created_at": isoformat_timestr
             })
-
-        return HttpResponse(json.dumps({
-            "msgs": msgs,
-            "current_page": page,
-            "page_num": paginator.num_pages,
-            }), status=200, content_type=json_content_type)
+        return msgs
 
     @api_check_group
     def post(self, request, group_id, format=None):
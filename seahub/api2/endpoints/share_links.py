@@ -22,22 +22,44 @@ from seahub.api2.throttling import UserRateThrottle
 
 from seahub.share.models import FileShare, OrgFileShare
 from seahub.utils import gen_shared_link, is_org_context
+from seahub.utils.paginator import decode_keyset_cursor, keyset_page, \
+    order_nulls_last
 from seahub.views import check_folder_permission
+from seahub.utils.threadpool import run_concurrently
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 
 logger = logging.getLogger(__name__)
 
+# Fields share links can be sorted by, all are indexed together with
+# ``username``.
+SHARE_LINK_SORT_FIELDS = ('ctime', 'view_cnt', 'expire_date')
 
-def get_share_link_info(fileshare):
+def _get_repo(repo_id):
+    try:
+        return seafile_api.get_repo(repo_id)
+    except Exception as e:
+        logger.error(e)
+        return None
+
+def get_repos_by_ids(repo_ids):
+    """Return a dict of repo id to repo (or ``None`` if not found), each
+    distinct repo is looked up once, concurrently.
+    """
+    repo_ids = list(set(repo_ids))
+    return dict(zip(repo_ids, run_concurrently(_get_repo, repo_ids)))
+
+def get_share_link_info(fileshare, repos=None):
+    """Return info of a share link. ``repos`` is a dict of repo id to repo
+    already looked up, e.g. by ``get_repos_by_ids``.
+    """
     data = {}
     token = fileshare.token
 
     repo_id = fileshare.repo_id
-    try:
-        repo = seafile_api.get_repo(repo_id)
-    except Exception as e:
-        logger.error(e)
-        repo = None
+    if repos is not None:
+        repo = repos.get(repo_id)
+    else:
+        repo = _get_repo(repo_id)
 
     path = fileshare.path
     if path:
@@ -94,9 +116,36 @@ class ShareLinks(APIView):
 
         return (None, None)
 
+    def _get_sorted_page(self, request, fileshares, sort_by, per_page,
+                         cursor):
+        """Return share links sorted by ``sort_by`` (``ctime`` by default) in
+        database, in pages of ``per_page`` links if set. ``cursor`` of next
+        page, i.e. sort value and id of the last link, is returned together
+        with links, so deep pages do not scan skipped rows.
+        """
+        desc = request.GET.get('sort_order', 'desc') != 'asc'
+        sort_by = sort_by or 'ctime'
+
+        if per_page is None:
+            fileshares = order_nulls_last(fileshares, sort_by, desc)
+            next_cursor = None
+        else:
+            fileshares, next_cursor = keyset_page(fileshares, per_page,
+                                                  sort_by, cursor, desc)
+
+        repos = get_repos_by_ids([fs.repo_id for fs in fileshares])
+        links_info = [get_share_link_info(fs, repos) for fs in fileshares]
+        if per_page is None:
+            return Response(links_info)
+
+        return Response({'share_links': links_info, 'next_cursor': next_cursor})
+
     def get(self, request):
         """ Get all share links of a user.
 
+        Share links are sorted by type and name, unless ``sort_by`` (one of
+        ``ctime``, ``view_cnt`` and ``expire_date``) or ``per_page`` is given.
+
         Permission checking:
         1. default(NOT guest) user;
         """
@@ -105,6 +154,33 @@ class ShareLinks(APIView):
             error_msg = 'Permission denied.'
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
+        sort_by = request.GET.get('sort_by', '')
+        if sort_by and sort_by not in SHARE_LINK_SORT_FIELDS:
+            error_msg = 'sort_by invalid.'
+            return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+
+        per_page = request.GET.get('per_page', None)
+        cursor = None
+        if per_page is not None:
+            try:
+                per_page = int(per_page)
+            except ValueError:
+                error_msg = 'per_page invalid.'
+                return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+
+            if per_page <= 0:
+                error_msg = 'per_page invalid.'
+                return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+
+            cursor = request.GET.get('cursor', '')
+            if cursor:
+                cursor = decode_keyset_cursor(cursor)
+                if cursor is None:
+                    error_msg = 'cursor invalid.'
+                    return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+            else:
+                cursor = None
+
         # get all share links
         username = request.user.username
         fileshares = FileShare.objects.filter(username=username)
@@ -117,7 +193,7 @@ class ShareLinks(APIView):
                 return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
             # filter share links by repo
-            fileshares = filter(lambda fs: fs.repo_id == repo_id, fileshares)
+            fileshares = fileshares.filter(repo_id=repo_id)
 
             path = request.GET.get('path', None)
             if path:
@@ -142,11 +218,17 @@ class ShareLinks(APIView):
                 if s_type == 'd' and path[-1] != '/':
                     path = path + '/'
 
-                fileshares = filter(lambda fs: fs.path == path, fileshares)
+                fileshares = fileshares.filter(path=path)
+
+        if sort_by or per_page is not None:
+            return self._get_sorted_page(request, fileshares, sort_by,
+                                         per_page, cursor)
 
+        fileshares = list(fileshares)
+        repos = get_repos_by_ids([fs.repo_id for fs in fileshares])
         links_info = []
         for fs in fileshares:
-            link_info = get_share_link_info(fs)
+            link_info = get_share_link_info(fs, repos)
             links_info.append(link_info)
 
         if len(links_info) == 1:
@@ -17,7 +17,7 @@ from rest_framework.response import Response
 from rest_framework import status, serializers
 import seaserv
 from seaserv import seafile_api, get_commits, server_repo_size, \
-    get_personal_groups_by_user, is_group_user, get_group, seafserv_threaded_rpc
+    get_personal_groups_by_user, is_group_user, get_group
 from pysearpc import SearpcError
 
 from seahub.base.accounts import User
@@ -29,10 +29,10 @@ from seahub.group.models import GroupMessage, MessageReply, \
 from seahub.group.views import is_group_staff
 from seahub.message.models import UserMessage, UserMsgAttachment
 from seahub.notifications.models import UserNotification
-from seahub.utils import api_convert_desc_link, get_file_type_and_ext, \
-    gen_file_get_url, is_org_context, get_site_scheme_and_netloc
-from seahub.utils.paginator import Paginator
-from seahub.utils.file_types import IMAGE
+from seahub.utils import api_convert_desc_link, is_org_context, \
+    get_site_scheme_and_netloc
+from seahub.utils.paginator import Paginator, KeysetPaginator
+from seahub.utils.commit_diff import get_commit_diff
 from seahub.api2.models import Token, TokenV2, DESKTOP_PLATFORMS
 from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
 from seahub.avatar.templatetags.avatar_tags import api_avatar_url, \
@@ -63,12 +63,8 @@ def prepare_starred_files(files):
                  'dir' : f.is_dir
                  }
         if not f.is_dir:
-            try:
-                file_id = seafile_api.get_file_id_by_path(f.repo.id, f.path)
-                sfile['oid'] = file_id
-                sfile['size'] = get_file_size(f.repo.store_id, f.repo.version, file_id)
-            except SearpcError, e:
-                pass
+            sfile['oid'] = f.file_id
+            sfile['size'] = f.size
 
         array.append(sfile)
 
@@ -197,68 +193,6 @@ def prepare_events(event_groups):
             if e.etype == "repo-update":
                 api_convert_desc_link(e)
 
-def get_group_msgs(groupid, page, username):
-
-    # Show 15 group messages per page.
-    paginator = Paginator(GroupMessage.objects.filter(
-            group_id=groupid).order_by('-timestamp'), 15)
-
-    # If page request (9999) is out of range, return None
-    try:
-        group_msgs = paginator.page(page)
-    except (EmptyPage, InvalidPage):
-        return None
-
-    # Force evaluate queryset to fix some database error for mysql.
-    group_msgs.object_list = list(group_msgs.object_list)
-
-    attachments = MessageAttachment.objects.filter(group_message__in=group_msgs.object_list)
-
-    msg_replies = MessageReply.objects.filter(reply_to__in=group_msgs.object_list)
-    reply_to_list = [ r.reply_to_id for r in msg_replies ]
-
-    for msg in group_msgs.object_list:
-        msg.reply_cnt = reply_to_list.count(msg.id)
-        msg.replies = []
-        for r in msg_replies:
-            if msg.id == r.reply_to_id:
-                msg.replies.append(r)
-        msg.replies = msg.replies[-3:]
-
-        for att in attachments:
-            if att.group_message_id != msg.id:
-                continue
-
-            # Attachment name is file name or directory name.
-            # If is top directory, use repo name instead.
-            path = att.path
-            if path == '/':
-                repo = seafile_api.get_repo(att.repo_id)
-                if not repo:
-                    # TODO: what should we do here, tell user the repo
-                    # is no longer exists?
-                    continue
-                att.name = repo.name
-            else:
-                path = path.rstrip('/') # cut out last '/' if possible
-                att.name = os.path.basename(path)
-
-            # Load to discuss page if attachment is a image and from recommend.
-            if att.attach_type == 'file' and att.src == 'recommend':
-                att.filetype, att.fileext = get_file_type_and_ext(att.name)
-                if att.filetype == IMAGE:
-                    att.obj_id = seafile_api.get_file_id_by_path(att.repo_id, path)
-                    if not att.obj_id:
-                        att.err = 'File does not exist'
-                    else:
-                        att.token = seafile_api.get_fileserver_access_token(
-                            att.repo_id, att.obj_id, 'view', username)
-                        att.img_url = gen_file_get_url(att.token, att.name)
-
-            msg.attachment = att
-
-    return group_msgs
-
 def get_timestamp(msgtimestamp):
     if not msgtimestamp:
         return 0
@@ -308,25 +242,17 @@ def group_msg_to_json(msg, get_all_replies):
     ret['replies'] = replies
     return ret
 
-def get_group_msgs_json(groupid, page, username):
+def get_group_msgs_json(groupid, before, username):
+    """Return messages of a group older than ``before`` cursor, and cursor
+    of the next page, or ``None`` if there are no more.
+    """
     # Show 15 group messages per page.
-    paginator = Paginator(GroupMessage.objects.filter(
-            group_id=groupid).order_by('-timestamp'), 15)
-
-    # If page request (9999) is out of range, return None
-    try:
-        group_msgs = paginator.page(page)
-    except (EmptyPage, InvalidPage):
-        return None, -1
-
-    if group_msgs.has_next():
-        next_page = group_msgs.next_page_number()
-    else:
-        next_page = -1
+    paginator = KeysetPaginator(GroupMessage.objects.filter(
+            group_id=groupid), 15)
+    group_msgs = paginator.page(before=before)
 
-    group_msgs.object_list = list(group_msgs.object_list)
     msgs = [ group_msg_to_json(msg, True) for msg in group_msgs.object_list ]
-    return msgs, next_page
+    return msgs, group_msgs.next_cursor()
 
 def get_group_message_json(group_id, msg_id, get_all_replies):
     try:
@@ -439,7 +365,7 @@ def get_client_ip(request):
 def get_diff_details(repo_id, commit1, commit2):
     result = defaultdict(list)
 
-    diff_result = seafserv_threaded_rpc.get_diff(repo_id, commit1, commit2)
+    diff_result = get_commit_diff(repo_id, commit1, commit2)
     if not diff_result:
         return result
 
@@ -21,7 +21,6 @@ from rest_framework.response import Response
 from django.contrib.auth.hashers import check_password
 from django.contrib.sites.models import RequestSite
 from django.db import IntegrityError
-from django.db.models import F
 from django.http import HttpResponse
 from django.template import RequestContext
 from django.template.loader import render_to_string
@@ -46,6 +45,7 @@ from seahub.avatar.templatetags.avatar_tags import api_avatar_url, avatar
 from seahub.avatar.templatetags.group_avatar_tags import api_grp_avatar_url, \
         grp_avatar
 from seahub.base.accounts import User
+from seahub.base.middleware import clear_org_membership_cache
 from seahub.base.models import UserStarredFiles, DeviceToken
 from seahub.base.templatetags.seahub_tags import email2nickname, \
     translate_seahub_time, translate_commit_desc_escape
@@ -57,8 +57,9 @@ from seahub.thumbnail.utils import generate_thumbnail
 from seahub.notifications.models import UserNotification
 from seahub.options.models import UserOptions
 from seahub.profile.models import Profile, DetailedProfile
-from seahub.signals import (repo_created, repo_deleted)
-from seahub.share.models import FileShare, OrgFileShare, UploadLinkShare
+from seahub.signals import (repo_created, repo_deleted, repo_transferred)
+from seahub.share.models import FileShare, OrgFileShare, UploadLinkShare, \
+    incr_share_link_view_cnt
 from seahub.utils import gen_file_get_url, gen_token, gen_file_upload_url, \
     check_filename_with_rename, is_valid_username, EVENTS_ENABLED, \
     get_user_events, EMPTY_SHA1, get_ccnet_server_addr_port, is_pro_version, \
@@ -71,6 +72,7 @@ from seahub.utils.repo import get_sub_repo_abbrev_origin_path
 from seahub.utils.star import star_file, unstar_file
 from seahub.utils.file_types import DOCUMENT
 from seahub.utils.file_size import get_file_size_unit
+from seahub.utils.threadpool import run_concurrently
 from seahub.utils.timeutils import utc_to_local, datetime_to_isoformat_timestr
 from seahub.views import is_registered_user, check_file_lock, \
     group_events_data, get_diff, create_default_library, \
@@ -1152,6 +1154,10 @@ class RepoOwner(APIView):
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
+        repo_transferred.send(sender=None, org_id=org_id if org_id else -1,
+                              repo_id=repo_id, from_user=repo_owner,
+                              to_user=new_owner)
+
         # reshare repo to user
         for shared_user in shared_users:
             shared_username = shared_user.user
@@ -2919,9 +2925,7 @@ class SharedFileView(APIView):
         if not file_id:
             return api_error(status.HTTP_404_NOT_FOUND, "File not found")
 
-        # Increase file shared link view_cnt, this operation should be atomic
-        fileshare.view_cnt = F('view_cnt') + 1
-        fileshare.save()
+        incr_share_link_view_cnt(fileshare)
 
         op = request.GET.get('op', 'download')
         return get_repo_file(request, repo_id, file_id, file_name, op)
@@ -3403,41 +3407,51 @@ class EventsView(APIView):
                                                          events_count)
         events_more = True if len(events) == events_count else False
 
+        size = request.GET.get('size', 36)
+        # avatar and nickname of each author are looked up once per page
+        authors = {}
+
         l = []
         for e in events:
-            d = dict(etype=e.etype)
+            d = dict(etype=e['etype'])
             l.append(d)
-            if e.etype == 'repo-update':
-                d['author'] = e.commit.creator_name
-                d['time'] = e.commit.ctime
-                d['desc'] = e.commit.desc
-                d['repo_id'] = e.repo.id
-                d['repo_name'] = e.repo.name
-                d['commit_id'] = e.commit.id
-                d['converted_cmmt_desc'] = translate_commit_desc_escape(convert_cmmt_desc_link(e.commit))
-                d['more_files'] = e.commit.more_files
-                d['repo_encrypted'] = e.repo.encrypted
+            if e['etype'] == 'repo-update':
+                commit, repo = e['commit'], e['repo']
+                d['author'] = commit['creator_name']
+                d['time'] = commit['ctime']
+                d['desc'] = commit['desc']
+                d['repo_id'] = repo['id']
+                d['repo_name'] = repo['name']
+                d['commit_id'] = commit['id']
+                d['converted_cmmt_desc'] = translate_commit_desc_escape(commit['converted_cmmt_desc'])
+                d['more_files'] = commit['more_files']
+                d['repo_encrypted'] = repo['encrypted']
             else:
-                d['repo_id'] = e.repo_id
-                d['repo_name'] = e.repo_name
-                if e.etype == 'repo-create':
-                    d['author'] = e.creator
+                d['repo_id'] = e['repo_id']
+                d['repo_name'] = e['repo_name']
+                if e['etype'] == 'repo-create':
+                    d['author'] = e['creator']
                 else:
-                    d['author'] = e.repo_owner
+                    d['author'] = e['repo_owner']
 
                 epoch = datetime.datetime(1970, 1, 1)
-                local = utc_to_local(e.timestamp)
+                local = utc_to_local(e['timestamp'])
                 time_diff = local - epoch
                 d['time'] = time_diff.seconds + (time_diff.days * 24 * 3600)
 
-            size = request.GET.get('size', 36)
-            url, is_default, date_uploaded = api_avatar_url(d['author'], size)
-            d['nick'] = email2nickname(d['author'])
-            d['name'] = email2nickname(d['author'])
-            d['avatar'] = avatar(d['author'], size)
-            d['avatar_url'] = request.build_absolute_uri(url)
-            d['time_relative'] = translate_seahub_time(utc_to_local(e.timestamp))
-            d['date'] = utc_to_local(e.timestamp).strftime("%Y-%m-%d")
+            if d['author'] not in authors:
+                url, is_default, date_uploaded = api_avatar_url(d['author'],
+                                                                size)
+                authors[d['author']] = (email2nickname(d['author']),
+                                        avatar(d['author'], size),
+                                        request.build_absolute_uri(url))
+            nickname, avatar_img, avatar_url = authors[d['author']]
+            d['nick'] = nickname
+            d['name'] = nickname
+            d['avatar'] = avatar_img
+            d['avatar_url'] = avatar_url
+            d['time_relative'] = translate_seahub_time(utc_to_local(e['timestamp']))
+            d['date'] = utc_to_local(e['timestamp']).strftime("%Y-%m-%d")
 
         ret = {
             'events': l,
@@ -4053,6 +4067,8 @@ class OrganizationView(APIView):
         try:
             User.objects.create_user(username, password, is_staff=False, is_active=True)
             create_org(org_name, prefix, username)
+            # creator is added to the org as its staff
+            clear_org_membership_cache()
 
             new_org = ccnet_threaded_rpc.get_org_by_url_prefix(prefix)
 
@@ -4094,26 +4110,33 @@ class RepoDownloadSharedLinks(APIView):
             error_msg = 'Permission denied.'
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
+        def get_link_obj(fs):
+            """Return ``(exists, size)`` of file/dir of a link.
+            """
+            if fs.is_file_share_link():
+                obj_id = seafile_api.get_file_id_by_path(repo.id, fs.path)
+                if obj_id is None:
+                    return False, None
+                return True, seafile_api.get_file_size(repo.store_id,
+                                                       repo.version, obj_id)
+            else:
+                return seafile_api.get_dir_id_by_path(repo.id, fs.path) is not None, None
+
         shared_links = []
-        fileshares = FileShare.objects.filter(repo_id=repo_id)
-        for fs in fileshares:
-            size = None
+        fileshares = list(FileShare.objects.filter(repo_id=repo_id))
+        link_objs = run_concurrently(get_link_obj, fileshares)
+        for fs, (exists, size) in zip(fileshares, link_objs):
+            if not exists:
+                continue
+
             shared_link = {}
             if fs.is_file_share_link():
                 path = fs.path.rstrip('/') # Normalize file path
-                if seafile_api.get_file_id_by_path(repo.id, fs.path) is None:
-                    continue
-
-                obj_id = seafile_api.get_file_id_by_path(repo_id, path)
-                size = seafile_api.get_file_size(repo.store_id, repo.version, obj_id)
             else:
                 path = fs.path
                 if path[-1] != '/': # Normalize dir path
                     path += '/'
 
-                if seafile_api.get_dir_id_by_path(repo.id, fs.path) is None:
-                    continue
-
             shared_link['create_by'] = fs.username
             shared_link['creator_name'] = email2nickname(fs.username)
             shared_link['create_time'] = datetime_to_isoformat_timestr(fs.ctime)
@@ -4188,14 +4211,17 @@ class RepoUploadSharedLinks(APIView):
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
         shared_links = []
-        fileshares = UploadLinkShare.objects.filter(repo_id=repo_id)
-        for fs in fileshares:
+        fileshares = list(UploadLinkShare.objects.filter(repo_id=repo_id))
+        dir_ids = run_concurrently(
+            lambda fs: seafile_api.get_dir_id_by_path(repo.id, fs.path),
+            fileshares)
+        for fs, dir_id in zip(fileshares, dir_ids):
             shared_link = {}
             path = fs.path
             if path[-1] != '/': # Normalize dir path
                 path += '/'
 
-            if seafile_api.get_dir_id_by_path(repo.id, fs.path) is None:
+            if dir_id is None:
                 continue
 
             shared_link['create_by'] = fs.username
@@ -5,6 +5,7 @@ from django.core.files.storage import default_storage, get_storage_class
 from django.utils.http import urlquote
 
 from seahub.base.accounts import User
+from seahub.base.cache import get_or_compute
 from seahub.avatar.settings import AVATAR_DEFAULT_URL, AVATAR_CACHE_TIMEOUT,\
     AUTO_GENERATE_AVATAR_SIZES, AVATAR_DEFAULT_SIZE, \
     AVATAR_DEFAULT_NON_REGISTERED_URL, AUTO_GENERATE_GROUP_AVATAR_SIZES, \
@@ -31,15 +32,12 @@ def cache_result(func):
     Decorator to cache the result of functions that take a ``user`` and a
     ``size`` value.
     """
-    def cache_set(key, value):
-        cache.set(key, value, AVATAR_CACHE_TIMEOUT)
-        return value
-
     def cached_func(user, size):
         prefix = func.__name__
         cached_funcs.add(prefix)
         key = get_cache_key(user, size, prefix=prefix)
-        return cache.get(key) or cache_set(key, func(user, size))
+        return get_or_compute(cache, key, lambda: func(user, size),
+                              AVATAR_CACHE_TIMEOUT)
     return cached_func
 
 def invalidate_cache(user, size=None):
@@ -0,0 +1,252 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Cache backend with a per-process L1 tier in front of a shared cache.
+
+Read mostly keys, like nicknames and avatars, are kept for ``L1_TIMEOUT``
+seconds in a per-process LRU bounded by ``L1_MAX_SIZE`` bytes, so most reads
+do not leave the process. Only keys starting with one of ``L1_KEY_PREFIXES``
+use the L1 tier. Counters and rate limits, which must be consistent across
+processes, should not be listed there. A change made by one process is seen
+by other processes after at most ``L1_TIMEOUT`` seconds.
+
+Example configuration, with memcached as the shared tier::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'seahub.base.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'L1_TIMEOUT': 10,
+                'L1_MAX_SIZE': 32 * 1024 * 1024,
+            },
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+            'KEY_FUNCTION': 'seahub.base.cache.make_key',
+        },
+    }
+"""
+import cPickle as pickle
+import hashlib
+import math
+import random
+import re
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.encoding import force_bytes
+
+from seahub.utils.content_cache import LocalLRUCache
+
+MEMCACHE_MAX_KEY_LENGTH = 250
+_INVALID_KEY_CHARS = re.compile(r'[\x00-\x20\x7f]')
+
+DEFAULT_L1_KEY_PREFIXES = (
+    'NICKNAME_', 'EMAIL_ID_', 'avatar', 'api_avatar', 'primary_avatar',
+    'Group__',
+)
+
+# Seconds a lock of ``get_or_compute`` is held at most.
+SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+# Seconds to wait for value being computed by another process.
+SINGLE_FLIGHT_WAIT = 5
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+def make_key(key, key_prefix, version):
+    """Cache key function which always returns keys valid for memcached.
+
+    Same as Django's default key function, but keys which are too long or
+    contain whitespace or control characters are replaced by their md5
+    digest, so the same key always maps to the same server and entry.
+    """
+    new_key = '%s:%s:%s' % (key_prefix, version, key)
+    if len(new_key) > MEMCACHE_MAX_KEY_LENGTH or \
+       _INVALID_KEY_CHARS.search(new_key):
+        new_key = '%s:%s:md5:%s' % (key_prefix, version,
+                                    hashlib.md5(force_bytes(key)).hexdigest())
+    return new_key
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super(TwoTierCache, self).__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._shared_cache = None
+        self.l1_timeout = options.get('L1_TIMEOUT', 10)
+        self.l1_key_prefixes = tuple(options.get('L1_KEY_PREFIXES',
+                                                 DEFAULT_L1_KEY_PREFIXES))
+        self.l1 = LocalLRUCache(options.get('L1_MAX_SIZE', 32 * 1024 * 1024))
+
+    @property
+    def shared(self):
+        if self._shared_cache is None:
+            self._shared_cache = caches[self._shared_alias]
+        return self._shared_cache
+
+    def _use_l1(self, key):
+        return self.l1_timeout > 0 and key.startswith(self.l1_key_prefixes)
+
+    def _l1_key(self, key, version):
+        return (key, self.version if version is None else version)
+
+    def _l1_get(self, key, version):
+        data = self.l1.get(self._l1_key(key, version))
+        # values are kept pickled, so callers can not modify cached objects
+        return pickle.loads(data) if data is not None else None
+
+    def _get_timeout(self, timeout):
+        # seconds, or None for never
+        return self.default_timeout if timeout == DEFAULT_TIMEOUT else timeout
+
+    def _l1_set(self, key, value, version, timeout=DEFAULT_TIMEOUT):
+        timeout = self._get_timeout(timeout)
+        if timeout is not None:
+            if timeout <= 0:
+                self.l1.delete(self._l1_key(key, version))
+                return
+            timeout = min(timeout, self.l1_timeout)
+        else:
+            timeout = self.l1_timeout
+
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self.l1.set(self._l1_key(key, version), data, len(data), timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and self._use_l1(key):
+            self._l1_set(key, value, version, timeout)
+        return added
+
+    def get(self, key, default=None, version=None):
+        use_l1 = self._use_l1(key)
+        if use_l1:
+            value = self._l1_get(key, version)
+            if value is not None:
+                return value
+
+        value = self.shared.get(key, version=version)
+        if value is None:
+            return default
+        if use_l1:
+            self._l1_set(key, value, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self._use_l1(key):
+            self._l1_set(key, value, version, timeout)
+
+    def delete(self, key, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        ret = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(key, version) if self._use_l1(key) else None
+            if value is not None:
+                ret[key] = value
+            else:
+                missing.append(key)
+
+        if missing:
+            found = self.shared.get_many(missing, version=version)
+            for key, value in found.iteritems():
+                if self._use_l1(key):
+                    self._l1_set(key, value, version)
+            ret.update(found)
+        return ret
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.shared.decr(key, delta, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set_many(data, timeout, version=version)
+        for key, value in data.iteritems():
+            if self._use_l1(key):
+                self._l1_set(key, value, version, timeout)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.l1.delete(self._l1_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_or_compute(self, key, func, timeout=DEFAULT_TIMEOUT, version=None,
+                       beta=1.0):
+        """Return cached value of ``key``, or call ``func`` to compute and
+        cache it.
+
+        To avoid stampedes on popular keys, the value is recomputed a little
+        before it expires, with a probability growing as expiry gets closer
+        and as ``func`` takes longer (probabilistic early expiration).
+        Only one process computes a value at a time, others get the stale
+        value, or wait for the new one if there is none.
+
+        Values are stored with their expiry time, so ``key`` should only be
+        read with this method.
+        """
+        timeout = self._get_timeout(timeout)
+        entry = self.get(key, version=version)
+        if entry is not None:
+            value, expire_at, delta = entry
+            if time.time() - delta * beta * \
+               math.log(1.0 - random.random()) < expire_at:
+                return value
+
+        lock_key = key + '_LOCK'
+        locked = self.shared.add(lock_key, 1, SINGLE_FLIGHT_LOCK_TIMEOUT,
+                                 version=version)
+        if not locked:
+            if entry is not None:
+                return entry[0]
+
+            deadline = time.time() + SINGLE_FLIGHT_WAIT
+            while time.time() < deadline:
+                time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+                entry = self.shared.get(key, version=version)
+                if entry is not None:
+                    return entry[0]
+            # holder of the lock is gone or too slow, compute it ourselves
+
+        try:
+            start = time.time()
+            value = func()
+            delta = time.time() - start
+            expire_at = start + timeout if timeout is not None else \
+                float('inf')
+            self.set(key, (value, expire_at, delta), timeout, version=version)
+            return value
+        finally:
+            if locked:
+                self.shared.delete(lock_key, version=version)
+
+def get_or_compute(cache, key, func, timeout=DEFAULT_TIMEOUT):
+    """Use stampede protected ``get_or_compute`` of ``cache`` if supported,
+    otherwise plain get and set.
+    """
+    compute = getattr(cache, 'get_or_compute', None)
+    if compute is not None:
+        return compute(key, func, timeout)
+
+    value = cache.get(key)
+    if value is None:
+        value = func()
+        cache.set(key, value, timeout)
+    return value
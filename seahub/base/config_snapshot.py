@@ -0,0 +1,77 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""In-process snapshot of web settings stored by constance.
+
+Reading ``constance.config.<KEY>`` costs a backend lookup each time. Here all
+keys are loaded in one go and kept in process, together with the version
+stored in cache under ``CONFIG_VERSION_CACHE_KEY``. The snapshot is reloaded
+once the version changes, which is bumped whenever settings are saved.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from constance import config
+
+CONFIG_VERSION_CACHE_KEY = 'CONSTANCE_CONFIG_VERSION'
+
+class ConfigSnapshot(object):
+    def __init__(self, values):
+        self._values = values
+
+    def __getattr__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AttributeError(key)
+
+# (version, snapshot)
+_snapshot = (None, None)
+
+def _get_version():
+    version = cache.get(CONFIG_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CONFIG_VERSION_CACHE_KEY)
+    return version
+
+def _load_config():
+    values = dict((key, default) for key, (default, _) in
+                  settings.CONSTANCE_CONFIG.items())
+
+    backend = getattr(config, '_backend', None)
+    if backend is None or not hasattr(backend, 'mget'):
+        for key in values:
+            values[key] = getattr(config, key)
+        return values
+
+    for key, value in backend.mget(values.keys()):
+        if value is not None:
+            values[key] = value
+    return values
+
+def get_config_snapshot():
+    """Return values of all constance settings, as attributes.
+    """
+    global _snapshot
+
+    version = _get_version()
+    cached_version, snapshot = _snapshot
+    if snapshot is None or version is None or version != cached_version:
+        snapshot = ConfigSnapshot(_load_config())
+        _snapshot = (version, snapshot)
+    return snapshot
+
+def bump_config_version():
+    """Make every process reload its snapshot on next use.
+    """
+    cache.set(CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+try:
+    from constance.signals import config_updated
+except ImportError:
+    pass
+else:
+    def config_updated_cb(sender, **kwargs):
+        bump_config_version()
+    config_updated.connect(config_updated_cb)
@@ -11,8 +11,8 @@ RequestContext.
 import re
 
 from django.conf import settings as dj_settings
-from constance import config
 
+from seahub.base.config_snapshot import get_config_snapshot
 from seahub.settings import SEAFILE_VERSION, SITE_TITLE, SITE_NAME, \
     MAX_FILE_NAME, BRANDING_CSS, LOGO_PATH, LOGO_WIDTH, LOGO_HEIGHT,\
     SHOW_REPO_DOWNLOAD_BUTTON, SITE_ROOT, ENABLE_GUEST_INVITATION
@@ -22,7 +22,8 @@ try:
 except ImportError:
     SEACLOUD_MODE = False
 
-from seahub.utils import HAS_FILE_SEARCH, EVENTS_ENABLED, TRAFFIC_STATS_ENABLED
+from seahub.utils import HAS_FILE_SEARCH, EVENTS_ENABLED, \
+    is_traffic_stats_enabled
 
 try:
     from seahub.settings import ENABLE_PUBFILE
@@ -52,6 +53,9 @@ def base(request):
     repo_id_patt = r".*/([a-f0-9]{8}-[a-f0-9]{4}-4[a-f0-9]{3}-[89ab][a-f0-9]{3}-[a-f0-9]{12})/.*"
     m = re.match(repo_id_patt, request.get_full_path())
     search_repo_id = m.group(1) if m is not None else None
+
+    # one cache lookup instead of one per key
+    config = get_config_snapshot()
     file_server_root = config.FILE_SERVER_ROOT
     if not file_server_root.endswith('/'):
         file_server_root += '/'
@@ -75,7 +79,7 @@ def base(request):
         'share_link_password_min_length': config.SHARE_LINK_PASSWORD_MIN_LENGTH,
         'repo_password_min_length': config.REPO_PASSWORD_MIN_LENGTH,
         'events_enabled': EVENTS_ENABLED,
-        'traffic_stats_enabled': TRAFFIC_STATS_ENABLED,
+        'traffic_stats_enabled': is_traffic_stats_enabled(),
         'sysadmin_extra_enabled': ENABLE_SYSADMIN_EXTRA,
         'multi_tenancy': MULTI_TENANCY,
         'multi_institution': getattr(dj_settings, 'MULTI_INSTITUTION', False),
@@ -0,0 +1,22 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from seahub.base.sessions import clear_expired_sessions
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from database in batches.'
+    label = "base_clear_expired_sessions"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', dest='batch_size', type='int',
+                    default=1000,
+                    help='Number of sessions deleted at a time.'),
+        make_option('--sleep', dest='sleep', type='float', default=0,
+                    help='Seconds to sleep between batches.'),
+    )
+
+    def handle(self, *args, **options):
+        count = clear_expired_sessions(options['batch_size'], options['sleep'])
+        self.stdout.write('Deleted %d expired sessions.' % count)
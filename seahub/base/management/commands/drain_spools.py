@@ -0,0 +1,46 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import logging
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+def get_spooled_writers():
+    """Return ``(name, writer)`` of writers which spool undelivered items.
+    """
+    writers = []
+
+    import seahub.handlers
+    if hasattr(seahub.handlers, 'get_event_writer'):
+        writers.append(('events', seahub.handlers.get_event_writer()))
+
+    from seahub.utils.audit import file_access_msg_writer
+    writers.append(('file access events', file_access_msg_writer))
+
+    return writers
+
+class Command(BaseCommand):
+    help = 'Deliver items spooled by seahub processes, e.g. repo events.'
+    label = "base_drain_spools"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--once', action='store_true', dest='once', default=False,
+                    help='Drain spools and exit.'),
+        make_option('--interval', dest='interval', type='int', default=10,
+                    help='Seconds to sleep between drains.'),
+    )
+
+    def handle(self, *args, **options):
+        writers = get_spooled_writers()
+        while True:
+            for name, writer in writers:
+                count = writer.drain_spool()
+                if count:
+                    logger.info('Delivered %d spooled %s.' % (count, name))
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
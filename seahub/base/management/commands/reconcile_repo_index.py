@@ -0,0 +1,56 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from seaserv import seafile_api
+
+from seahub.base.models import RepoIndex
+from seahub.utils.threadpool import run_concurrently
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Update repo index used by admin library search from seafile.'
+    label = "base_reconcile_repo_index"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', dest='batch_size', type='int',
+                    default=1000,
+                    help='Number of libraries fetched from seafile at a time.'),
+    )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started_at = timezone.now()
+
+        start = 0
+        count = 0
+        while True:
+            repos = seafile_api.get_repo_list(start, batch_size)
+            if not repos:
+                break
+
+            owners = run_concurrently(seafile_api.get_repo_owner,
+                                      [r.repo_id for r in repos])
+            with transaction.atomic():
+                for repo, owner in zip(repos, owners):
+                    RepoIndex.objects.update_repo(
+                        repo.repo_id, repo.repo_name, owner, size=repo.size,
+                        file_count=repo.file_count, encrypted=repo.encrypted,
+                        is_virtual=repo.is_virtual)
+            count += len(repos)
+
+            if len(repos) < batch_size:
+                break
+            start += batch_size
+
+        # Repos not seen in this run have been removed from seafile.
+        removed = RepoIndex.objects.filter(updated_at__lt=started_at).count()
+        RepoIndex.objects.filter(updated_at__lt=started_at).delete()
+
+        self.stdout.write('Indexed %d libraries, removed %d.' % (count, removed))
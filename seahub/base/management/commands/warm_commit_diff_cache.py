@@ -0,0 +1,44 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from pysearpc import SearpcError
+from seaserv import seafile_api
+
+from seahub.utils.commit_diff import get_commit_diff, \
+    get_commit_diff_cache_stats
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Compute and cache diffs of newest commits of recently modified libraries.'
+    label = "base_warm_commit_diff_cache"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--repos', dest='repos', type='int', default=100,
+                    help='Number of most recently modified libraries.'),
+        make_option('--commits', dest='commits', type='int', default=25,
+                    help='Number of newest commits of each library.'),
+    )
+
+    def handle(self, *args, **options):
+        repos = seafile_api.get_repo_list(-1, -1)
+        repos.sort(key=lambda r: getattr(r, 'last_modify', 0), reverse=True)
+
+        count = 0
+        for repo in repos[:options['repos']]:
+            try:
+                commits = seafile_api.get_commit_list(repo.id, 0,
+                                                      options['commits'])
+                for commit in commits:
+                    get_commit_diff(repo.id, '', commit.id)
+                    count += 1
+            except SearpcError as e:
+                logger.error(e)
+
+        stats = get_commit_diff_cache_stats()
+        self.stdout.write('Warmed %d commit diffs, hit rate %.2f' % (
+            count, stats['hit_rate']))
@@ -1,5 +1,9 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
+import logging
 import re
+import time
+from contextlib import contextmanager
+from functools import wraps
 
 from django.core.cache import cache
 from django.core.urlresolvers import reverse
@@ -7,7 +11,6 @@ from django.http import HttpResponseRedirect
 
 import seaserv
 
-from seahub.notifications.models import Notification
 from seahub.notifications.utils import refresh_cache
 try:
     from seahub.settings import CLOUD_MODE
@@ -18,12 +21,120 @@ try:
 except ImportError:
     MULTI_TENANCY = False
 from seahub.settings import SITE_ROOT
+try:
+    from seahub.settings import MIDDLEWARE_TIMING_ENABLED
+except ImportError:
+    MIDDLEWARE_TIMING_ENABLED = False
+
+logger = logging.getLogger(__name__)
+
+MIDDLEWARE_TIMINGS_ATTR = '_middleware_timings'
+
+def _add_timing(request, name, elapsed):
+    timings = getattr(request, MIDDLEWARE_TIMINGS_ATTR, None)
+    if timings is None:
+        timings = []
+        setattr(request, MIDDLEWARE_TIMINGS_ATTR, timings)
+    timings.append((name, elapsed))
+
+def record_timing(func):
+    """Record time spent in a middleware method to
+    ``request._middleware_timings``.
+    """
+    @wraps(func)
+    def _decorated(self, request, *args, **kwargs):
+        start = time.time()
+        try:
+            return func(self, request, *args, **kwargs)
+        finally:
+            _add_timing(request, '%s.%s' % (self.__class__.__name__,
+                                             func.__name__),
+                        time.time() - start)
+    return _decorated
+
+@contextmanager
+def record_phase_timing(request, name):
+    """Record time spent in a phase of a view, reported together with
+    middleware timings.
+    """
+    start = time.time()
+    try:
+        yield
+    finally:
+        _add_timing(request, name, time.time() - start)
+
+class MiddlewareTimingMiddleware(object):
+    """Report time spent in seahub middlewares and recorded view phases of
+    each request.
+
+    Should be put at the top of ``MIDDLEWARE_CLASSES``, so that its
+    ``process_response`` is called after all other middlewares.
+    """
+    def process_response(self, request, response):
+        if not MIDDLEWARE_TIMING_ENABLED:
+            return response
+
+        timings = getattr(request, MIDDLEWARE_TIMINGS_ATTR, [])
+        if timings:
+            value = ', '.join(['%s;dur=%.2f' % (name, elapsed * 1000)
+                               for name, elapsed in timings])
+            response['X-Seahub-Middleware-Timing'] = value
+            logger.debug('Middleware timing for %s: %s' % (request.path,
+                                                           value))
+        return response
+
+class CachedOrg(object):
+    """Organization info restored from session.
+    """
+    FIELDS = ('org_id', 'org_name', 'url_prefix', 'creator', 'ctime',
+              'is_staff')
+
+    def __init__(self, d):
+        for field in self.FIELDS:
+            setattr(self, field, d.get(field))
+
+    @classmethod
+    def to_dict(cls, org):
+        return dict([(f, getattr(org, f, None)) for f in cls.FIELDS])
+
+ORG_MEMBERSHIP_SESSION_KEY = '_org_membership'
+ORG_MEMBERSHIP_VERSION_KEY = 'ORG_MEMBERSHIP_VERSION'
+
+def clear_org_membership_cache():
+    """Invalidate org membership cached in all sessions, should be called when
+    org members or their staff status are changed, or an org is created.
+    """
+    try:
+        cache.incr(ORG_MEMBERSHIP_VERSION_KEY)
+    except ValueError:
+        cache.set(ORG_MEMBERSHIP_VERSION_KEY, 1, None)
 
 class BaseMiddleware(object):
     """
     Middleware that add organization, group info to user.
     """
 
+    def _get_user_org(self, request, username):
+        """Get user's org, cached in session until org members are changed.
+        """
+        version = cache.get(ORG_MEMBERSHIP_VERSION_KEY, 0)
+        cached = request.session.get(ORG_MEMBERSHIP_SESSION_KEY)
+        if cached is not None and cached.get('username') == username and \
+           cached.get('version') == version and \
+           (cached['org'] is None or
+            sorted(cached['org']) == sorted(CachedOrg.FIELDS)):
+            return CachedOrg(cached['org']) if cached['org'] else None
+
+        orgs = seaserv.get_orgs_by_user(username)
+        org = orgs[0] if orgs else None
+        request.session[ORG_MEMBERSHIP_SESSION_KEY] = {
+            'username': username,
+            'version': version,
+            'org': CachedOrg.to_dict(org) if org else None,
+        }
+        return org
+
+    @record_timing
     def process_request(self, request):
         username = request.user.username
         request.user.org = None
@@ -31,10 +142,8 @@ class BaseMiddleware(object):
         if CLOUD_MODE:
             request.cloud_mode = True
 
-            if MULTI_TENANCY:
-                orgs = seaserv.get_orgs_by_user(username)
-                if orgs:
-                    request.user.org = orgs[0]
+            if MULTI_TENANCY and username:
+                request.user.org = self._get_user_org(request, username)
         else:
             request.cloud_mode = False
 
@@ -47,15 +156,17 @@ class InfobarMiddleware(object):
     """Query info bar close status, and store into request."""
 
     def get_from_db(self):
-        ret = Notification.objects.all().filter(primary=1)
-        refresh_cache()
-        return ret
+        return refresh_cache()
 
+    @record_timing
     def process_request(self, request):
         topinfo_close = request.COOKIES.get('info_id', '')
 
-        cur_note = cache.get('CUR_TOPINFO') if cache.get('CUR_TOPINFO') else \
-            self.get_from_db()
+        # An empty list is cached when there is no primary notification.
+        cur_note = cache.get('CUR_TOPINFO')
+        if cur_note is None:
+            cur_note = self.get_from_db()
+
         if not cur_note:
             request.cur_note = None
         else:
@@ -70,18 +181,18 @@ class InfobarMiddleware(object):
         return response
 
 
+FORCE_PASSWD_CHANGE_BLACK_LIST = (
+    r'^%s$' % SITE_ROOT, r'home/.+', r'repo/.+', r'[f|d]/[a-f][0-9]{10}',
+    r'group/\d+', r'groups/', r'share/', r'profile/', r'notification/list/')
+FORCE_PASSWD_CHANGE_BLACK_LIST_PATT = re.compile(
+    '|'.join(['(?:%s)' % patt for patt in FORCE_PASSWD_CHANGE_BLACK_LIST]))
+
 class ForcePasswdChangeMiddleware(object):
     def _request_in_black_list(self, request):
-        path = request.path
-        black_list = (r'^%s$' % SITE_ROOT, r'home/.+', r'repo/.+',
-                      r'[f|d]/[a-f][0-9]{10}', r'group/\d+', r'groups/',
-                      r'share/', r'profile/', r'notification/list/')
-
-        for patt in black_list:
-            if re.search(patt, path) is not None:
-                return True
-        return False
+        return FORCE_PASSWD_CHANGE_BLACK_LIST_PATT.search(request.path) \
+            is not None
 
+    @record_timing
     def process_request(self, request):
         if request.session.get('force_passwd_change', False):
             if self._request_in_black_list(request):
@@ -4,7 +4,9 @@ import datetime
 import hashlib
 import logging
 import json
-from django.db import models, IntegrityError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction, IntegrityError
 from django.utils import timezone
 
 from pysearpc import SearpcError
@@ -12,7 +14,9 @@ from seaserv import seafile_api
 
 from seahub.auth.signals import user_logged_in
 from seahub.group.models import GroupMessage
-from seahub.utils import calc_file_path_hash, within_time_range
+from seahub.utils import calc_file_path_hash, within_time_range, \
+    normalize_cache_key
+from seahub.utils.threadpool import run_concurrently
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 from fields import LowerCaseCharField
 
@@ -20,6 +24,10 @@ from fields import LowerCaseCharField
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+STARRED_FILES_CACHE_PREFIX = 'STARRED_FILES_'
+STARRED_FILES_CACHE_TIMEOUT = getattr(settings, 'STARRED_FILES_CACHE_TIMEOUT',
+                                      24 * 60 * 60)
+
 
 class FileDiscuss(models.Model):
     """
@@ -140,69 +148,128 @@ class StarredFile(object):
         if not is_dir:
             self.name = path.split('/')[-1]
 
+def _starred_files_cache_key(username):
+    return normalize_cache_key(username, STARRED_FILES_CACHE_PREFIX)
+
+def clear_starred_files_cache(username):
+    cache.delete(_starred_files_cache_key(username))
+
+def _get_repo_or_error(repo_id):
+    try:
+        return seafile_api.get_repo(repo_id)
+    except SearpcError as e:
+        logger.error(e)
+        return e
+
+def _list_parent_dir(args):
+    """List a parent dir of starred items, return ``None`` on RPC error.
+    """
+    repo, parent_dir = args
+    # get real path for sub repo
+    real_path = repo.origin_path + parent_dir if repo.origin_path else parent_dir
+    try:
+        dirents = seafile_api.list_dir_by_path(repo.store_id, real_path)
+    except SearpcError as e:
+        logger.error(e)
+        return None
+    return dirents if dirents else []
+
 class UserStarredFilesManager(models.Manager):
+    def _resolve_starred_files(self, repo, sfiles):
+        """Resolve starred items of a repo, by listing each parent dir once.
+
+        Returns ``(resolved, stale)``, ``resolved`` is a list of
+        ``(sfile_id, file_id, size, mtime)``, ``stale`` is a list of ids of
+        rows whose file/dir no longer exists.
+        """
+        resolved, stale = [], []
+        parents = {}
+        for sfile in sfiles:
+            if sfile.path == '/':
+                resolved.append((sfile.id, '', 0, 0))
+                continue
+            path = sfile.path.rstrip('/')
+            parent_dir = os.path.dirname(path)
+            parents.setdefault(parent_dir, []).append(
+                (sfile, os.path.basename(path)))
+
+        parent_dirs = parents.keys()
+        listings = run_concurrently(_list_parent_dir,
+                                    [(repo, d) for d in parent_dirs])
+        for parent_dir, dirents in zip(parent_dirs, listings):
+            if dirents is None:
+                continue
+            dirents = dict([(d.obj_name, d) for d in dirents])
+            for sfile, name in parents[parent_dir]:
+                dirent = dirents.get(name)
+                if dirent is None:
+                    stale.append(sfile.id)
+                    continue
+                if sfile.is_dir:
+                    resolved.append((sfile.id, '', 0, dirent.mtime))
+                else:
+                    resolved.append((sfile.id, dirent.obj_id, dirent.size,
+                                     dirent.mtime))
+        return resolved, stale
+
     def get_starred_files_by_username(self, username):
         """Get a user's starred files.
 
+        Stars are grouped by repo, each repo is fetched once and starred
+        paths are checked by listing their parent dirs concurrently.
+        Resolved results are cached per user and reused for repos whose head
+        commit has not moved.
+
         Arguments:
         - `self`:
         - `username`:
         """
-        starred_files = super(UserStarredFilesManager, self).filter(
-            email=username, org_id=-1)
+        starred_files = list(super(UserStarredFilesManager, self).filter(
+            email=username, org_id=-1))
 
-        ret = []
-        repo_cache = {}
+        sfiles_by_repo = {}
         for sfile in starred_files:
-            # repo still exists?
-            if repo_cache.has_key(sfile.repo_id):
-                repo = repo_cache[sfile.repo_id]
-            else:
-                try:
-                    repo = seafile_api.get_repo(sfile.repo_id)
-                except SearpcError:
-                    continue
-                if repo is not None:
-                    repo_cache[sfile.repo_id] = repo
-                else:
-                    sfile.delete()
-                    continue
+            sfiles_by_repo.setdefault(sfile.repo_id, []).append(sfile)
 
-            # file still exists?
-            file_id = ''
-            size = -1
-            if sfile.path != "/":
-                try:
-                    file_id = seafile_api.get_file_id_by_path(sfile.repo_id,
-                                                              sfile.path)
-                    # size = seafile_api.get_file_size(file_id)
-                except SearpcError:
-                    continue
-                if not file_id:
-                    sfile.delete()
-                    continue
+        repo_ids = sfiles_by_repo.keys()
+        repos = dict(zip(repo_ids,
+                         run_concurrently(_get_repo_or_error, repo_ids)))
 
-            f = StarredFile(sfile.org_id, repo, file_id, sfile.path,
-                            sfile.is_dir, 0) # TODO: remove ``size`` from StarredFile
-            ret.append(f)
+        cache_key = _starred_files_cache_key(username)
+        cached = cache.get(cache_key) or {}
+        new_cache = {}
 
-        '''Calculate files last modification time'''
-        for sfile in ret:
-            if sfile.is_dir:
+        ret = []
+        stale_ids = []
+        for repo_id, sfiles in sfiles_by_repo.iteritems():
+            # repo still exists?
+            repo = repos[repo_id]
+            if isinstance(repo, SearpcError):
+                continue
+            if repo is None:
+                stale_ids += [sfile.id for sfile in sfiles]
                 continue
 
-            try:
-                # get real path for sub repo
-                real_path = sfile.repo.origin_path + sfile.path if sfile.repo.origin_path else sfile.path
-                dirent = seafile_api.get_dirent_by_path(sfile.repo.store_id,
-                                                        real_path)
-                if dirent:
-                    sfile.last_modified = dirent.mtime
-                else:
-                    sfile.last_modified = 0
-            except SearpcError as e:
-                logger.error(e)
-                sfile.last_modified = 0
+            head_id, resolved = cached.get(repo_id, (None, None))
+            if head_id is None or head_id != repo.head_cmmt_id:
+                resolved, stale = self._resolve_starred_files(repo, sfiles)
+                stale_ids += stale
+            new_cache[repo_id] = (repo.head_cmmt_id, resolved)
+
+            sfiles_by_id = dict([(sfile.id, sfile) for sfile in sfiles])
+            for sfile_id, file_id, size, mtime in resolved:
+                sfile = sfiles_by_id.get(sfile_id)
+                if sfile is None:
+                    continue
+                f = StarredFile(sfile.org_id, repo, file_id, sfile.path,
+                                sfile.is_dir, size)
+                f.last_modified = mtime
+                ret.append(f)
+
+        if stale_ids:
+            super(UserStarredFilesManager, self).filter(
+                id__in=stale_ids).delete()
+        cache.set(cache_key, new_cache, STARRED_FILES_CACHE_TIMEOUT)
 
         ret.sort(lambda x, y: cmp(y.last_modified, x.last_modified))
 
@@ -331,3 +398,106 @@ class ClientLoginToken(models.Model):
 
     def __unicode__(self):
         return "/".join(self.username, self.token)
+
+########## repo index
+class RepoIndexManager(models.Manager):
+    def update_repo(self, repo_id, name, owner, size=0, file_count=0,
+                    encrypted=False, is_virtual=False):
+        """Add or update a repo in the index.
+        """
+        fields = {
+            'name': name or '',
+            'owner': owner or '',
+            'size': size or 0,
+            'file_count': file_count or 0,
+            'encrypted': bool(encrypted),
+            'is_virtual': bool(is_virtual),
+            'updated_at': timezone.now(),
+        }
+        updated = super(RepoIndexManager, self).filter(
+            repo_id=repo_id).update(**fields)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    self.create(repo_id=repo_id, **fields)
+            except IntegrityError:
+                # added by another request at the same time
+                super(RepoIndexManager, self).filter(
+                    repo_id=repo_id).update(**fields)
+
+    def update_repo_owner(self, repo_id, owner):
+        super(RepoIndexManager, self).filter(repo_id=repo_id).update(
+            owner=owner, updated_at=timezone.now())
+
+    def remove_repo(self, repo_id):
+        super(RepoIndexManager, self).filter(repo_id=repo_id).delete()
+
+    def get_owners(self, repo_ids):
+        """Return a dict of repo id to owner of repos found in the index.
+        """
+        return dict(super(RepoIndexManager, self).filter(
+            repo_id__in=repo_ids).values_list('repo_id', 'owner'))
+
+    def search_by_name(self, keyword, prefix=False, owner=None):
+        """Return repos whose name contains (or starts with, if ``prefix``
+        is set) ``keyword``, ignoring case, ordered by name.
+        """
+        qs = super(RepoIndexManager, self).filter(is_virtual=False)
+        if prefix:
+            qs = qs.filter(name__istartswith=keyword)
+        else:
+            qs = qs.filter(name__icontains=keyword)
+        if owner:
+            qs = qs.filter(owner=owner)
+        return qs.order_by('name', 'repo_id')
+
+class RepoIndex(models.Model):
+    """Searchable copy of repo id, name, owner and size, used by admin
+    library listing. Kept up to date by repo signals, and reconciled with
+    seafile by ``manage.py reconcile_repo_index``. Renames (which may be
+    done by clients without seahub) and sizes are only updated by the
+    latter, so it should be run periodically.
+    """
+    repo_id = models.CharField(max_length=36, unique=True)
+    name = models.CharField(max_length=255, db_index=True)
+    owner = LowerCaseCharField(max_length=255, db_index=True)
+    size = models.BigIntegerField(default=0)
+    file_count = models.BigIntegerField(default=0)
+    encrypted = models.BooleanField(default=False)
+    is_virtual = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = RepoIndexManager()
+
+from django.dispatch import receiver
+from seahub.signals import repo_created, repo_deleted, repo_transferred
+
+# Failures to update the index are only logged, so that they never block
+# creating, deleting or transferring repos. ``reconcile_repo_index`` fixes
+# the index later.
+
+@receiver(repo_created)
+def add_repo_to_index(sender, **kwargs):
+    try:
+        RepoIndex.objects.update_repo(kwargs['repo_id'], kwargs['repo_name'],
+                                      kwargs['creator'])
+    except Exception as e:
+        logger.error('Failed to add repo %s to index: %s' % (
+            kwargs['repo_id'], e))
+
+@receiver(repo_deleted)
+def remove_repo_from_index(sender, **kwargs):
+    try:
+        RepoIndex.objects.remove_repo(kwargs['repo_id'])
+    except Exception as e:
+        logger.error('Failed to remove repo %s from index: %s' % (
+            kwargs['repo_id'], e))
+
+@receiver(repo_transferred)
+def update_repo_owner_in_index(sender, **kwargs):
+    try:
+        RepoIndex.objects.update_repo_owner(kwargs['repo_id'],
+                                            kwargs['to_user'])
+    except Exception as e:
+        logger.error('Failed to update owner of repo %s in index: %s' % (
+            kwargs['repo_id'], e))
@@ -0,0 +1,183 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Session engine which serves sessions from cache, and writes them to
+database behind.
+
+It is not enabled by default. Set
+``SESSION_ENGINE = 'seahub.base.sessions'`` to use it, only with a cache
+shared by all seahub nodes (e.g. memcached) which does not evict sessions
+early, since changes not yet written to database are only kept there.
+
+* Sessions are read from the cache of ``SESSION_CACHE_ALIAS``, and only
+  read from database when missing there.
+* New sessions are inserted to database right away, and so are changes of
+  login state (login, logout or a cycled session key). Other changes go to
+  cache at once, and to database in batches by a thread of each process
+  (see ``seahub.utils.batch_writer``). Batched writes only update existing
+  rows, so they can not bring back a deleted session.
+* Saving a session whose data is not changed only refreshes its expiry if
+  that was done more than ``SESSION_TOUCH_INTERVAL`` seconds ago.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as \
+    CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.contrib.sessions.models import Session
+from django.core.exceptions import SuspiciousOperation
+from django.db import transaction
+from django.utils import timezone
+from django.utils.encoding import force_text
+
+from seahub.auth import SESSION_KEY, BACKEND_SESSION_KEY
+from seahub.utils.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'seahub.sessions.'
+
+SESSION_TOUCH_INTERVAL = getattr(settings, 'SESSION_TOUCH_INTERVAL', 5 * 60)
+SESSION_WRITE_BATCH_SIZE = getattr(settings, 'SESSION_WRITE_BATCH_SIZE', 100)
+SESSION_WRITE_INTERVAL = getattr(settings, 'SESSION_WRITE_INTERVAL', 10)
+
+def _write_sessions(items):
+    with transaction.atomic():
+        for session_key, session_data, expire_date in items:
+            Session.objects.filter(session_key=session_key).update(
+                session_data=session_data, expire_date=expire_date)
+
+session_writer = BatchWriter(_write_sessions,
+                             batch_size=SESSION_WRITE_BATCH_SIZE,
+                             flush_interval=SESSION_WRITE_INTERVAL,
+                             background=True)
+
+def _auth_state(data):
+    return (data.get(SESSION_KEY), data.get(BACKEND_SESSION_KEY))
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super(SessionStore, self).__init__(session_key)
+        # whether the session is known to be in database
+        self._persisted = False
+        self._loaded_data = None
+        self._loaded_expire = None
+        self._loaded_auth = None
+        # whether next save must be written to database right away
+        self._write_through = False
+
+    @property
+    def cache_key(self):
+        return KEY_PREFIX + self._get_or_create_session_key()
+
+    def _dump(self, data):
+        return self.serializer().dumps(data)
+
+    def _cache_set(self, data, expire):
+        # stored with expire time, to tell when it needs to be refreshed
+        self._cache.set(self.cache_key, (data, expire),
+                        max(int(expire - time.time()), 1))
+        self._loaded_data = self._dump(data)
+        self._loaded_expire = expire
+        self._loaded_auth = _auth_state(data)
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends (e.g. memcache) raise an exception on invalid
+            # cache keys. If this happens, reset the session.
+            entry = None
+
+        if entry is not None:
+            data, expire = entry
+            self._persisted = True
+            self._loaded_data = self._dump(data)
+            self._loaded_expire = expire
+            self._loaded_auth = _auth_state(data)
+            return data
+
+        try:
+            s = Session.objects.get(session_key=self.session_key,
+                                    expire_date__gt=timezone.now())
+            data = self.decode(s.session_data)
+        except (Session.DoesNotExist, SuspiciousOperation) as e:
+            if isinstance(e, SuspiciousOperation):
+                logger.warning(force_text(e))
+            self._session_key = None
+            return {}
+
+        self._persisted = True
+        self._cache_set(data, time.time() + self.get_expiry_age(
+            expiry=s.expire_date))
+        return data
+
+    def exists(self, session_key):
+        if session_key and (KEY_PREFIX + session_key) in self._cache:
+            return True
+        return DBStore.exists(self, session_key)
+
+    def save(self, must_create=False):
+        data = self._get_session(no_load=must_create)
+        expire = time.time() + self.get_expiry_age()
+
+        if must_create or not self._persisted or self.session_key is None \
+           or self._write_through or _auth_state(data) != self._loaded_auth:
+            # login state must be seen by all nodes at once, and survive
+            # losing the cache entry
+            DBStore.save(self, must_create=must_create)
+            session_writer.discard(self.session_key)
+            self._persisted = True
+            self._write_through = False
+        else:
+            if self._dump(data) == self._loaded_data and \
+               self._loaded_expire is not None and \
+               expire - self._loaded_expire < SESSION_TOUCH_INTERVAL:
+                # not changed, and expiry was refreshed recently
+                return
+
+            session_writer.put((self.session_key, self.encode(data),
+                                self.get_expiry_date()),
+                               key=self.session_key)
+
+        self._cache_set(data, expire)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+
+        session_writer.discard(session_key)
+        DBStore.delete(self, session_key)
+        self._cache.delete(KEY_PREFIX + session_key)
+        if session_key == self.session_key:
+            self._persisted = False
+
+    def cycle_key(self):
+        super(SessionStore, self).cycle_key()
+        self._write_through = True
+
+    @classmethod
+    def clear_expired(cls):
+        clear_expired_sessions()
+
+def clear_expired_sessions(batch_size=1000, sleep=0):
+    """Delete expired sessions from database, ``batch_size`` rows at a time.
+    Return number of deleted sessions.
+    """
+    count = 0
+    while True:
+        keys = list(Session.objects.filter(
+            expire_date__lt=timezone.now()).values_list(
+                'session_key', flat=True)[:batch_size])
+        if not keys:
+            break
+
+        Session.objects.filter(session_key__in=keys).delete()
+        count += len(keys)
+        if len(keys) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+    return count
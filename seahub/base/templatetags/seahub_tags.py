@@ -23,6 +23,7 @@ from seahub.cconvert import CConvert
 from seahub.po import TRANSLATION_MAP
 from seahub.shortcuts import get_first_object_or_none
 from seahub.utils import normalize_cache_key, CMMT_DESC_PATT
+from seahub.utils.content_cache import LocalLRUCache
 from seahub.utils.html import avoid_wrapping
 from seahub.utils.file_size import get_file_size_unit
 
@@ -150,7 +151,33 @@ COMMIT_MSG_TRANSLATION_MAP = {
     'Moved directory' : _('Moved directory'),
     'Added or modified' : _('Added or modified'),
 }
+# Commit description has two forms, e.g., 'Added "foo.txt" and 3 more files.' or 'Added "foo.txt".'
+COMMIT_MSG_PATT = re.compile(r'(%s) "(.*)"\s?(and ([0-9]+) more (files|directories))?' % \
+                             '|'.join(COMMIT_MSG_TRANSLATION_MAP.keys()))
+REVERTED_FILE_PATT = re.compile('Reverted file "(.*)" to status at (.*)')
+
+# Commit descriptions never change, so translations are kept in process,
+# bounded by total length of descriptions.
+COMMIT_DESC_TRANSLATION_CACHE_SIZE = 4 * 1024 * 1024
+_commit_desc_translations = LocalLRUCache(COMMIT_DESC_TRANSLATION_CACHE_SIZE)
+
+def memoize_commit_desc_translation(func):
+    def wrapped(value):
+        if not isinstance(value, basestring):
+            return func(value)
+
+        key = (func.__name__, translation.get_language(), value)
+        ret = _commit_desc_translations.get(key)
+        if ret is None:
+            ret = func(value)
+            _commit_desc_translations.set(key, ret, len(value))
+        return ret
+    wrapped.__name__ = func.__name__
+    wrapped.__doc__ = func.__doc__
+    return wrapped
+
 @register.filter(name='translate_commit_desc')
+@memoize_commit_desc_translation
 def translate_commit_desc(value):
     """Translate commit description."""
     if value.startswith('Reverted repo'):
@@ -168,7 +195,7 @@ def translate_commit_desc(value):
         def repl(matchobj):
             return _('Reverted file "%(file)s" to status at %(time)s.') % \
                 {'file':matchobj.group(1), 'time':matchobj.group(2)}
-        return re.sub('Reverted file "(.*)" to status at (.*)', repl, value)
+        return REVERTED_FILE_PATT.sub(repl, value)
     elif value.startswith('Recovered deleted directory'):
         return value.replace('Recovered deleted directory', _('Recovered deleted directory'))
     elif value.startswith('Changed library'):
@@ -177,16 +204,12 @@ def translate_commit_desc(value):
         return _('Auto merge by seafile system')
     else:
         # Use regular expression to translate commit description.
-        # Commit description has two forms, e.g., 'Added "foo.txt" and 3 more files.' or 'Added "foo.txt".'
-        operations = '|'.join(COMMIT_MSG_TRANSLATION_MAP.keys())
-        patt = r'(%s) "(.*)"\s?(and ([0-9]+) more (files|directories))?' % operations
-
         ret_list = []
         for e in value.split('\n'):
             if not e:
                 continue
 
-            m = re.match(patt, e)
+            m = COMMIT_MSG_PATT.match(e)
             if not m:
                 ret_list.append(e)
                 continue
@@ -213,6 +236,7 @@ def translate_commit_desc(value):
         return '\n'.join(ret_list)
 
 @register.filter(name='translate_commit_desc_escape')
+@memoize_commit_desc_translation
 def translate_commit_desc_escape(value):
     """Translate commit description."""
     if value.startswith('Reverted repo'):
@@ -227,7 +251,7 @@ def translate_commit_desc_escape(value):
         for e in value.split('\n'):
             # if not match, this commit desc will not convert link, so
             # escape it
-            ret = e if re.search(CMMT_DESC_PATT, e) else escape(e)
+            ret = e if CMMT_DESC_PATT.search(e) else escape(e)
             ret_list.append(ret)
         return '\n'.join(ret_list)
 
@@ -237,7 +261,7 @@ def translate_commit_desc_escape(value):
         def repl(matchobj):
             return _('Reverted file "%(file)s" to status at %(time)s.') % \
                 {'file':matchobj.group(1), 'time':matchobj.group(2)}
-        return_value = escape(re.sub('Reverted file "(.*)" to status at (.*)', repl, value))
+        return_value = escape(REVERTED_FILE_PATT.sub(repl, value))
     elif value.startswith('Recovered deleted directory'):
         return_value = escape(value.replace('Recovered deleted directory', _('Recovered deleted directory')))
     elif value.startswith('Changed library'):
@@ -246,15 +270,11 @@ def translate_commit_desc_escape(value):
         return_value = escape(_('Auto merge by seafile system'))
     else:
         # Use regular expression to translate commit description.
-        # Commit description has two forms, e.g., 'Added "foo.txt" and 3 more files.' or 'Added "foo.txt".'
-        operations = '|'.join(COMMIT_MSG_TRANSLATION_MAP.keys())
-        patt = r'(%s) "(.*)"\s?(and ([0-9]+) more (files|directories))?' % operations
-
         for e in value.split('\n'):
             if not e:
                 continue
 
-            m = re.match(patt, e)
+            m = COMMIT_MSG_PATT.match(e)
             if not m:
                 # if not match, this commit desc will not convert link, so
                 # escape it
@@ -281,7 +301,7 @@ def translate_commit_desc_escape(value):
 
             # if not match, this commit desc will not convert link, so
             # escape it
-            ret = ret if re.search(CMMT_DESC_PATT, e) else escape(ret)
+            ret = ret if CMMT_DESC_PATT.search(e) else escape(ret)
             ret_list.append(ret)
 
         return_value = '\n'.join(ret_list)
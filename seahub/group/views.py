@@ -329,7 +329,7 @@ def group_wiki(request, group, page_name="home"):
         index_pagename = 'index'
         index_content = None
         try:
-            index_content, index_repo, index_dirent = get_group_wiki_page(username, group, index_pagename)
+            index_content, index_repo, index_dirent = get_group_wiki_page(username, group, index_pagename, repo)
         except (WikiDoesNotExist, WikiPageMissing) as e:
             wiki_index_exists = False
 
@@ -1,4 +1,9 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
+import datetime
+import os
+import threading
+import time
+
 import settings
 
 if not hasattr(settings, 'EVENTS_CONFIG_FILE'):
@@ -7,10 +12,67 @@ if not hasattr(settings, 'EVENTS_CONFIG_FILE'):
 
     def repo_deleted_cb(sender, **kwargs):
         pass
-else:        
+else:
+    EVENTS_WRITE_BATCH_SIZE = getattr(settings, 'EVENTS_WRITE_BATCH_SIZE', 100)
+    EVENTS_WRITE_INTERVAL = getattr(settings, 'EVENTS_WRITE_INTERVAL', 2)
+    EVENTS_MAX_PENDING = getattr(settings, 'EVENTS_MAX_PENDING', 1000)
+
+    # seafevents and seahub.utils are imported on first event, since this
+    # module is loaded with the seahub package by every process.
+
+    def save_events(items):
+        """Write repo events queued by ``add_event`` with one session.
+        """
+        import seafevents
+        from utils import SeafEventsSession
+
+        session = SeafEventsSession()
+        try:
+            for item in items:
+                timestamp = datetime.datetime.utcfromtimestamp(
+                    item['timestamp'])
+                if item['org_id'] > 0:
+                    seafevents.save_org_user_events(
+                        session, item['org_id'], item['etype'],
+                        item['detail'], item['users'], timestamp)
+                else:
+                    seafevents.save_user_events(
+                        session, item['etype'], item['detail'],
+                        item['users'], timestamp)
+        finally:
+            session.close()
 
-    import seafevents
-    from utils import SeafEventsSession
+    _event_writer = None
+    _event_writer_lock = threading.Lock()
+
+    def get_event_writer():
+        """Events are written by a thread of each process, so requests do not
+        wait for them. They are journaled in the spool until written, so
+        events of a killed process are written by ``drain_spools`` command.
+        """
+        global _event_writer
+        if _event_writer is None:
+            with _event_writer_lock:
+                if _event_writer is None:
+                    from utils.batch_writer import BatchWriter
+                    from utils.spool import Spool
+
+                    _event_writer = BatchWriter(
+                        save_events, batch_size=EVENTS_WRITE_BATCH_SIZE,
+                        flush_interval=EVENTS_WRITE_INTERVAL,
+                        max_pending=EVENTS_MAX_PENDING, background=True,
+                        spool=Spool(os.path.join(settings.SPOOL_DIR,
+                                                 'events')))
+        return _event_writer
+
+    def add_event(org_id, etype, detail, users):
+        get_event_writer().put({
+            'org_id': org_id,
+            'etype': etype,
+            'detail': detail,
+            'users': list(users),
+            'timestamp': time.time(),
+        })
 
     def repo_created_cb(sender, **kwargs):
         org_id  = kwargs['org_id']
@@ -27,12 +89,7 @@ else:
 
         users = [creator]
 
-        session = SeafEventsSession()
-        if org_id > 0:
-            seafevents.save_org_user_events (session, org_id, etype, detail, users, None)
-        else:
-            seafevents.save_user_events (session, etype, detail, users, None)
-        session.close()
+        add_event(org_id, etype, detail, users)
 
     def repo_deleted_cb(sender, **kwargs):
         """When a repo is deleted, an event would be added to every user in all
@@ -55,9 +112,4 @@ else:
 
         users = usernames
 
-        session = SeafEventsSession()
-        if org_id > 0:
-            seafevents.save_org_user_events (session, org_id, etype, detail, users, None)
-        else:
-            seafevents.save_user_events (session, etype, detail, users, None)
-        session.close()
+        add_event(org_id, etype, detail, users)
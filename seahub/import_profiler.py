@@ -0,0 +1,110 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Report time spent importing each module during startup.
+
+Set ``SEAHUB_PROFILE_IMPORTS=1`` in environment to enable it, e.g.::
+
+    SEAHUB_PROFILE_IMPORTS=1 python manage.py help
+
+It is installed when the ``seahub`` package is imported, and the slowest
+``SEAHUB_PROFILE_IMPORTS_TOP`` (default 30) modules are printed to stderr
+when the WSGI application is loaded, or at exit. ``total`` time of a module
+includes modules imported by it, ``self`` time does not.
+
+Only uses standard library, so that it does not import what it measures.
+"""
+import __builtin__
+import atexit
+import os
+import sys
+import threading
+import time
+
+_original_import = None
+_start_time = None
+_reported = False
+_local = threading.local()
+
+# module name => [total seconds, self seconds]
+_stats = {}
+
+def is_enabled():
+    return os.environ.get('SEAHUB_PROFILE_IMPORTS', '') not in ('', '0')
+
+def _candidate_names(name, globals_, level):
+    names = [name]
+    if level != 0 and globals_:
+        # relative import, e.g. ``import settings`` in seahub
+        package = globals_.get('__package__')
+        if not package:
+            package = globals_.get('__name__', '')
+            if '__path__' not in globals_:
+                package = package.rpartition('.')[0]
+        if package:
+            names.insert(0, package + '.' + name)
+    return names
+
+def _profiled_import(name, globals=None, locals=None, fromlist=None,
+                     level=-1):
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    names = _candidate_names(name, globals, level)
+    loaded = [n for n in names if sys.modules.get(n) is not None]
+    start = time.time()
+    stack.append(0.0)           # time spent in nested imports
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.time() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        for n in names:
+            # only count imports which load the module
+            if n not in loaded and sys.modules.get(n) is not None:
+                stat = _stats.setdefault(n, [0, 0])
+                stat[0] += elapsed
+                stat[1] += elapsed - children
+                break
+
+def install():
+    global _original_import, _start_time
+    if _original_import is not None:
+        return
+    _original_import = __builtin__.__import__
+    _start_time = time.time()
+    __builtin__.__import__ = _profiled_import
+    atexit.register(report)
+
+def uninstall():
+    global _original_import
+    if _original_import is None:
+        return
+    __builtin__.__import__ = _original_import
+    _original_import = None
+
+def get_import_times(n=None):
+    """Return list of ``(module name, total seconds, self seconds)``,
+    slowest first.
+    """
+    times = sorted([(name, total, self_) for name, (total, self_)
+                    in _stats.items()], key=lambda x: x[1], reverse=True)
+    return times[:n] if n is not None else times
+
+def report(out=None):
+    """Print slowest imports, only once per process.
+    """
+    global _reported
+    if _reported or _start_time is None:
+        return
+    _reported = True
+
+    out = out or sys.stderr
+    n = int(os.environ.get('SEAHUB_PROFILE_IMPORTS_TOP', 30))
+    out.write('%-60s %10s %10s\n' % ('module', 'total(ms)', 'self(ms)'))
+    for name, total, self_ in get_import_times(n):
+        out.write('%-60s %10.1f %10.1f\n' % (name, total * 1000,
+                                             self_ * 1000))
+    out.write('%d modules imported in %.1f ms since seahub was loaded.\n' % (
+        len(_stats), (time.time() - _start_time) * 1000))
@@ -0,0 +1,248 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import csv
+import logging
+import StringIO
+
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+
+import seaserv
+from pysearpc import SearpcError
+
+from seahub.base.accounts import User
+from seahub.base.templatetags.seahub_tags import email2nickname
+from seahub.jobs.models import BackgroundJob, STATUS_RUNNING, STATUS_DONE, \
+    STATUS_FAILED
+from seahub.jobs.settings import JOB_BATCH_SIZE, JOB_INLINE_MAX_ROWS
+from seahub.settings import SITE_NAME
+from seahub.utils import is_valid_username
+from seahub.utils.mail import send_html_email_with_dj_template
+from seahub.utils.threadpool import run_concurrently
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+JOB_BATCH_ADD_USER = 'batch_add_user'
+JOB_GROUP_MEMBERS_IMPORT = 'group_members_import'
+
+JOB_HANDLERS = {}
+
+def register_job_handler(job_type):
+    def _register(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return _register
+
+def iter_csv_batches(content, batch_size=JOB_BATCH_SIZE, skip=0):
+    """Yield non-empty rows of CSV ``content`` in lists of ``batch_size``,
+    after the first ``skip`` ones.
+    """
+    batch = []
+    for row in csv.reader(StringIO.StringIO(content)):
+        if not row:
+            continue
+        if skip > 0:
+            skip -= 1
+            continue
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def count_csv_rows(content):
+    return sum(1 for row in csv.reader(StringIO.StringIO(content)) if row)
+
+def _get_existing_emails(emails):
+    """Return those of ``emails`` which are DB or LDAP users. ccnet can not
+    look up a list of users at once, so they are looked up concurrently.
+    """
+    emails = list(set(emails))
+    users = run_concurrently(seaserv.ccnet_threaded_rpc.get_emailuser, emails)
+    return set([e for e, u in zip(emails, users) if u])
+
+def _get_org_members(org_id, emails):
+    """Return those of ``emails`` which are users of organization ``org_id``.
+    """
+    emails = list(emails)
+    exists = run_concurrently(
+        lambda e: seaserv.ccnet_threaded_rpc.org_user_exists(org_id, e),
+        emails)
+    return set([e for e, r in zip(emails, exists) if r])
+
+class _RowProgress(object):
+    """Progress of rows of a batch not saved to the job yet.
+
+    Failed rows are saved with the batch, but each succeeded row is saved at
+    once, so a job resumed after a crash does not process it again.
+    """
+    def __init__(self, job, result):
+        self.job = job
+        self.result = result
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def fail(self, item):
+        self.processed += 1
+        self.failed += 1
+        self.result['failed'].append(item)
+
+    def succeed(self, success=None):
+        self.processed += 1
+        self.succeeded += 1
+        if success is not None:
+            self.result['success'].append(success)
+        self.save()
+
+    def save(self):
+        if self.processed == 0:
+            return
+        self.job.update_progress(self.processed, self.succeeded, self.failed,
+                                 self.result)
+        self.processed = self.succeeded = self.failed = 0
+
+def run_job(job):
+    """Run a claimed job with its handler, and record final status.
+    """
+    handler = JOB_HANDLERS.get(job.job_type)
+    if handler is None:
+        logger.error('No handler for job type: %s' % job.job_type)
+        job.status = STATUS_FAILED
+    else:
+        try:
+            handler(job)
+            job.status = STATUS_DONE
+        except Exception as e:
+            logger.exception(e)
+            job.status = STATUS_FAILED
+
+    # Uploaded content may contain passwords, do not keep it.
+    job.clear_data()
+    job.updated_at = timezone.now()
+    job.save()
+
+def submit_job(job_type, created_by, params=None, data=''):
+    """Queue a job to be run by ``manage.py run_background_jobs``.
+
+    Small jobs (no more than ``JOB_INLINE_MAX_ROWS`` rows) are run at once in
+    current request. Return the job.
+    """
+    if count_csv_rows(data) <= JOB_INLINE_MAX_ROWS:
+        job = BackgroundJob.objects.add_job(job_type, created_by, params,
+                                            data, status=STATUS_RUNNING)
+        run_job(job)
+        return job
+
+    return BackgroundJob.objects.add_job(job_type, created_by, params, data)
+
+@register_job_handler(JOB_BATCH_ADD_USER)
+def batch_add_user(job):
+    """Create users from CSV rows of ``email,password``, and queue an
+    invitation email to each new user.
+    """
+    inviter = email2nickname(job.created_by)
+
+    content = job.get_data()
+    job.total = count_csv_rows(content)
+    result = job.get_result()
+    result.setdefault('failed', [])
+    # rows processed before worker was restarted are skipped
+    for rows in iter_csv_batches(content, skip=job.processed):
+        progress = _RowProgress(job, result)
+        existing_emails = _get_existing_emails([r[0].strip() for r in rows])
+        for row in rows:
+            username = row[0].strip()
+            password = row[1].strip() if len(row) > 1 else ''
+
+            if not is_valid_username(username):
+                progress.fail({'email': username,
+                               'error_msg': _(u'Invalid email')})
+                continue
+
+            if password == '':
+                progress.fail({'email': username,
+                               'error_msg': _(u'Password can not be empty')})
+                continue
+
+            if username in existing_emails:
+                progress.fail({
+                    'email': username,
+                    'error_msg': _(u'User %s already exists.') % username})
+                continue
+
+            User.objects.create_user(username, password, is_staff=False,
+                                     is_active=True)
+            existing_emails.add(username)
+
+            # Mails are queued, and sent by ``manage.py send_queued_mail``.
+            send_html_email_with_dj_template(
+                username, dj_template='sysadmin/user_batch_add_email.html',
+                subject=_(u'You are invited to join %s') % SITE_NAME,
+                context={
+                    'user': inviter,
+                    'email': username,
+                    'password': password,
+                })
+            progress.succeed()
+
+        progress.save()
+
+@register_job_handler(JOB_GROUP_MEMBERS_IMPORT)
+def group_members_import(job):
+    """Add users in CSV rows to a group, ``group_id`` and optional ``org_id``
+    are passed in job params.
+    """
+    params = job.get_params()
+    group_id = params['group_id']
+    org_id = params.get('org_id', None)
+
+    group_members = set([m.user_name for m in
+                         seaserv.get_group_members(group_id)])
+    content = job.get_data()
+    job.total = count_csv_rows(content)
+    result = job.get_result()
+    result.setdefault('failed', [])
+    result.setdefault('success', [])
+    for rows in iter_csv_batches(content, skip=job.processed):
+        progress = _RowProgress(job, result)
+        emails = [r[0].strip().lower() for r in rows]
+        existing_emails = _get_existing_emails(emails)
+        if org_id:
+            org_members = _get_org_members(org_id, existing_emails)
+        for row in rows:
+            email = row[0].strip().lower()
+
+            if email not in existing_emails:
+                progress.fail({
+                    'email': email,
+                    'error_msg': 'User %s not found.' % email})
+                continue
+
+            if email in group_members:
+                progress.fail({
+                    'email': email,
+                    'error_msg': _(u'User %s is already a group member.') % email})
+                continue
+
+            # Can only invite organization users to group
+            if org_id and email not in org_members:
+                progress.fail({
+                    'email': email,
+                    'error_msg': _(u'User %s not found in organization.') % email})
+                continue
+
+            try:
+                seaserv.ccnet_threaded_rpc.group_add_member(
+                    group_id, job.created_by, email)
+            except SearpcError as e:
+                logger.error(e)
+                progress.fail({'email': email,
+                               'error_msg': 'Internal Server Error'})
+                continue
+
+            group_members.add(email)
+            progress.succeed(success=email)
+
+        progress.save()
@@ -0,0 +1,39 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import logging
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from seahub.jobs.handlers import run_job
+from seahub.jobs.models import BackgroundJob
+from seahub.jobs.settings import JOB_POLL_INTERVAL
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs, e.g. batch user imports.'
+    label = "jobs_run_background_jobs"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--once', action='store_true', dest='once', default=False,
+                    help='Run queued jobs and exit when the queue is empty.'),
+        make_option('--interval', dest='interval', type='int',
+                    default=JOB_POLL_INTERVAL,
+                    help='Seconds to sleep when there is no queued job.'),
+    )
+
+    def handle(self, *args, **options):
+        logger.debug('Start running background jobs...')
+        while True:
+            job = BackgroundJob.objects.claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            logger.info('Run job %s(%s)' % (job.pk, job.job_type))
+            run_job(job)
+        logger.debug('Finish running background jobs.\n')
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='backgroundjob',
+            name='data',
+        ),
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='data_file',
+            field=models.CharField(default='', max_length=255, blank=True),
+        ),
+    ]
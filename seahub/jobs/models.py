@@ -0,0 +1,167 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import errno
+import json
+import os
+import uuid
+from datetime import timedelta
+
+from django.db import models
+from django.utils import timezone
+
+from seahub.base.fields import LowerCaseCharField
+from seahub.jobs.settings import JOB_MAX_RESULT_ITEMS, JOB_STALE_TIMEOUT, \
+    JOB_DATA_DIR
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+def _write_data_file(data):
+    try:
+        os.makedirs(JOB_DATA_DIR, 0700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+    name = uuid.uuid4().hex + '.csv'
+    fd = os.open(os.path.join(JOB_DATA_DIR, name),
+                 os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(data)
+    return name
+
+class BackgroundJobManager(models.Manager):
+    def add_job(self, job_type, created_by, params=None, data='',
+                status=STATUS_QUEUED):
+        """Add a job with uploaded content ``data``. Content of a queued job
+        is written to a file in ``JOB_DATA_DIR``, never to database, since
+        it may contain passwords. A job run at once keeps it in memory.
+        """
+        job = self.model(job_type=job_type, created_by=created_by,
+                         params=json.dumps(params or {}), status=status)
+        if status == STATUS_QUEUED:
+            if data:
+                job.data_file = _write_data_file(data)
+        else:
+            job._data = data
+        job.save(using=self._db)
+        return job
+
+    def claim_next_job(self):
+        """Mark the oldest queued job as running and return it, or ``None``
+        if there is no queued job.
+
+        The status update is conditional, so that a job is claimed by only
+        one of several workers. Running jobs not updated for
+        ``JOB_STALE_TIMEOUT`` seconds are queued again first.
+        """
+        self.requeue_stale_jobs()
+        while True:
+            job = super(BackgroundJobManager, self).filter(
+                status=STATUS_QUEUED).order_by('id').first()
+            if job is None:
+                return None
+
+            claimed = super(BackgroundJobManager, self).filter(
+                id=job.id, status=STATUS_QUEUED).update(
+                    status=STATUS_RUNNING, updated_at=timezone.now())
+            if claimed:
+                job.status = STATUS_RUNNING
+                return job
+
+    def requeue_stale_jobs(self):
+        """Queue running jobs left by a crashed worker again, they continue
+        from the last finished batch. Return number of them.
+        """
+        stale_before = timezone.now() - timedelta(seconds=JOB_STALE_TIMEOUT)
+        return super(BackgroundJobManager, self).filter(
+            status=STATUS_RUNNING, updated_at__lt=stale_before).update(
+                status=STATUS_QUEUED, updated_at=timezone.now())
+
+class BackgroundJob(models.Model):
+    """A job queued by a request and run by ``manage.py run_background_jobs``,
+    e.g. importing users from an uploaded CSV file.
+    """
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'queued'),
+        (STATUS_RUNNING, 'running'),
+        (STATUS_DONE, 'done'),
+        (STATUS_FAILED, 'failed'),
+    )
+
+    job_type = models.CharField(max_length=50)
+    created_by = LowerCaseCharField(max_length=255, db_index=True)
+    params = models.TextField(default='{}')
+    # Name of file in ``JOB_DATA_DIR`` of uploaded content, removed when job
+    # finished.
+    data_file = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=STATUS_QUEUED, db_index=True)
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    result = models.TextField(default='{}')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    objects = BackgroundJobManager()
+
+    def get_params(self):
+        return json.loads(self.params)
+
+    def get_result(self):
+        return json.loads(self.result)
+
+    def get_data(self):
+        """Return uploaded content of the job.
+        """
+        data = getattr(self, '_data', None)
+        if data is None:
+            if not self.data_file:
+                return ''
+            with open(os.path.join(JOB_DATA_DIR, self.data_file)) as f:
+                data = f.read()
+            self._data = data
+        return data
+
+    def clear_data(self):
+        """Remove uploaded content, should be called when job finished.
+        """
+        self._data = None
+        if self.data_file:
+            try:
+                os.remove(os.path.join(JOB_DATA_DIR, self.data_file))
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+            self.data_file = ''
+
+    def update_progress(self, processed, succeeded, failed, result=None):
+        """Add counts of a finished batch and save.
+        """
+        self.processed += processed
+        self.succeeded += succeeded
+        self.failed += failed
+        if result is not None:
+            for k, v in result.items():
+                if isinstance(v, list):
+                    result[k] = v[:JOB_MAX_RESULT_ITEMS]
+            self.result = json.dumps(result)
+        self.updated_at = timezone.now()
+        self.save()
+
+    def is_finished(self):
+        return self.status in (STATUS_DONE, STATUS_FAILED)
+
+    def to_dict(self):
+        return {
+            'id': self.pk,
+            'job_type': self.job_type,
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'result': self.get_result(),
+        }
@@ -0,0 +1,21 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+from django.conf import settings
+
+# Number of CSV rows validated and processed in one batch.
+JOB_BATCH_SIZE = getattr(settings, 'JOB_BATCH_SIZE', 500)
+
+# Imports with no more rows than this are processed inside the request.
+JOB_INLINE_MAX_ROWS = getattr(settings, 'JOB_INLINE_MAX_ROWS', 100)
+
+# Max number of succeeded/failed rows kept in job result.
+JOB_MAX_RESULT_ITEMS = getattr(settings, 'JOB_MAX_RESULT_ITEMS', 1000)
+
+# Seconds a worker sleeps when there is no queued job.
+JOB_POLL_INTERVAL = getattr(settings, 'JOB_POLL_INTERVAL', 5)
+
+# Running jobs without progress for this many seconds are considered left
+# by a crashed worker, and queued again.
+JOB_STALE_TIMEOUT = getattr(settings, 'JOB_STALE_TIMEOUT', 30 * 60)
+
+# Directory of uploaded content of queued jobs, only readable by seahub.
+JOB_DATA_DIR = settings.JOB_DATA_DIR
@@ -0,0 +1,9 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+from django.conf.urls import patterns, url
+
+from .views import job_progress
+
+urlpatterns = patterns(
+    '',
+    url(r'^(?P<job_id>\d+)/progress/$', job_progress, name='job_progress'),
+)
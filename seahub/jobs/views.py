@@ -0,0 +1,26 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import json
+
+from django.http import HttpResponse
+
+from seahub.auth.decorators import login_required_ajax
+from seahub.jobs.models import BackgroundJob
+
+@login_required_ajax
+def job_progress(request, job_id):
+    """Return progress of a background job, only job creator and system admin
+    can see it.
+    """
+    content_type = 'application/json; charset=utf-8'
+
+    try:
+        job = BackgroundJob.objects.get(pk=job_id)
+    except BackgroundJob.DoesNotExist:
+        return HttpResponse(json.dumps({'error': 'Job not found.'}),
+                            status=404, content_type=content_type)
+
+    if job.created_by != request.user.username and not request.user.is_staff:
+        return HttpResponse(json.dumps({'error': 'Permission denied.'}),
+                            status=403, content_type=content_type)
+
+    return HttpResponse(json.dumps(job.to_dict()), content_type=content_type)
@@ -8,7 +8,6 @@ from django.shortcuts import render_to_response
 from django.template.loader import render_to_string
 from django.core.urlresolvers import reverse
 from django.template import RequestContext
-from django.core.paginator import EmptyPage, InvalidPage
 from django.utils.translation import ugettext as _
 
 from models import UserMessage, UserMsgAttachment
@@ -19,7 +18,7 @@ from seahub.base.decorators import user_mods_check
 from seahub.views import is_registered_user
 from seahub.share.models import PrivateFileDirShare
 from seahub.utils import is_valid_username
-from seahub.utils.paginator import Paginator
+from seahub.utils.paginator import KeysetPaginator
 from seahub.notifications.models import UserNotification
 
 @login_required
@@ -65,42 +64,31 @@ def user_msg_list(request, id_or_email):
         return HttpResponseRedirect(reverse('edit_profile'))
 
     msgs = UserMessage.objects.get_messages_between_users(username, to_email)
-    if msgs:
-        # update ``ifread`` field of messages
-        UserMessage.objects.update_unread_messages(to_email, username)
-
-        attachments = UserMsgAttachment.objects.list_attachments_by_user_msgs(msgs)
-        for msg in msgs:
-            msg.attachments = []
-            for att in attachments:
-                if att.user_msg != msg:
-                    continue
-
-                pfds = att.priv_file_dir_share
-                if pfds is None: # in case that this attachment is unshared.
-                    continue
-
-                att.repo_id = pfds.repo_id
-                att.path = pfds.path
-                att.name = os.path.basename(pfds.path.rstrip('/'))
-                att.token = pfds.token
-                msg.attachments.append(att) 
+
+    # update ``ifread`` field of messages
+    UserMessage.objects.update_unread_messages(to_email, username)
 
     '''paginate'''
-    paginator = Paginator(msgs, 15)
-    # Make sure page request is an int. If not, deliver first page.
-    try:
-        page = int(request.GET.get('page', '1'))
-    except ValueError:
-        page = 1
+    paginator = KeysetPaginator(msgs, 15)
+    person_msgs = paginator.page(before=request.GET.get('before'),
+                                 after=request.GET.get('after'))
+
+    # Only load attachments of messages in current page.
+    attachments = UserMsgAttachment.objects.list_attachments_by_user_msgs(
+        person_msgs.object_list).select_related('priv_file_dir_share')
+    for msg in person_msgs.object_list:
+        msg.attachments = []
+    msgs_dict = dict([(msg.pk, msg) for msg in person_msgs.object_list])
+    for att in attachments:
+        pfds = att.priv_file_dir_share
+        if pfds is None: # in case that this attachment is unshared.
+            continue
 
-    # If page request (9999) is out of range, deliver last page of results.
-    try:
-        person_msgs = paginator.page(page)
-    except (EmptyPage, InvalidPage):
-        person_msgs = paginator.page(paginator.num_pages)
-    person_msgs.page_range = paginator.get_page_range(person_msgs.number)
-    person_msgs.object_list = list(person_msgs.object_list)
+        att.repo_id = pfds.repo_id
+        att.path = pfds.path
+        att.name = os.path.basename(pfds.path.rstrip('/'))
+        att.token = pfds.token
+        msgs_dict[att.user_msg_id].attachments.append(att)
 
     UserNotification.objects.seen_user_msg_notices(username, to_email)
     return render_to_response("message/user_msg_list.html", {
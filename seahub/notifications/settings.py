@@ -1,4 +1,4 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
 from django.conf import settings
 
-NOTIFICATION_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_CACHE_TIMEOUT', 0)
+NOTIFICATION_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_CACHE_TIMEOUT', 24 * 60 * 60)
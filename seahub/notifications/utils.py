@@ -6,7 +6,10 @@ from seahub.notifications.settings import NOTIFICATION_CACHE_TIMEOUT
 def refresh_cache():
     """
     Function to be called when change primary notification.
+
+    Return the list of primary notifications, an empty list is also cached.
     """
-    cache.set('CUR_TOPINFO', Notification.objects.all().filter(primary=1),
-              NOTIFICATION_CACHE_TIMEOUT)
-    
+    notes = list(Notification.objects.all().filter(primary=1))
+    cache.set('CUR_TOPINFO', notes, NOTIFICATION_CACHE_TIMEOUT)
+    return notes
+
@@ -19,6 +19,7 @@ from utils import refresh_cache
 from seahub.auth.decorators import login_required
 from seahub.utils import is_org_context, is_pro_version, is_valid_username
 from seahub.base.accounts import User
+from seahub.base.middleware import clear_org_membership_cache
 from seahub.base.templatetags.seahub_tags import email2nickname
 from seahub.contacts.models import Contact
 from seahub.options.models import UserOptions, CryptoOptionNotSetError
@@ -183,6 +184,7 @@ def delete_user_account(request):
     if is_org_context(request):
         org_id = request.user.org.org_id
         seaserv.ccnet_threaded_rpc.remove_org_user(org_id, username)
+        clear_org_membership_cache()
 
     return HttpResponseRedirect(settings.LOGIN_URL)
 
@@ -108,6 +108,7 @@ TEMPLATE_LOADERS = (
 
 # Order is important
 MIDDLEWARE_CLASSES = (
+    'seahub.base.middleware.MiddlewareTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,6 +122,10 @@ MIDDLEWARE_CLASSES = (
     'termsandconditions.middleware.TermsAndConditionsRedirectMiddleware',
 )
 
+# Add per-middleware timings of each request to response header
+# ``X-Seahub-Middleware-Timing``.
+MIDDLEWARE_TIMING_ENABLED = False
+
 SITE_ROOT_URLCONF = 'seahub.urls'
 ROOT_URLCONF = 'seahub.utils.rooturl'
 SITE_ROOT = '/'
@@ -204,6 +209,7 @@ INSTALLED_APPS = (
     'seahub.contacts',
     'seahub.institutions',
     'seahub.invitations',
+    'seahub.jobs',
     'seahub.wiki',
     'seahub.group',
     'seahub.message',
@@ -294,6 +300,11 @@ OFFICE_PREVIEW_MAX_SIZE = 2 * 1024 * 1024
 USE_PDFJS = True
 FILE_ENCODING_LIST = ['auto', 'utf-8', 'gbk', 'ISO-8859-1', 'ISO-8859-5']
 FILE_ENCODING_TRY_LIST = ['utf-8', 'gbk']
+# Decoded content of textual files no larger than this is cached.
+FILE_CONTENT_CACHE_MAX_SIZE = 1024 * 1024
+FILE_CONTENT_CACHE_TIMEOUT = 60 * 60
+# Max number of rows shown in file modification details.
+TEXT_DIFF_MAX_ROWS = 5000
 HIGHLIGHT_KEYWORD = False # If True, highlight the keywords in the file when the visit is via clicking a link in 'search result' page.
 
 # Common settings(file extension, storage) for avatar and group avatar.
@@ -331,6 +342,8 @@ if 'win32' in sys.platform:
         CACHE_DIR = os.path.join(CCNET_CONF_PATH, '..')
         install_topdir = os.path.join(CCNET_CONF_PATH, '..')
 
+# For busy sites, see ``seahub.base.cache.TwoTierCache`` to put a per-process
+# tier in front of memcached, and ``tools/bench_cache.py`` to compare backends.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
@@ -359,6 +372,13 @@ MAX_PATH 		    = 4096
 
 FILE_LOCK_EXPIRATION_DAYS = 0
 
+# Cache timeout(seconds) of resolved starred files, cached items are also
+# refreshed when repo head commit changes.
+STARRED_FILES_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Max number of threads used to issue independent RPC calls concurrently.
+RPC_FANOUT_WORKERS = 4
+
 # Whether or not activate user when registration complete.
 # If set to ``False``, new user will be activated by admin or via activate link.
 ACTIVATE_AFTER_REGISTRATION = True
@@ -458,6 +478,10 @@ FREEZE_USER_ON_LOGIN_FAILED = False # deactivate user account when login attempt
 # Age of cookie, in seconds (default: 1 day).
 SESSION_COOKIE_AGE = 24 * 60 * 60
 
+# Sessions are stored in database by default. Sites with a cache shared by
+# all nodes, e.g. memcached, may set SESSION_ENGINE = 'seahub.base.sessions'
+# to read sessions from cache and write them to database in batches.
+
 # Days of remembered login info (deafult: 7 days)
 LOGIN_REMEMBER_DAYS = 7
 
@@ -499,6 +523,21 @@ THUMBNAIL_SIZE_FOR_GRID = 192
 THUMBNAIL_IMAGE_SIZE_LIMIT = 20
 THUMBNAIL_IMAGE_ORIGINAL_SIZE_LIMIT = 256
 
+# Directory to spool data which can not be delivered yet, e.g. events when
+# seafevents database is down. It must survive restarts, so it is not under
+# CACHE_DIR, which may be /tmp. Drained by the process which spooled the data
+# once delivery works again, and by ``drain_spools`` command.
+#
+# Uploaded content of queued background jobs (see ``seahub.jobs``), which may
+# contain passwords, is kept in JOB_DATA_DIR instead of database, and removed
+# when the job finishes.
+if os.path.exists(SEAHUB_DATA_ROOT):
+    SPOOL_DIR = os.path.join(SEAHUB_DATA_ROOT, 'spool')
+    JOB_DATA_DIR = os.path.join(SEAHUB_DATA_ROOT, 'jobs')
+else:
+    SPOOL_DIR = os.path.join(PROJECT_ROOT, 'seahub/spool')
+    JOB_DATA_DIR = os.path.join(PROJECT_ROOT, 'seahub/jobs/data')
+
 #####################
 # Global AddressBook #
 #####################
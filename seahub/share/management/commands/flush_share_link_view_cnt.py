@@ -0,0 +1,17 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+from django.core.management.base import BaseCommand
+
+from seahub.share.models import FileShare, UploadLinkShare, \
+    flush_share_link_view_cnt
+
+class Command(BaseCommand):
+    help = 'Write view counts of share links buffered in cache to database. ' \
+           'Should be run every few minutes, e.g. by cron.'
+    label = "share_flush_share_link_view_cnt"
+
+    def handle(self, *args, **options):
+        for model in (FileShare, UploadLinkShare):
+            # only links with buffered views
+            updated = flush_share_link_view_cnt(model)
+            self.stdout.write('Flushed view count of %d %s.' % (
+                updated, model.__name__))
@@ -2,18 +2,168 @@
 import datetime
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.hashers import make_password, check_password
 
 from seahub.base.fields import LowerCaseCharField
 from seahub.utils import normalize_file_path, normalize_dir_path, gen_token,\
-    get_service_url
+    get_service_url, normalize_cache_key
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+SHARE_LINK_CACHE_PREFIX = 'SHARE_LINK_'
+SHARE_LINK_CACHE_TIMEOUT = getattr(settings, 'SHARE_LINK_CACHE_TIMEOUT', 60)
+# Cached in place of a link that does not exist.
+_LINK_NOT_FOUND = 'NOT_FOUND'
+
+SHARE_LINK_VIEW_CNT_CACHE_PREFIX = 'SHARE_LINK_VIEW_CNT_'
+# Buffered views of a link are written to database once there are this many,
+# the rest are written by ``manage.py flush_share_link_view_cnt``.
+SHARE_LINK_VIEW_CNT_FLUSH_THRESHOLD = getattr(
+    settings, 'SHARE_LINK_VIEW_CNT_FLUSH_THRESHOLD', 50)
+# Counts are exact with a cache backend of atomic ``incr``/``decr``/``add``,
+# e.g. memcached. With the default file based cache, concurrent views of a
+# link may be lost.
+SHARE_LINK_VIEW_CNT_LOCK_TIMEOUT = 60
+SHARE_LINK_VIEW_CNT_DIRTY_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def _share_link_cache_key(model, token):
+    return normalize_cache_key(token, SHARE_LINK_CACHE_PREFIX +
+                               model.__name__.upper() + '_')
+
+def _get_valid_link_by_token(model, token):
+    """Return link of ``model`` that exists and not expire, otherwise none.
+
+    Links (and missing tokens) are cached for ``SHARE_LINK_CACHE_TIMEOUT``
+    seconds, and removed from cache when saved or deleted.
+    """
+    key = _share_link_cache_key(model, token)
+    link = cache.get(key)
+    if link is None:
+        try:
+            link = model.objects.get(token=token)
+        except model.DoesNotExist:
+            link = _LINK_NOT_FOUND
+        cache.set(key, link, SHARE_LINK_CACHE_TIMEOUT)
+
+    if link == _LINK_NOT_FOUND:
+        return None
+
+    if link.expire_date is not None and timezone.now() > link.expire_date:
+        return None
+    return link
+
+def _view_cnt_cache_key(model, token):
+    return normalize_cache_key(token, SHARE_LINK_VIEW_CNT_CACHE_PREFIX +
+                               model.__name__.upper() + '_')
+
+def _dirty_cache_keys(model):
+    """Return keys of counter, last flushed index and slot prefix of the
+    list of links with buffered views.
+    """
+    prefix = SHARE_LINK_VIEW_CNT_CACHE_PREFIX + 'DIRTY_' + \
+        model.__name__.upper() + '_'
+    return prefix + 'COUNTER', prefix + 'FLUSHED', prefix + 'SLOT_'
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+def _mark_dirty(model, token):
+    """Add ``token`` to the list of links with buffered views. The list is
+    kept in cache slots numbered by a counter, so adding is one ``incr`` and
+    one ``set``.
+    """
+    counter_key, _, slot_prefix = _dirty_cache_keys(model)
+    cache.set(slot_prefix + str(_incr(counter_key)), token,
+              SHARE_LINK_VIEW_CNT_DIRTY_TIMEOUT)
+
+def _pop_dirty_tokens(model):
+    """Return tokens of links added to the list since last call.
+    """
+    counter_key, flushed_key, slot_prefix = _dirty_cache_keys(model)
+    last = cache.get(counter_key) or 0
+    flushed = cache.get(flushed_key) or 0
+    if flushed > last:
+        # counter was evicted and restarted
+        flushed = 0
+
+    tokens = set()
+    slots = [slot_prefix + str(i) for i in range(flushed + 1, last + 1)]
+    for i in range(0, len(slots), 1000):
+        batch = slots[i:i + 1000]
+        tokens.update(cache.get_many(batch).values())
+        cache.delete_many(batch)
+    cache.set(flushed_key, last, None)
+    return tokens
+
+def _write_view_cnt(model, key, token):
+    """Move buffered views of a link from cache to database, return number
+    of moved views.
+
+    Only one process moves views of a link at a time, and only subtracts
+    what it has written, so views counted meanwhile are kept in cache.
+    """
+    lock_key = key + '_LOCK'
+    if not cache.add(lock_key, 1, SHARE_LINK_VIEW_CNT_LOCK_TIMEOUT):
+        # being moved by another process
+        return 0
+
+    try:
+        count = cache.get(key) or 0
+        if count <= 0:
+            return 0
+
+        model.objects.filter(token=token).update(
+            view_cnt=F('view_cnt') + count)
+        try:
+            remaining = cache.decr(key, count)
+        except ValueError:
+            # evicted meanwhile, views since last read are lost
+            remaining = 0
+        if remaining > 0:
+            _mark_dirty(model, token)
+        return count
+    finally:
+        cache.delete(lock_key)
+
+def incr_share_link_view_cnt(link):
+    """Count a view of a download/upload link in cache, instead of updating
+    the link row on every view.
+    """
+    model = link.__class__
+    key = _view_cnt_cache_key(model, link.token)
+    count = _incr(key)
+    if count == 1:
+        _mark_dirty(model, link.token)
+
+    if count >= SHARE_LINK_VIEW_CNT_FLUSH_THRESHOLD:
+        _write_view_cnt(model, key, link.token)
+
+def flush_share_link_view_cnt(model, tokens=None):
+    """Write buffered views of links with ``tokens``, or all links with
+    buffered views if not given, to database. Return number of links
+    updated.
+    """
+    if tokens is None:
+        tokens = _pop_dirty_tokens(model)
+
+    updated = 0
+    for token in tokens:
+        if _write_view_cnt(model, _view_cnt_cache_key(model, token), token):
+            updated += 1
+    return updated
 
 class AnonymousShare(models.Model):
     """
@@ -104,18 +254,7 @@ class FileShareManager(models.Manager):
     def _get_valid_file_share_by_token(self, token):
         """Return share link that exists and not expire, otherwise none.
         """
-        try:
-            fs = self.get(token=token)
-        except self.model.DoesNotExist:
-            return None
-
-        if fs.expire_date is None:
-            return fs
-        else:
-            if timezone.now() > fs.expire_date:
-                return None
-            else:
-                return fs
+        return _get_valid_link_by_token(self.model, token)
 
     ########## public methods ##########
     def create_file_link(self, username, repo_id, path, password=None,
@@ -163,6 +302,11 @@ class FileShare(models.Model):
     expire_date = models.DateTimeField(null=True)
     objects = FileShareManager()
 
+    class Meta:
+        # for sorting a user's links
+        index_together = (('username', 'ctime'), ('username', 'view_cnt'),
+                          ('username', 'expire_date'))
+
     def is_file_share_link(self):
         return True if self.s_type == 'f' else False
 
@@ -240,18 +384,7 @@ class UploadLinkShareManager(models.Manager):
     def get_valid_upload_link_by_token(self, token):
         """Return upload link that exists and not expire, otherwise none.
         """
-        try:
-            fs = self.get(token=token)
-        except self.model.DoesNotExist:
-            return None
-
-        if fs.expire_date is None:
-            return fs
-        else:
-            if timezone.now() > fs.expire_date:
-                return None
-            else:
-                return fs
+        return _get_valid_link_by_token(self.model, token)
 
 class UploadLinkShare(models.Model):
     """
@@ -359,6 +492,7 @@ class PrivateFileDirShare(models.Model):
     objects = PrivateFileDirShareManager()
 
 ###### signal handlers
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from seahub.signals import repo_deleted
 
@@ -368,3 +502,10 @@ def remove_share_links(sender, **kwargs):
 
     FileShare.objects.filter(repo_id=repo_id).delete()
     UploadLinkShare.objects.filter(repo_id=repo_id).delete()
+
+@receiver(post_save, sender=FileShare)
+@receiver(post_delete, sender=FileShare)
+@receiver(post_save, sender=UploadLinkShare)
+@receiver(post_delete, sender=UploadLinkShare)
+def clear_share_link_cache(sender, instance, **kwargs):
+    cache.delete(_share_link_cache_key(sender, instance.token))
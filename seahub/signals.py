@@ -6,3 +6,4 @@ repo_created = django.dispatch.Signal(providing_args=["org_id", "creator", "repo
 repo_deleted = django.dispatch.Signal(providing_args=["org_id", "usernames", "repo_owner", "repo_id", "repo_name"])
 upload_file_successful = django.dispatch.Signal(providing_args=["repo_id", "file_path", "owner"])
 comment_file_successful = django.dispatch.Signal(providing_args=["repo", "file_path", "comment", "author", "notify_users"])
+repo_transferred = django.dispatch.Signal(providing_args=["org_id", "repo_id", "from_user", "to_user"])
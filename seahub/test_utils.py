@@ -16,6 +16,7 @@ from seaserv import seafile_api, ccnet_threaded_rpc, ccnet_api
 
 from seahub.base.accounts import User
 from seahub.utils import mkstemp
+from seahub.utils.content_cache import clear_local_content_cache
 
 
 class Fixtures(Exam):
@@ -219,3 +220,4 @@ class BaseTestCase(TestCase, Fixtures):
         # clear cache between every test case to avoid config option cache
         # issue which cause test failed
         cache.clear()
+        clear_local_content_cache()
@@ -229,6 +229,7 @@ urlpatterns = patterns(
     (r'^thumbnail/', include('seahub.thumbnail.urls')),
     url(r'^inst/', include('seahub.institutions.urls', app_name='institutions', namespace='institutions')),
     url(r'^invite/', include('seahub.invitations.urls', app_name='invitations', namespace='invitations')),
+    url(r'^jobs/', include('seahub.jobs.urls', app_name='jobs', namespace='jobs')),
     url(r'^terms/', include('termsandconditions.urls')),
 
     ### system admin ###
@@ -391,7 +392,8 @@ if HAS_OFFICE_CONVERTER:
                 office_convert_get_page, {'cluster_internal': True}),
         )
 
-if TRAFFIC_STATS_ENABLED:
+from seahub.utils import is_traffic_stats_enabled
+if is_traffic_stats_enabled():
     from seahub.views.sysadmin import sys_traffic_admin
     urlpatterns += patterns('',
         url(r'^sys/trafficadmin/$', sys_traffic_admin, name='sys_trafficadmin'),
@@ -8,6 +8,7 @@ import uuid
 import logging
 import hashlib
 import tempfile
+import threading
 import locale
 import ConfigParser
 import mimetypes
@@ -21,6 +22,7 @@ from constance import config
 import seaserv
 from seaserv import seafile_api
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.core.mail import EmailMessage
 from django.shortcuts import render_to_response
@@ -32,6 +34,7 @@ from django.utils.html import escape
 from django.views.static import serve as django_static_serve
 
 from seahub.api2.models import Token, TokenV2
+from seahub.utils.threadpool import run_concurrently
 import seahub.settings
 from seahub.settings import SITE_NAME, MEDIA_URL, LOGO_PATH
 try:
@@ -55,6 +58,11 @@ try:
     from seahub.settings import CHECK_SHARE_LINK_TRAFFIC
 except ImportError:
     CHECK_SHARE_LINK_TRAFFIC = False
+try:
+    from seahub.settings import EVENTS_CACHE_TIMEOUT
+except ImportError:
+    EVENTS_CACHE_TIMEOUT = 30
+EVENTS_CACHE_PREFIX = 'EVENTS_'
 
 def is_cluster_mode():
     cfg = ConfigParser.ConfigParser()
@@ -88,7 +96,6 @@ except ImportError:
     OFFICE_CONVERTOR_NODE = False
 
 from seahub.utils.file_types import *
-from seahub.utils.htmldiff import HtmlDiff # used in views/files.py
 
 EMPTY_SHA1 = '0000000000000000000000000000000000000000'
 MAX_INT = 2147483647
@@ -463,15 +470,120 @@ def is_org_context(request):
     """
     return request.cloud_mode and request.user.org is not None
 
+def _enrich_repo_update_events(events, username, repo_cache, commit_cache):
+    """Attach ``repo`` and ``commit`` to 'repo-update' events in place.
+
+    Each distinct repo and commit is fetched only once, ``repo_cache`` and
+    ``commit_cache`` are shared by all batches of a page. Missing repos are
+    cached as ``None``.
+
+    Return a list of events whose repo has been deleted.
+    """
+    update_events = [e for e in events if e.etype == 'repo-update']
+
+    def get_repo(repo_id):
+        repo = seafile_api.get_repo(repo_id)
+        if repo and repo.encrypted:
+            repo.password_set = seafile_api.is_password_set(repo.id, username)
+        return repo
+
+    repo_ids = list(set([e.repo_id for e in update_events
+                         if e.repo_id not in repo_cache]))
+    repo_cache.update(zip(repo_ids, run_concurrently(get_repo, repo_ids)))
+
+    def get_commit(args):
+        repo, commit_id = args
+        return seaserv.get_commit(repo.id, repo.version, commit_id)
+
+    commit_keys = list(set([(e.repo_id, e.commit_id) for e in update_events
+                            if repo_cache[e.repo_id] and
+                            (e.repo_id, e.commit_id) not in commit_cache]))
+    commits = run_concurrently(get_commit,
+                               [(repo_cache[repo_id], commit_id)
+                                for repo_id, commit_id in commit_keys])
+    commit_cache.update(zip(commit_keys, commits))
+
+    deleted = []
+    for e in update_events:
+        repo = repo_cache[e.repo_id]
+        if not repo:
+            deleted.append(e)
+            continue
+        e.repo = repo
+        e.commit = commit_cache[(e.repo_id, e.commit_id)]
+    return deleted
+
+def _events_dedup_key(e):
+    """Events having same repo id, commit creator and commit description are
+    duplicated.
+    """
+    if getattr(e, 'commit', None) is None:
+        return None
+    return (e.repo_id, e.commit.desc, e.commit.creator_name)
+
+def _event_to_dict(e):
+    """Return fields of event ``e`` used to render it, as a plain dict which
+    is cached instead of the seafevents/seaserv objects.
+    """
+    d = {
+        'etype': e.etype,
+        'timestamp': e.timestamp,
+        'repo_id': e.repo_id,
+        'repo_name': getattr(e, 'repo_name', None),
+        'creator': getattr(e, 'creator', None),
+        'repo_owner': getattr(e, 'repo_owner', None),
+        'repo': None,
+        'commit': None,
+    }
+    repo = getattr(e, 'repo', None)
+    if repo is not None:
+        d['repo'] = {
+            'id': repo.id,
+            'name': repo.name,
+            'encrypted': repo.encrypted,
+        }
+    commit = getattr(e, 'commit', None)
+    if commit is not None:
+        d['commit'] = {
+            'id': commit.id,
+            'creator_name': commit.creator_name,
+            'ctime': commit.ctime,
+            'desc': commit.desc,
+            'converted_cmmt_desc': convert_cmmt_desc_link(commit),
+            'more_files': more_files_in_commit(commit),
+        }
+    return d
+
 # events related
 if EVENTS_CONFIG_FILE:
     parsed_events_conf = ConfigParser.ConfigParser()
     parsed_events_conf.read(EVENTS_CONFIG_FILE)
 
-    import seafevents
+    # seafevents, which pulls in sqlalchemy, is imported by functions using
+    # it, so processes not using events, e.g. most ``manage.py`` commands,
+    # do not pay for it. Features enabled are read from the config instead.
+    def _is_events_conf_enabled(section):
+        return parsed_events_conf.has_option(section, 'enabled') and \
+            parsed_events_conf.getboolean(section, 'enabled')
 
     EVENTS_ENABLED = True
-    SeafEventsSession = seafevents.init_db_session_class(EVENTS_CONFIG_FILE)
+
+    _seafevents_session_class = None
+    _seafevents_session_lock = threading.Lock()
+
+    def SeafEventsSession():
+        """Return a new session of seafevents database. The database engine
+        is only created on first call, so processes not using events do not
+        pay for it.
+        """
+        global _seafevents_session_class
+        if _seafevents_session_class is None:
+            with _seafevents_session_lock:
+                if _seafevents_session_class is None:
+                    import seafevents
+                    _seafevents_session_class = \
+                        seafevents.init_db_session_class(EVENTS_CONFIG_FILE)
+        return _seafevents_session_class()
 
     @contextlib.contextmanager
     def _get_seafevents_session():
@@ -481,36 +593,32 @@ if EVENTS_CONFIG_FILE:
         finally:
            session.close()
 
-    def _same_events(e1, e2):
-        """Two events are equal should follow two rules:
-        1. event1.repo_id = event2.repo_id
-        2. event1.commit.creator = event2.commit.creator
-        3. event1.commit.desc = event2.commit.desc
-        """
-        if hasattr(e1, 'commit') and hasattr(e2, 'commit'):
-            if e1.repo_id == e2.repo_id and \
-               e1.commit.desc == e2.commit.desc and \
-               e1.commit.creator_name == e2.commit.creator_name:
-                return True
-        return False
-
     def _get_events(username, start, count, org_id=None):
+        cache_key = normalize_cache_key('%s_%s_%s_%s' % (username, org_id,
+                                                         start, count),
+                                        EVENTS_CACHE_PREFIX)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         ev_session = SeafEventsSession()
 
         valid_events = []
+        seen = set()
+        repo_cache, commit_cache = {}, {}
         total_used = 0
         try:
             next_start = start
             while True:
                 events = _get_events_inner(ev_session, username, next_start,
-                                           count, org_id)
+                                           count, org_id, repo_cache,
+                                           commit_cache)
                 if not events:
                     break
 
                 for e1 in events:
-                    duplicate = False
-                    for e2 in valid_events:
-                        if _same_events(e1, e2): duplicate = True; break
+                    key = _events_dedup_key(e1)
+                    duplicate = key is not None and key in seen
 
                     new_merge = False
                     if hasattr(e1, 'commit') and e1.commit and \
@@ -519,6 +627,8 @@ if EVENTS_CONFIG_FILE:
 
                     if not duplicate and not new_merge:
                         valid_events.append(e1)
+                        if key is not None:
+                            seen.add(key)
                     total_used = total_used + 1
                     if len(valid_events) == count:
                         break
@@ -529,18 +639,22 @@ if EVENTS_CONFIG_FILE:
         finally:
             ev_session.close()
 
-        for e in valid_events:            # parse commit description
-            if hasattr(e, 'commit'):
-                e.commit.converted_cmmt_desc = convert_cmmt_desc_link(e.commit)
-                e.commit.more_files = more_files_in_commit(e.commit)
-        return valid_events, start + total_used
+        ret = ([_event_to_dict(e) for e in valid_events], start + total_used)
+        cache.set(cache_key, ret, EVENTS_CACHE_TIMEOUT)
+        return ret
 
-    def _get_events_inner(ev_session, username, start, limit, org_id=None):
+    def _get_events_inner(ev_session, username, start, limit, org_id=None,
+                          repo_cache=None, commit_cache=None):
         '''Read events from seafevents database, and remove events that are
         no longer valid
 
         Return 'limit' events or less than 'limit' events if no more events remain
         '''
+        import seafevents
+
+        repo_cache = {} if repo_cache is None else repo_cache
+        commit_cache = {} if commit_cache is None else commit_cache
+
         valid_events = []
         next_start = start
         while True:
@@ -554,18 +668,15 @@ if EVENTS_CONFIG_FILE:
             if not events:
                 break
 
+            deleted = _enrich_repo_update_events(events, username,
+                                                 repo_cache, commit_cache)
+            for ev in deleted:
+                # delete the update event for repo which has been deleted
+                seafevents.delete_event(ev_session, ev.uuid)
+
             for ev in events:
-                if ev.etype == 'repo-update':
-                    repo = seafile_api.get_repo(ev.repo_id)
-                    if not repo:
-                        # delete the update event for repo which has been deleted
-                        seafevents.delete_event(ev_session, ev.uuid)
-                        continue
-                    if repo.encrypted:
-                        repo.password_set = seafile_api.is_password_set(
-                            repo.id, username)
-                    ev.repo = repo
-                    ev.commit = seaserv.get_commit(repo.id, repo.version, ev.commit_id)
+                if ev in deleted:
+                    continue
 
                 valid_events.append(ev)
                 if len(valid_events) == limit:
@@ -578,7 +689,8 @@ if EVENTS_CONFIG_FILE:
         return valid_events
 
     def get_user_events(username, start, count):
-        """Return user events list and a new start.
+        """Return user events list and a new start. Each event is a dict, see
+        ``_event_to_dict``.
 
         For example:
         ``get_user_events('foo@example.com', 0, 10)`` returns the first 10
@@ -594,6 +706,8 @@ if EVENTS_CONFIG_FILE:
     def get_log_events_by_time(log_type, tstart, tend):
         """Return log events list by start/end timestamp. (If no logs, return 'None')
         """
+        import seafevents
+
         with _get_seafevents_session() as session:
             events = seafevents.get_event_log_by_time(session, log_type, tstart, tend)
 
@@ -617,6 +731,8 @@ if EVENTS_CONFIG_FILE:
         ``get_file_audit_events_by_path(email, org_id, repo_id, file_path, 5, 10)`` returns the 6th through
         15th events.
         """
+        import seafevents
+
         with _get_seafevents_session() as session:
             events = seafevents.get_file_audit_events_by_path(session,
                 email, org_id, repo_id, file_path, start, limit)
@@ -632,6 +748,8 @@ if EVENTS_CONFIG_FILE:
         ``get_file_audit_events(email, org_id, repo_id, 5, 10)`` returns the 6th through
         15th events.
         """
+        import seafevents
+
         with _get_seafevents_session() as session:
             events = seafevents.get_file_audit_events(session, email, org_id, repo_id, start, limit)
 
@@ -646,6 +764,8 @@ if EVENTS_CONFIG_FILE:
         ``get_file_update_events(email, org_id, repo_id, 5, 10)`` returns the 6th through
         15th events.
         """
+        import seafevents
+
         with _get_seafevents_session() as session:
             events = seafevents.get_file_update_events(session, email, org_id, repo_id, start, limit)
 
@@ -660,21 +780,26 @@ if EVENTS_CONFIG_FILE:
         ``get_repo_perm_events(email, org_id, repo_id, 5, 10)`` returns the 6th through
         15th events.
         """
+        import seafevents
+
         with _get_seafevents_session() as session:
             events = seafevents.get_perm_audit_events(session, email, org_id, repo_id, start, limit)
 
         return events if events else None
 
     def get_virus_record(repo_id=None, start=-1, limit=-1):
+        import seafevents
         with _get_seafevents_session() as session:
             r = seafevents.get_virus_record(session, repo_id, start, limit)
         return r if r else []
 
     def handle_virus_record(vid):
+        import seafevents
         with _get_seafevents_session() as session:
             return True if seafevents.handle_virus_record(session, vid) == 0 else False
 
     def get_virus_record_by_id(vid):
+        import seafevents
         with _get_seafevents_session() as session:
             return seafevents.get_virus_record_by_id(session, vid)
 else:
@@ -834,7 +959,7 @@ OPS = '|'.join(FILE_OP)
 CMMT_DESC_PATT = re.compile(r'(%s) "(.*)"\s?(and \d+ more (?:files|directories))?' % OPS)
 
 API_OPS = '|'.join((OPS, 'Deleted', 'Removed'))
-API_CMMT_DESC_PATT = r'(%s) "(.*)"\s?(and \d+ more (?:files|directories))?' % API_OPS
+API_CMMT_DESC_PATT = re.compile(r'(%s) "(.*)"\s?(and \d+ more (?:files|directories))?' % API_OPS)
 
 
 def convert_cmmt_desc_link(commit):
@@ -856,7 +981,7 @@ def convert_cmmt_desc_link(commit):
         else:
             return tmp_str % (op, conv_link_url, repo_id, cmmt_id, urlquote(file_or_dir), escape(file_or_dir))
 
-    return re.sub(CMMT_DESC_PATT, link_repl, commit.desc)
+    return CMMT_DESC_PATT.sub(link_repl, commit.desc)
 
 def api_tsstr_sec(value):
     """Turn a timestamp to string"""
@@ -873,6 +998,9 @@ def api_convert_desc_link(e):
     repo_id = commit.repo_id
     cmmt_id = commit.id
 
+    # diffs of commits never change, share them with history views
+    from seahub.utils.commit_diff import get_commit_diff
+
     def link_repl(matchobj):
         op = matchobj.group(1)
         file_or_dir = matchobj.group(2)
@@ -885,7 +1013,7 @@ def api_convert_desc_link(e):
             e.dtime = api_tsstr_sec(commit.props.ctime)
             return (tmp_str + ' %s') % (op, file_or_dir, remaining)
         else:
-            diff_result = seafile_api.diff_commits(repo_id, '', cmmt_id)
+            diff_result = get_commit_diff(repo_id, '', cmmt_id)
             if diff_result:
                 for d in diff_result:
                     if file_or_dir not in d.name:
@@ -902,19 +1030,19 @@ def api_convert_desc_link(e):
                     else:
                         continue
             return tmp_str % (op, file_or_dir)
-    e.desc = re.sub(API_CMMT_DESC_PATT, link_repl, commit.desc)
+    e.desc = API_CMMT_DESC_PATT.sub(link_repl, commit.desc)
 
-MORE_PATT = r'and \d+ more (?:files|directories)'
+MORE_PATT = re.compile(r'and \d+ more (?:files|directories)')
 def more_files_in_commit(commit):
     """Check whether added/deleted/modified more files in commit description.
     """
-    return True if re.search(MORE_PATT, commit.desc) else False
+    return True if MORE_PATT.search(commit.desc) else False
 
 # file audit related
 FILE_AUDIT_ENABLED = False
 if EVENTS_CONFIG_FILE:
     def check_file_audit_enabled():
-        enabled = seafevents.is_audit_enabled(parsed_events_conf)
+        enabled = _is_events_conf_enabled('Audit')
 
         if enabled:
             logging.debug('file audit: enabled')
@@ -928,7 +1056,7 @@ if EVENTS_CONFIG_FILE:
 HAS_OFFICE_CONVERTER = False
 if EVENTS_CONFIG_FILE:
     def check_office_converter_enabled():
-        enabled = seafevents.is_office_converter_enabled(parsed_events_conf)
+        enabled = _is_events_conf_enabled('OFFICE CONVERTER')
 
         if enabled:
             logging.debug('office converter: enabled')
@@ -937,9 +1065,11 @@ if EVENTS_CONFIG_FILE:
         return enabled
 
     def get_office_converter_html_dir():
+        import seafevents
         return seafevents.get_office_converter_html_dir(parsed_events_conf)
 
     def get_office_converter_limit():
+        import seafevents
         return seafevents.get_office_converter_limit(parsed_events_conf)
 
     HAS_OFFICE_CONVERTER = check_office_converter_enabled()
@@ -955,12 +1085,12 @@ if HAS_OFFICE_CONVERTER:
 
     FILEEXT_TYPE_MAP = gen_fileext_type_map()
 
-    from seafevents.office_converter import OfficeConverterRpcClient
     office_converter_rpc = None
 
     def _get_office_converter_rpc():
         global office_converter_rpc
         if office_converter_rpc is None:
+            from seafevents.office_converter import OfficeConverterRpcClient
             pool = ccnet.ClientPool(
                 seaserv.CCNET_CONF_PATH,
                 central_config_dir=seaserv.SEAFILE_CENTRAL_CONF_DIR
@@ -1093,49 +1223,78 @@ if HAS_OFFICE_CONVERTER:
 HAS_FILE_SEARCH = False
 if EVENTS_CONFIG_FILE:
     def check_search_enabled():
-        enabled = False
-        if hasattr(seafevents, 'is_search_enabled'):
-            enabled = seafevents.is_search_enabled(parsed_events_conf)
+        enabled = _is_events_conf_enabled('INDEX FILES')
 
-            if enabled:
-                logging.debug('search: enabled')
-            else:
-                logging.debug('search: not enabled')
+        if enabled:
+            logging.debug('search: enabled')
+        else:
+            logging.debug('search: not enabled')
         return enabled
 
     HAS_FILE_SEARCH = check_search_enabled()
 
-TRAFFIC_STATS_ENABLED = False
-if EVENTS_CONFIG_FILE and hasattr(seafevents, 'get_user_traffic_stat'):
-    TRAFFIC_STATS_ENABLED = True
-    def get_user_traffic_stat(username):
-        session = SeafEventsSession()
-        try:
-            stat = seafevents.get_user_traffic_stat(session, username)
-        finally:
-            session.close()
-        return stat
+_traffic_stats_enabled = None
 
-    def get_user_traffic_list(month, start=0, limit=25):
-        session = SeafEventsSession()
-        try:
-            stat = seafevents.get_user_traffic_list(session, month, start, limit)
-        finally:
-            session.close()
-        return stat
+def is_traffic_stats_enabled():
+    """Return whether seafevents records user traffic. Checked on first
+    call, since it imports seafevents.
+    """
+    global _traffic_stats_enabled
+    if _traffic_stats_enabled is None:
+        enabled = False
+        if EVENTS_CONFIG_FILE:
+            import seafevents
+            enabled = hasattr(seafevents, 'get_user_traffic_stat')
+        _traffic_stats_enabled = enabled
+    return _traffic_stats_enabled
+
+def get_user_traffic_stat(username):
+    if not is_traffic_stats_enabled():
+        return None
 
-else:
-    def get_user_traffic_stat(username):
-        pass
-    def get_user_traffic_list():
-        pass
+    import seafevents
+    session = SeafEventsSession()
+    try:
+        stat = seafevents.get_user_traffic_stat(session, username)
+    finally:
+        session.close()
+    return stat
+
+def get_user_traffic_list(month, start=0, limit=25):
+    if not is_traffic_stats_enabled():
+        return None
+
+    import seafevents
+    session = SeafEventsSession()
+    try:
+        stat = seafevents.get_user_traffic_list(session, month, start, limit)
+    finally:
+        session.close()
+    return stat
+
+TRAFFIC_OVER_LIMIT_CACHE_PREFIX = 'TRAFFIC_OVER_LIMIT_'
+TRAFFIC_OVER_LIMIT_CACHE_TIMEOUT = 60
 
 def user_traffic_over_limit(username):
     """Return ``True`` if user traffic over the limit, otherwise ``False``.
+
+    Result is cached for ``TRAFFIC_OVER_LIMIT_CACHE_TIMEOUT`` seconds, since
+    it is checked on every share link access.
     """
     if not CHECK_SHARE_LINK_TRAFFIC:
         return False
 
+    key = normalize_cache_key(username, TRAFFIC_OVER_LIMIT_CACHE_PREFIX)
+    over_limit = cache.get(key)
+    if over_limit is None:
+        over_limit = _user_traffic_over_limit(username)
+        if over_limit is not None:
+            cache.set(key, over_limit, TRAFFIC_OVER_LIMIT_CACHE_TIMEOUT)
+    return True if over_limit is None else over_limit
+
+def _user_traffic_over_limit(username):
+    """Return ``None`` if traffic stat can not be got.
+    """
     from seahub_extra.plan.models import UserPlan
     from seahub_extra.plan.settings import PLAN
     up = UserPlan.objects.get_valid_plan_by_user(username)
@@ -1148,7 +1307,7 @@ def user_traffic_over_limit(username):
         logger = logging.getLogger(__name__)
         logger.error('Failed to get user traffic stat: %s' % username,
                      exc_info=True)
-        return True
+        return None
 
     if stat is None:            # No traffic record yet
         return False
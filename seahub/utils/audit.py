@@ -0,0 +1,106 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Record file access audit events in seafevents in batches.
+
+Identical accesses, i.e. same user, client, file and source, are recorded
+once per request, and once per ``FILE_ACCESS_MSG_WINDOW`` seconds across all
+processes sharing the cache.
+
+When seafevents database is configured, accesses are queued together with
+their time, and saved by a thread of each process in batches with one
+database session, so requests do not wait for it. Those which can not be
+saved in time are spooled under ``SPOOL_DIR``, and saved later by the thread
+or ``drain_spools`` command, still with their access time.
+
+Otherwise the message is sent to the event bus at once, since seafevents
+stamps a message with the time it is received.
+"""
+import datetime
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+import seaserv
+from seaserv import seafile_api
+
+from seahub.utils import EVENTS_CONFIG_FILE, normalize_cache_key
+from seahub.utils.batch_writer import BatchWriter
+from seahub.utils.spool import Spool
+
+FILE_ACCESS_MSG_WINDOW = getattr(settings, 'FILE_ACCESS_MSG_WINDOW', 10)
+FILE_ACCESS_MSG_BATCH_SIZE = getattr(settings, 'FILE_ACCESS_MSG_BATCH_SIZE',
+                                     100)
+FILE_ACCESS_MSG_INTERVAL = getattr(settings, 'FILE_ACCESS_MSG_INTERVAL', 1)
+FILE_ACCESS_MSG_MAX_PENDING = getattr(settings, 'FILE_ACCESS_MSG_MAX_PENDING',
+                                      10000)
+
+FILE_ACCESS_MSG_CACHE_PREFIX = 'FILE_ACCESS_MSG_'
+FILE_ACCESS_MSGS_ATTR = '_file_access_msgs'
+
+def can_save_file_access_events():
+    """Return whether audit events can be saved to seafevents database with
+    their own time.
+    """
+    if not EVENTS_CONFIG_FILE:
+        return False
+    import seafevents
+    return hasattr(seafevents, 'save_file_audit_event')
+
+def save_file_access_events(items):
+    """Save queued ``{'msg': ..., 'timestamp': ...}`` items to seafevents
+    database with one session, like seafevents does for messages.
+    """
+    import seafevents
+    from seahub.utils import SeafEventsSession
+
+    session = SeafEventsSession()
+    try:
+        for item in items:
+            msg = item['msg']
+            if isinstance(msg, unicode):
+                # read back from spool
+                msg = msg.encode('utf-8')
+            etype, user, ip, user_agent, repo_id, path = msg.split('\t', 5)
+            org_id = seafile_api.get_org_id_by_repo_id(repo_id)
+            timestamp = datetime.datetime.utcfromtimestamp(item['timestamp'])
+            seafevents.save_file_audit_event(session, timestamp, etype, user,
+                                             ip, user_agent, org_id, repo_id,
+                                             path)
+    finally:
+        session.close()
+
+file_access_msg_writer = BatchWriter(
+    save_file_access_events, batch_size=FILE_ACCESS_MSG_BATCH_SIZE,
+    flush_interval=FILE_ACCESS_MSG_INTERVAL,
+    max_pending=FILE_ACCESS_MSG_MAX_PENDING, background=True,
+    spool=Spool(os.path.join(settings.SPOOL_DIR, 'file_access')))
+
+def _is_duplicate(msg, request):
+    if request is not None:
+        msgs = getattr(request, FILE_ACCESS_MSGS_ATTR, None)
+        if msgs is None:
+            msgs = set()
+            setattr(request, FILE_ACCESS_MSGS_ATTR, msgs)
+        if msg in msgs:
+            return True
+        msgs.add(msg)
+
+    if FILE_ACCESS_MSG_WINDOW > 0:
+        key = normalize_cache_key(hashlib.md5(msg).hexdigest(),
+                                  FILE_ACCESS_MSG_CACHE_PREFIX)
+        if not cache.add(key, 1, FILE_ACCESS_MSG_WINDOW):
+            return True
+    return False
+
+def queue_file_access_msg(msg, request=None):
+    """Record access ``msg`` (utf-8 encoded) made now, unless an identical
+    one was recorded in ``request`` or current time window.
+    """
+    if _is_duplicate(msg, request):
+        return
+
+    if can_save_file_access_events():
+        file_access_msg_writer.put({'msg': msg, 'timestamp': time.time()})
+    else:
+        seaserv.send_message('seahub.stats', msg)
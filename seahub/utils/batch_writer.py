@@ -0,0 +1,232 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Buffer writes in process and apply them in batches.
+
+Items put with the same key are coalesced, only the latest one is written.
+Pending items are flushed when ``batch_size`` of them are collected, when
+``flush_interval`` seconds have passed since last flush, or at process exit.
+Items of a failed flush are put back and retried with the next one.
+
+With ``background=True``, flushes are run by a thread of the writer instead
+of the caller of ``put``.
+
+With a ``spool`` (see ``seahub.utils.spool``), each item is appended to a
+journal of the process before ``put`` returns, and the journal is removed
+once its items are written, so items are written at least once even if the
+process is killed. Items which would be dropped because ``max_pending`` is
+reached are spooled. Spooled items, and journals of processes which are
+gone, are written by ``drain_spool``, called by the background thread while
+there are any, and by ``drain_spools`` command. Items must be JSON
+serializable then.
+"""
+import atexit
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Seconds the background thread waits before draining the spool again,
+# after a drain left items in it.
+SPOOL_RETRY_INTERVAL = 60
+
+class BatchWriter(object):
+    def __init__(self, flush_func, batch_size=100, flush_interval=10,
+                 max_pending=10000, background=False, spool=None):
+        """``flush_func`` is called with a list of pending items.
+        """
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = background
+        self.spool = spool
+
+        self._pid = None
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+        self._counter = itertools.count()
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._next_drain = 0
+        # file and path of journal being appended to, and paths of journals
+        # whose items are not written yet
+        self._journal = None
+        self._journal_paths = []
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # forked, items pending in parent are written by parent
+            self._reset()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run)
+                    self._thread.daemon = True
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if self.spool is not None and \
+                   time.time() >= self._next_drain and \
+                   self.spool.pending_files():
+                    self.drain_spool()
+                    if self.spool.pending_files():
+                        # destination is still down
+                        self._next_drain = time.time() + SPOOL_RETRY_INTERVAL
+            except Exception as e:
+                logger.error(e)
+
+    def put(self, item, key=None):
+        self._check_fork()
+        if key is None:
+            key = ('', next(self._counter))
+        if self.background:
+            self._ensure_thread()
+
+        with self._lock:
+            if self.spool is not None:
+                self._append_journal(item)
+            self._pending.pop(key, None)
+            self._pending[key] = item
+            due = len(self._pending) >= self.batch_size or \
+                time.time() - self._last_flush >= self.flush_interval
+            overflow = self._pop_overflow()
+
+        if overflow:
+            self._drop(overflow)
+
+        if due:
+            if self.background:
+                self._wakeup.set()
+            else:
+                self.flush()
+
+    def _append_journal(self, item):
+        # called with self._lock held
+        if self._journal is None:
+            f, path = self.spool.open_journal()
+            self._journal = f
+            self._journal_paths.append(path)
+        self.spool.append(self._journal, item)
+
+    def _rotate_journal(self):
+        """Close current journal, return paths of journals whose items are
+        all pending or spooled now. Called with self._lock held.
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        return list(self._journal_paths)
+
+    def _remove_journals(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error('Failed to remove journal %s: %s' % (path, e))
+        with self._lock:
+            self._journal_paths = [p for p in self._journal_paths
+                                   if p not in paths]
+
+    def discard(self, key):
+        """Drop pending item of ``key``.
+        """
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write pending items, return number of written ones.
+        """
+        self._check_fork()
+        # one flush at a time, so items are written in order
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = OrderedDict()
+                self._last_flush = time.time()
+                journals = self._rotate_journal()
+
+            if not pending:
+                return 0
+
+            try:
+                self.flush_func(pending.values())
+            except Exception as e:
+                logger.error('Failed to write %d items: %s' % (len(pending), e))
+                self._requeue(pending)
+                return 0
+
+            # items of a failed flush are requeued and written with this
+            # one, so all journaled items are written or spooled now
+            self._remove_journals(journals)
+            return len(pending)
+
+    def close(self):
+        """Flush pending items. Without a spool, those failed to be written
+        are dropped, with a spool they are kept in the journal.
+        """
+        if self._pid != os.getpid():
+            return
+        self.flush()
+        with self._lock:
+            pending = self._pending
+            self._pending = OrderedDict()
+            self._rotate_journal()
+        if pending and self.spool is None:
+            self._drop(pending.values())
+
+    def drain_spool(self):
+        """Write spooled items, return number of written ones.
+        """
+        if self.spool is None:
+            return 0
+        return self.spool.drain(self.flush_func, self.batch_size)
+
+    def _pop_overflow(self):
+        # called with self._lock held
+        overflow = []
+        while len(self._pending) > self.max_pending:
+            overflow.append(self._pending.popitem(last=False)[1])
+        return overflow
+
+    def _drop(self, items):
+        if not items:
+            return
+
+        if self.spool is not None:
+            try:
+                self.spool.write(items)
+                return
+            except Exception as e:
+                logger.error('Failed to spool %d items: %s' % (len(items), e))
+        logger.error('Dropped %d pending items.' % len(items))
+
+    def _requeue(self, failed):
+        with self._lock:
+            # newer items of the same key win
+            for key in self._pending:
+                failed.pop(key, None)
+            failed.update(self._pending)
+            self._pending = failed
+            overflow = self._pop_overflow()
+
+        self._drop(overflow)
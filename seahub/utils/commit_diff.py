@@ -0,0 +1,141 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+# -*- coding: utf-8 -*-
+"""Cache of commit diff results.
+
+Commits are immutable, so the diff of ``(repo_id, commit1, commit2)`` never
+changes once computed. Results are stored zlib compressed in two tiers, like
+``seahub.utils.content_cache``:
+
+* a per-process LRU bounded by ``COMMIT_DIFF_CACHE_LOCAL_MAX_SIZE`` bytes;
+* the cache named by ``COMMIT_DIFF_CACHE_ALIAS``, shared by all processes.
+  A file based cache culls random entries when it is full, so point it to a
+  memcached cache, which evicts least recently used ones, to bound its size.
+
+Hits and misses are counted in the shared cache, and reported as a hit rate
+by the admin sysinfo API.
+"""
+import fcntl
+import json
+import logging
+import os
+import zlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+from seaserv import seafserv_threaded_rpc
+
+from seahub.utils import normalize_cache_key
+from seahub.utils.content_cache import LocalLRUCache
+
+logger = logging.getLogger(__name__)
+
+COMMIT_DIFF_CACHE_PREFIX = 'COMMIT_DIFF_'
+COMMIT_DIFF_CACHE_ALIAS = getattr(settings, 'COMMIT_DIFF_CACHE_ALIAS', 'default')
+COMMIT_DIFF_CACHE_TIMEOUT = getattr(settings, 'COMMIT_DIFF_CACHE_TIMEOUT',
+                                    7 * 24 * 60 * 60)
+# Diffs larger than this (compressed, in bytes) are not cached.
+COMMIT_DIFF_CACHE_MAX_SIZE = getattr(settings, 'COMMIT_DIFF_CACHE_MAX_SIZE',
+                                     1024 * 1024)
+# Set to 0 to disable the per-process tier.
+COMMIT_DIFF_CACHE_LOCAL_MAX_SIZE = getattr(
+    settings, 'COMMIT_DIFF_CACHE_LOCAL_MAX_SIZE', 16 * 1024 * 1024)
+
+_HITS_KEY = COMMIT_DIFF_CACHE_PREFIX + 'HITS'
+_MISSES_KEY = COMMIT_DIFF_CACHE_PREFIX + 'MISSES'
+
+DiffEntry = namedtuple('DiffEntry', ['status', 'name', 'new_name'])
+
+_local_cache = LocalLRUCache(COMMIT_DIFF_CACHE_LOCAL_MAX_SIZE)
+
+def _get_cache():
+    return caches[COMMIT_DIFF_CACHE_ALIAS]
+
+def _cache_key(repo_id, commit1, commit2):
+    return normalize_cache_key('%s_%s_%s' % (repo_id, commit1, commit2),
+                               COMMIT_DIFF_CACHE_PREFIX)
+
+def _incr(cache, key):
+    backend = getattr(cache, 'shared', cache)     # see TwoTierCache
+    if isinstance(backend, FileBasedCache):
+        # ``incr`` of file based cache is a read and a write, lock the
+        # cache directory so concurrent processes do not lose counts
+        if not os.path.exists(backend._dir):
+            backend._createdir()
+        with open(os.path.join(backend._dir, 'COMMIT_DIFF_STATS.lock'),
+                  'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                backend.set(key, backend.get(key, 0) + 1, None)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        # counter is not set yet, or has been evicted
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+
+def _dumps(entries):
+    return zlib.compress(json.dumps([list(e) for e in entries]))
+
+def _loads(data):
+    return [DiffEntry(*e) for e in json.loads(zlib.decompress(data))]
+
+def get_commit_diff(repo_id, commit1, commit2):
+    """Return list of ``DiffEntry`` between two commits, as returned by
+    ``seafserv_threaded_rpc.get_diff``. Empty ``commit1`` means the parent of
+    ``commit2``.
+    """
+    cache = _get_cache()
+    key = _cache_key(repo_id, commit1, commit2)
+    data = _local_cache.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is not None:
+            _local_cache.set(key, data, len(data))
+    if data is not None:
+        try:
+            entries = _loads(data)
+            _incr(cache, _HITS_KEY)
+            return entries
+        except (ValueError, TypeError, zlib.error) as e:
+            logger.warning('Bad commit diff cache %s: %s' % (key, e))
+            _local_cache.delete(key)
+
+    _incr(cache, _MISSES_KEY)
+    diff_result = seafserv_threaded_rpc.get_diff(repo_id, commit1, commit2)
+    if diff_result is None:
+        # RPC failed, do not cache it as an empty diff
+        return []
+
+    entries = [DiffEntry(d.status, d.name, d.new_name) for d in diff_result]
+    data = _dumps(entries)
+    if len(data) <= COMMIT_DIFF_CACHE_MAX_SIZE:
+        _local_cache.set(key, data, len(data))
+        cache.set(key, data, COMMIT_DIFF_CACHE_TIMEOUT)
+    return entries
+
+def get_commit_diff_cache_stats():
+    """Return a dict of ``hits``, ``misses`` and ``hit_rate`` of the cache
+    since counters were last reset or evicted.
+    """
+    counters = _get_cache().get_many([_HITS_KEY, _MISSES_KEY])
+    hits = counters.get(_HITS_KEY, 0)
+    misses = counters.get(_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': float(hits) / total if total else 0.0,
+    }
+
+def clear_local_commit_diff_cache():
+    _local_cache.clear()
@@ -0,0 +1,106 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+# -*- coding: utf-8 -*-
+"""Cache of file content and content processed from it.
+
+Entries are keyed by object ids (or head commit ids), so they never go stale
+and need no invalidation. Lookups go through two tiers:
+
+* a per-process LRU bounded by ``CONTENT_CACHE_LOCAL_MAX_SIZE`` bytes, which
+  serves popular wiki pages and READMEs without any round trip;
+* the cache named by ``CONTENT_CACHE_ALIAS``, shared by all processes. It
+  can point to a dedicated file based cache with its own ``MAX_ENTRIES`` to
+  keep content on local disk with bounded size.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+CONTENT_CACHE_PREFIX = 'CONTENT_'
+CONTENT_CACHE_ALIAS = getattr(settings, 'CONTENT_CACHE_ALIAS', 'default')
+# Set to 0 to disable the per-process tier.
+CONTENT_CACHE_LOCAL_MAX_SIZE = getattr(settings, 'CONTENT_CACHE_LOCAL_MAX_SIZE',
+                                       32 * 1024 * 1024)
+
+class LocalLRUCache(object):
+    """Thread safe LRU cache bounded by total size of values.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return None
+            value, size, expire_at = item
+            if expire_at is not None and expire_at <= time.time():
+                self.size -= size
+                return None
+            # move to the most recently used end
+            self._data[key] = item
+            return value
+
+    def set(self, key, value, size, timeout=None):
+        """Cache ``value`` for ``timeout`` seconds, or until evicted if
+        ``timeout`` is ``None``.
+        """
+        if size > self.max_size:
+            self.delete(key)
+            return
+
+        expire_at = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._data[key] = (value, size, expire_at)
+            self.size += size
+            while self.size > self.max_size:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= evicted[1]
+
+    def delete(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+_local_cache = LocalLRUCache(CONTENT_CACHE_LOCAL_MAX_SIZE)
+
+def _get_cache():
+    return caches[CONTENT_CACHE_ALIAS]
+
+def get_content(key):
+    """Return cached value of ``key``, or ``None``.
+    """
+    value = _local_cache.get(key)
+    if value is not None:
+        return value
+
+    cached = _get_cache().get(CONTENT_CACHE_PREFIX + key)
+    if cached is None:
+        return None
+
+    value, size = cached
+    _local_cache.set(key, value, size)
+    return value
+
+def set_content(key, value, size, timeout):
+    """Cache ``value``, which takes about ``size`` bytes, in both tiers.
+    """
+    _local_cache.set(key, value, size)
+    _get_cache().set(CONTENT_CACHE_PREFIX + key, (value, size), timeout)
+
+def clear_local_content_cache():
+    _local_cache.clear()
@@ -30,6 +30,8 @@ import heapq
 from collections import namedtuple as _namedtuple
 from functools import reduce
 
+from seahub.utils import linediff
+
 Match = _namedtuple('Match', 'a b size')
 
 def _calculate_ratio(matches, length):
@@ -1686,7 +1688,7 @@ class HtmlDiff(object):
     _default_prefix = 0
 
     def __init__(self,tabsize=8,wrapcolumn=None,linejunk=None,
-                 charjunk=IS_CHARACTER_JUNK):
+                 charjunk=IS_CHARACTER_JUNK,fast=True,max_rows=None):
         """HtmlDiff instance initializer
 
         Arguments:
@@ -1696,11 +1698,18 @@ class HtmlDiff(object):
         linejunk,charjunk -- keyword arguments passed into ndiff() (used to by
             HtmlDiff() to generate the side by side HTML differences).  See
             ndiff() documentation for argument default values and descriptions.
+        fast -- use ``seahub.utils.linediff`` instead of ndiff(), which is
+            quadratic on large files. linejunk and charjunk are ignored.
+        max_rows -- max number of table rows, only used when fast is True.
+            ``truncated`` is set if the table is truncated.
         """
         self._tabsize = tabsize
         self._wrapcolumn = wrapcolumn
         self._linejunk = linejunk
         self._charjunk = charjunk
+        self._fast = fast
+        self._max_rows = max_rows
+        self.truncated = False
 
     def make_file(self,fromlines,tolines,fromdesc='',todesc='',context=False,
                   numlines=5):
@@ -1980,8 +1989,13 @@ class HtmlDiff(object):
             context_lines = numlines
         else:
             context_lines = None
-        diffs = _mdiff(fromlines,tolines,context_lines,linejunk=self._linejunk,
-                      charjunk=self._charjunk)
+        if self._fast:
+            diffs, self.truncated = linediff.mdiff(fromlines, tolines,
+                                                   context_lines,
+                                                   self._max_rows)
+        else:
+            diffs = _mdiff(fromlines,tolines,context_lines,
+                           linejunk=self._linejunk,charjunk=self._charjunk)
 
         # set up iterator to wrap lines that exceed desired width
         if self._wrapcolumn:
@@ -0,0 +1,270 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+# -*- coding: utf-8 -*-
+"""Line based diff which runs in near linear time on large files.
+
+``difflib.SequenceMatcher`` and ``Differ._fancy_replace`` are quadratic on
+large or heavily changed files. Here lines are hashed to integers, and
+matched with patience diff: lines appearing once in both sides are used as
+anchors, and regions between anchors are diffed recursively. Small regions
+without such lines are diffed with Myers' algorithm, bounded by number of
+edits, larger ones are taken as replaced.
+"""
+from bisect import bisect_left
+from difflib import SequenceMatcher
+
+# Regions with no more lines than this are diffed with Myers' algorithm.
+MYERS_MAX_LINES = 2000
+# Give up Myers' algorithm when more edits are needed.
+MYERS_MAX_EDITS = 200
+
+# Changed lines are highlighted only in hunks with no more lines than this
+# on each side.
+INTRALINE_MAX_LINES = 20
+INTRALINE_MAX_LINE_LENGTH = 500
+# Same cutoff as ``Differ._fancy_replace``.
+INTRALINE_CUTOFF = 0.75
+
+def _hash_lines(a, b):
+    ids = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+    return a_ids, b_ids
+
+def _longest_increasing_pairs(pairs):
+    """Return longest subsequence of ``pairs`` (sorted by first item) which is
+    also increasing by second item, with patience sorting.
+    """
+    tails = []
+    tail_indexes = []
+    prev = [None] * len(pairs)
+    for k, (i, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos > 0:
+            prev[k] = tail_indexes[pos - 1]
+        if pos == len(tails):
+            tails.append(j)
+            tail_indexes.append(k)
+        else:
+            tails[pos] = j
+            tail_indexes[pos] = k
+
+    ret = []
+    k = tail_indexes[-1] if tail_indexes else None
+    while k is not None:
+        ret.append(pairs[k])
+        k = prev[k]
+    ret.reverse()
+    return ret
+
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    a_pos = {}
+    for i in xrange(alo, ahi):
+        a_pos[a[i]] = -1 if a[i] in a_pos else i
+
+    b_pos = {}
+    for j in xrange(blo, bhi):
+        if a_pos.get(b[j], -1) != -1:
+            b_pos[b[j]] = -1 if b[j] in b_pos else j
+
+    pairs = sorted([(a_pos[x], j) for x, j in b_pos.iteritems() if j != -1])
+    return _longest_increasing_pairs(pairs)
+
+def _myers(a, alo, ahi, b, blo, bhi, max_edits=MYERS_MAX_EDITS):
+    """Return matched line pairs of the region, or ``None`` if more than
+    ``max_edits`` edits are needed.
+    """
+    n = ahi - alo
+    m = bhi - blo
+    max_d = min(n + m, max_edits)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    for d in xrange(max_d + 1):
+        trace.append(v[:])
+        for k in xrange(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _myers_backtrack(trace, offset, n, m, alo, blo)
+    return None
+
+def _myers_backtrack(trace, offset, x, y, alo, blo):
+    matches = []
+    for d in xrange(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[offset + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+    return matches
+
+def _match_lines(a, b):
+    """Return sorted list of matched ``(i, j)`` line pairs.
+    """
+    matches = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+
+        # common prefix and suffix
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            matches.extend(anchors)
+            prev_i, prev_j = alo, blo
+            for i, j in anchors:
+                regions.append((prev_i, i, prev_j, j))
+                prev_i, prev_j = i + 1, j + 1
+            regions.append((prev_i, ahi, prev_j, bhi))
+            continue
+
+        if (ahi - alo) + (bhi - blo) <= MYERS_MAX_LINES:
+            region_matches = _myers(a, alo, ahi, b, blo, bhi)
+            if region_matches:
+                matches.extend(region_matches)
+        # otherwise the whole region is replaced
+
+    matches.sort()
+    return matches
+
+def get_opcodes(a, b):
+    """Return list of ``(tag, i1, i2, j1, j2)`` to turn lines ``a`` into
+    lines ``b``, in the same format as ``SequenceMatcher.get_opcodes``.
+    """
+    a_ids, b_ids = _hash_lines(a, b)
+    opcodes = []
+    i = j = 0
+    for mi, mj in _match_lines(a_ids, b_ids) + [(len(a), len(b))]:
+        if i < mi and j < mj:
+            opcodes.append(['replace', i, mi, j, mj])
+        elif i < mi:
+            opcodes.append(['delete', i, mi, j, mj])
+        elif j < mj:
+            opcodes.append(['insert', i, mi, j, mj])
+
+        if mi < len(a):
+            if opcodes and opcodes[-1][0] == 'equal':
+                opcodes[-1][2] += 1
+                opcodes[-1][4] += 1
+            else:
+                opcodes.append(['equal', mi, mi + 1, mj, mj + 1])
+        i, j = mi + 1, mj + 1
+    return [tuple(op) for op in opcodes]
+
+def _intraline_changes(x, y):
+    """Return ``x`` and ``y`` with changed characters marked as in
+    ``Differ._qformat``, or ``None`` if the two lines are not similar.
+    """
+    if len(x) > INTRALINE_MAX_LINE_LENGTH or \
+       len(y) > INTRALINE_MAX_LINE_LENGTH:
+        return None
+
+    s = SequenceMatcher(None, x, y)
+    if not (s.real_quick_ratio() > INTRALINE_CUTOFF and
+            s.quick_ratio() > INTRALINE_CUTOFF and
+            s.ratio() > INTRALINE_CUTOFF):
+        return None
+
+    x_parts, y_parts = [], []
+    for tag, i1, i2, j1, j2 in s.get_opcodes():
+        if tag == 'equal':
+            x_parts.append(x[i1:i2])
+            y_parts.append(y[j1:j2])
+            continue
+
+        x_key = '^' if tag == 'replace' else '-'
+        y_key = '^' if tag == 'replace' else '+'
+        if i1 < i2:
+            x_parts.append(_mark(x_key, x[i1:i2]))
+        if j1 < j2:
+            y_parts.append(_mark(y_key, y[j1:j2]))
+    return ''.join(x_parts), ''.join(y_parts)
+
+def _mark(key, text):
+    # if line of text is just a newline, insert a space so there is
+    # something for the user to highlight and see.
+    return '\0' + key + (text or ' ') + '\1'
+
+def _changed_rows(tag, a, i1, i2, b, j1, j2):
+    n = max(i2 - i1, j2 - j1)
+    small = tag == 'replace' and n <= INTRALINE_MAX_LINES
+    for k in xrange(n):
+        i, j = i1 + k, j1 + k
+        from_line = to_line = ('', '\n')
+        changes = None
+        if i < i2 and j < j2 and small:
+            changes = _intraline_changes(a[i], b[j])
+
+        if changes:
+            from_line = (i + 1, changes[0])
+            to_line = (j + 1, changes[1])
+        else:
+            if i < i2:
+                from_line = (i + 1, _mark('-', a[i]))
+            if j < j2:
+                to_line = (j + 1, _mark('+', b[j]))
+        yield from_line, to_line, True
+
+def _iter_rows(a, b, context):
+    opcodes = get_opcodes(a, b)
+    last = len(opcodes) - 1
+    for idx, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag != 'equal':
+            for row in _changed_rows(tag, a, i1, i2, b, j1, j2):
+                yield row
+            continue
+
+        if context is None:
+            head, tail = i2 - i1, 0
+        else:
+            head = 0 if idx == 0 else context
+            tail = 0 if idx == last else context
+        if i2 - i1 <= head + tail:
+            head, tail = i2 - i1, 0
+
+        for k in xrange(head):
+            yield (i1 + k + 1, a[i1 + k]), (j1 + k + 1, b[j1 + k]), False
+        if head + tail < i2 - i1 and 0 < idx < last:
+            # context separator, only between hunks
+            yield None, None, None
+        for k in xrange(tail, 0, -1):
+            yield (i2 - k + 1, a[i2 - k]), (j2 - k + 1, b[j2 - k]), False
+
+def mdiff(fromlines, tolines, context=None, max_rows=None):
+    """Return side by side differences in the format of
+    ``htmldiff._mdiff``, and whether they are truncated to ``max_rows``.
+
+    context -- number of context lines around changes, or ``None`` to
+               return all lines.
+    """
+    rows = []
+    for row in _iter_rows(fromlines, tolines, context):
+        if max_rows is not None and len(rows) >= max_rows:
+            return rows, True
+        rows.append(row)
+    return rows, False
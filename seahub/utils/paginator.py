@@ -1,5 +1,8 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
+import datetime
+
 from django.core.paginator import Paginator as DefaultPaginator
+from django.db.models import Q
 
 def get_page_range(current_page, num_pages):
     first_page = 1
@@ -19,3 +22,181 @@ class Paginator(DefaultPaginator):
         Returns custom range of pages.
         """
         return get_page_range(current_page, self.num_pages)
+
+class KeysetPage(object):
+    def __init__(self, object_list, has_next, has_previous, key_field):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.key_field = key_field
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next and len(self.object_list) > 0
+
+    def has_previous(self):
+        return self._has_previous and len(self.object_list) > 0
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_cursor(self):
+        """Cursor pointing to the items older than this page.
+        """
+        if not self.has_next():
+            return None
+        return encode_cursor(self.object_list[-1], self.key_field)
+
+    def previous_cursor(self):
+        """Cursor pointing to the items newer than this page.
+        """
+        if not self.has_previous():
+            return None
+        return encode_cursor(self.object_list[0], self.key_field)
+
+CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+def encode_cursor(obj, key_field='timestamp'):
+    return '%s_%s' % (getattr(obj, key_field).strftime(CURSOR_TIME_FORMAT),
+                      obj.pk)
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)`` from a cursor, or ``None`` if it is invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        ts, pk = cursor.split('_', 1)
+        return datetime.datetime.strptime(ts, CURSOR_TIME_FORMAT), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+class KeysetPaginator(object):
+    """Paginate a queryset newest first by ``(key_field, pk)`` cursors.
+
+    Unlike ``Paginator``, no ``COUNT(*)`` is issued and deep pages do not
+    scan skipped rows with ``OFFSET``, at the cost of not knowing the total
+    number of pages.
+    """
+    def __init__(self, queryset, per_page, key_field='timestamp'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.key_field = key_field
+
+    def page(self, before=None, after=None):
+        """Return the page older than ``before`` cursor, or newer than
+        ``after`` cursor, or the newest page if neither is valid.
+        """
+        key = self.key_field
+        before = decode_cursor(before)
+        after = decode_cursor(after) if before is None else None
+
+        if after is not None:
+            ts, pk = after
+            qs = self.queryset.filter(
+                Q(**{key + '__gt': ts}) | Q(**{key: ts, 'pk__gt': pk})
+            ).order_by(key, 'pk')
+            objs = list(qs[:self.per_page + 1])
+            has_previous = len(objs) > self.per_page
+            objs = objs[:self.per_page]
+            objs.reverse()
+            return KeysetPage(objs, True, has_previous, key)
+
+        qs = self.queryset
+        if before is not None:
+            ts, pk = before
+            qs = qs.filter(
+                Q(**{key + '__lt': ts}) | Q(**{key: ts, 'pk__lt': pk}))
+        qs = qs.order_by('-' + key, '-pk')
+        objs = list(qs[:self.per_page + 1])
+        has_next = len(objs) > self.per_page
+        return KeysetPage(objs[:self.per_page], has_next, before is not None,
+                          key)
+
+def _encode_key_value(value):
+    if value is None:
+        return 'n'
+    if isinstance(value, datetime.datetime):
+        return 't' + value.strftime(CURSOR_TIME_FORMAT)
+    return 'i%d' % value
+
+def _decode_key_value(value):
+    kind, raw = value[:1], value[1:]
+    if kind == 'n' and not raw:
+        return None
+    if kind == 't':
+        return datetime.datetime.strptime(raw, CURSOR_TIME_FORMAT)
+    if kind == 'i':
+        return int(raw)
+    raise ValueError('invalid cursor value: %s' % value)
+
+def encode_keyset_cursor(obj, key_field):
+    """Like ``encode_cursor``, but ``key_field`` may also be an integer or
+    ``None``.
+    """
+    return '%s_%s' % (_encode_key_value(getattr(obj, key_field)), obj.pk)
+
+def decode_keyset_cursor(cursor):
+    """Return ``(value, pk)`` from a cursor made by ``encode_keyset_cursor``,
+    or ``None`` if it is invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        value, pk = cursor.rsplit('_', 1)
+        return _decode_key_value(value), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+def keyset_page(queryset, per_page, key_field, cursor=None, desc=True):
+    """Return ``(objects, next_cursor)`` of the page after ``cursor`` (as
+    returned by ``decode_keyset_cursor``), ordered by ``(key_field, pk)``.
+
+    Rows whose ``key_field`` is ``NULL`` always come last, ordered by pk, so
+    the order does not depend on how the database sorts ``NULL``.
+    """
+    op = '__lt' if desc else '__gt'
+    sign = '-' if desc else ''
+    nullable = queryset.model._meta.get_field(key_field).null
+
+    objs = []
+    if cursor is None or cursor[0] is not None:
+        qs = queryset
+        if nullable:
+            qs = qs.filter(**{key_field + '__isnull': False})
+        if cursor is not None:
+            value, pk = cursor
+            qs = qs.filter(Q(**{key_field + op: value}) |
+                           Q(**{key_field: value, 'pk' + op: pk}))
+        objs = list(qs.order_by(sign + key_field, sign + 'pk')[:per_page + 1])
+
+    if nullable and len(objs) <= per_page:
+        qs = queryset.filter(**{key_field + '__isnull': True})
+        if cursor is not None and cursor[0] is None:
+            qs = qs.filter(**{'pk' + op: cursor[1]})
+        objs += list(qs.order_by(sign + 'pk')[:per_page + 1 - len(objs)])
+
+    next_cursor = None
+    if len(objs) > per_page:
+        objs = objs[:per_page]
+        next_cursor = encode_keyset_cursor(objs[-1], key_field)
+    return objs, next_cursor
+
+def order_nulls_last(queryset, key_field, desc=True):
+    """Return all objects of ``queryset`` in the order ``keyset_page`` pages
+    them, i.e. by ``(key_field, pk)`` with ``NULL`` ones last.
+    """
+    sign = '-' if desc else ''
+    if not queryset.model._meta.get_field(key_field).null:
+        return list(queryset.order_by(sign + key_field, sign + 'pk'))
+
+    objs = list(queryset.filter(**{key_field + '__isnull': False}).order_by(
+        sign + key_field, sign + 'pk'))
+    objs += list(queryset.filter(**{key_field + '__isnull': True}).order_by(
+        sign + 'pk'))
+    return objs
@@ -0,0 +1,171 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+# -*- coding: utf-8 -*-
+"""Cached snapshots of user space quota and usage.
+
+Usage is expensive to compute on seafile side, so a snapshot is served from
+cache while it is younger than ``QUOTA_SNAPSHOT_TTL``. An older snapshot is
+still served (together with its ``timestamp``) while it is refreshed by the
+background pool of ``seahub.utils.threadpool``, until it is older than
+``QUOTA_SNAPSHOT_MAX_AGE``.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from pysearpc import SearpcError
+from seaserv import seafile_api, ccnet_threaded_rpc, seafserv_threaded_rpc
+
+from seahub.utils import normalize_cache_key, get_user_traffic_stat
+from seahub.utils.threadpool import run_concurrently, run_in_background
+
+logger = logging.getLogger(__name__)
+
+QUOTA_SNAPSHOT_CACHE_PREFIX = 'QUOTA_SNAPSHOT_'
+TRAFFIC_STAT_CACHE_PREFIX = 'TRAFFIC_STAT_'
+QUOTA_SNAPSHOT_TTL = getattr(settings, 'QUOTA_SNAPSHOT_TTL', 60)
+QUOTA_SNAPSHOT_MAX_AGE = getattr(settings, 'QUOTA_SNAPSHOT_MAX_AGE', 10 * 60)
+
+# Lock timeout(seconds) used to make sure only one refresh is running for a
+# user.
+_REFRESH_LOCK_TIMEOUT = 30
+
+def _snapshot_cache_key(username):
+    return normalize_cache_key(username, QUOTA_SNAPSHOT_CACHE_PREFIX)
+
+def _compute_snapshot(username):
+    """Query seafile for user's org, quota and usage.
+
+    Return ``None`` on RPC error.
+    """
+    try:
+        orgs = ccnet_threaded_rpc.get_orgs_by_user(username)
+        if orgs:
+            org = orgs[0]
+            org_info = {'org_id': org.org_id, 'org_name': org.org_name}
+            space_usage = seafserv_threaded_rpc.get_org_user_quota_usage(
+                org.org_id, username)
+            space_quota = seafserv_threaded_rpc.get_org_user_quota(
+                org.org_id, username)
+        else:
+            org_info = None
+            space_usage = seafile_api.get_user_self_usage(username)
+            space_quota = seafile_api.get_user_quota(username)
+    except SearpcError as e:
+        logger.error(e)
+        return None
+
+    return {
+        'org': org_info,
+        'space_usage': space_usage,
+        'space_quota': space_quota,
+        'timestamp': int(time.time()),
+    }
+
+def _refresh_snapshot(username):
+    snapshot = _compute_snapshot(username)
+    if snapshot is not None:
+        cache.set(_snapshot_cache_key(username), snapshot,
+                  QUOTA_SNAPSHOT_MAX_AGE)
+    return snapshot
+
+def _refresh_in_background(username):
+    lock_key = _snapshot_cache_key(username) + '_LOCK'
+    if not cache.add(lock_key, 1, _REFRESH_LOCK_TIMEOUT):
+        return                  # another refresh is running
+
+    def refresh():
+        try:
+            _refresh_snapshot(username)
+        finally:
+            cache.delete(lock_key)
+
+    if not run_in_background(refresh):
+        # too many refreshes queued, retry on a later request
+        cache.delete(lock_key)
+
+def _is_stale(snapshot):
+    return int(time.time()) - snapshot['timestamp'] > QUOTA_SNAPSHOT_TTL
+
+def get_quota_snapshot(username):
+    """Return a dict with ``org``, ``space_usage``, ``space_quota`` and
+    ``timestamp`` of the user, or ``None`` if seafile can not be reached.
+    """
+    snapshot = cache.get(_snapshot_cache_key(username))
+    if snapshot is None:
+        return _refresh_snapshot(username)
+
+    if _is_stale(snapshot):
+        _refresh_in_background(username)
+    return snapshot
+
+def get_quota_snapshots(usernames):
+    """Bulk version of ``get_quota_snapshot``, return a dict of username to
+    snapshot.
+
+    Snapshots missing from cache are computed concurrently.
+    """
+    usernames = list(set(usernames))
+    keys = dict([(_snapshot_cache_key(u), u) for u in usernames])
+    cached = cache.get_many(keys.keys())
+
+    ret = {}
+    for key, snapshot in cached.iteritems():
+        username = keys[key]
+        ret[username] = snapshot
+        if _is_stale(snapshot):
+            _refresh_in_background(username)
+
+    missing = [u for u in usernames if u not in ret]
+    snapshots = run_concurrently(_compute_snapshot, missing)
+    to_cache = {}
+    for username, snapshot in zip(missing, snapshots):
+        ret[username] = snapshot
+        if snapshot is not None:
+            to_cache[_snapshot_cache_key(username)] = snapshot
+    if to_cache:
+        cache.set_many(to_cache, QUOTA_SNAPSHOT_MAX_AGE)
+
+    return ret
+
+def clear_quota_snapshot(username):
+    cache.delete(_snapshot_cache_key(username))
+
+def populate_users_quota_usage(users):
+    """Populate ``space_usage``, ``space_quota``, ``org`` and
+    ``quota_updated_at`` to each of ``users``.
+    """
+    snapshots = get_quota_snapshots([u.email for u in users])
+    for user in users:
+        snapshot = snapshots.get(user.email)
+        if snapshot is None:
+            user.space_usage = -1
+            user.space_quota = -1
+            user.quota_updated_at = None
+            continue
+
+        if snapshot['org']:
+            user.org = snapshot['org']
+        user.space_usage = snapshot['space_usage']
+        user.space_quota = snapshot['space_quota']
+        user.quota_updated_at = snapshot['timestamp']
+
+def get_traffic_stat_snapshot(username):
+    """Return user's traffic stat of this month, cached for
+    ``QUOTA_SNAPSHOT_TTL`` seconds.
+    """
+    key = normalize_cache_key(username, TRAFFIC_STAT_CACHE_PREFIX)
+    stat = cache.get(key)
+    if stat is not None:
+        return stat
+
+    try:
+        stat = get_user_traffic_stat(username)
+    except Exception as e:
+        logger.error(e)
+        return None
+
+    if stat is not None:
+        cache.set(key, stat, QUOTA_SNAPSHOT_TTL)
+    return stat
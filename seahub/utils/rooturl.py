@@ -29,6 +29,8 @@ from django.conf import settings
 from django.conf.urls import patterns, include
 from django.core.exceptions import ImproperlyConfigured
 
+from seahub.utils.url_dispatch import PrefixTrieURLResolver
+
 
 # Ensures that we can run nose on this without needing to set SITE_ROOT.
 # Also serves to let people know if they set one variable without the other.
@@ -37,6 +39,12 @@ if hasattr(settings, "SITE_ROOT"):
         raise ImproperlyConfigured("SITE_ROOT_URLCONF must be set when "
                                    "using SITE_ROOT")
 
-    urlpatterns = patterns('',
-        (r'^%s' % settings.SITE_ROOT[1:], include(settings.SITE_ROOT_URLCONF)),
-    )
+    if getattr(settings, 'URL_DISPATCH_PREFIX_TRIE', True):
+        urlpatterns = [
+            PrefixTrieURLResolver(r'^%s' % settings.SITE_ROOT[1:],
+                                  settings.SITE_ROOT_URLCONF),
+        ]
+    else:
+        urlpatterns = patterns('',
+            (r'^%s' % settings.SITE_ROOT[1:], include(settings.SITE_ROOT_URLCONF)),
+        )
@@ -0,0 +1,161 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Local spool of items which could not be delivered yet.
+
+Items are written as JSON lines to files of a directory, and delivered
+later by ``Spool.drain``, usually from a worker command. A file is only
+removed after all of its items are delivered, so an item may be delivered
+more than once, but is not lost.
+
+A journal (see ``open_journal``) is a file appended to by one process. It is
+named as claimed by that process, so it is only drained after the process
+is gone, e.g. killed before its items were delivered.
+"""
+import errno
+import json
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SPOOL_FILE_SUFFIX = '.json'
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+class Spool(object):
+    def __init__(self, path):
+        self.path = path
+
+    def _makedirs(self):
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def _new_name(self):
+        # named by time, so files are drained in order they are written
+        return '%017.6f-%s' % (time.time(), uuid.uuid4().hex)
+
+    def write(self, items):
+        """Write ``items`` to a new spool file.
+        """
+        if not items:
+            return
+
+        self._makedirs()
+        name = self._new_name()
+        tmp_path = os.path.join(self.path, '.' + name)
+        with open(tmp_path, 'w') as f:
+            for item in items:
+                f.write(json.dumps(item) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, os.path.join(self.path, name + SPOOL_FILE_SUFFIX))
+
+    def _list(self):
+        try:
+            return sorted(os.listdir(self.path))
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return []
+            raise
+
+    def open_journal(self):
+        """Return ``(file, path)`` of a new journal of current process, see
+        ``append``.
+        """
+        self._makedirs()
+        path = os.path.join(self.path, '%s%s.%d' % (
+            self._new_name(), SPOOL_FILE_SUFFIX, os.getpid()))
+        return open(path, 'a'), path
+
+    def append(self, f, item):
+        """Append ``item`` to journal ``f``. It is flushed to the operating
+        system, so it is kept if the process is killed, but not fsynced.
+        """
+        f.write(json.dumps(item) + '\n')
+        f.flush()
+
+    def _is_claimable(self, name):
+        if name.startswith('.'):
+            return False
+        if name.endswith(SPOOL_FILE_SUFFIX):
+            return True
+        base, _, pid = name.rpartition('.')
+        return base.endswith(SPOOL_FILE_SUFFIX) and pid.isdigit() and \
+            not _pid_alive(int(pid))
+
+    def pending_files(self):
+        """Return names of spool files not being drained or written by a
+        running process.
+        """
+        return [x for x in self._list() if self._is_claimable(x)]
+
+    def _claim(self, name):
+        """Rename ``name`` to ``<name>.<pid>`` so no other process drains
+        it, return the new path or ``None`` if it is taken.
+        """
+        path = os.path.join(self.path, name)
+        if not name.endswith(SPOOL_FILE_SUFFIX):
+            # claimed by another process, take it over if that one is gone
+            base, _, pid = name.rpartition('.')
+            if not pid.isdigit() or _pid_alive(int(pid)):
+                return None
+            name = base
+
+        claimed = os.path.join(self.path, '%s.%d' % (name, os.getpid()))
+        try:
+            os.rename(path, claimed)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+        return claimed
+
+    def drain(self, func, batch_size=100):
+        """Call ``func`` with lists of at most ``batch_size`` spooled items,
+        and remove delivered ones. Stop at first failure, undelivered items
+        are written back. Return number of delivered items.
+        """
+        count = 0
+        for name in self._list():
+            if name.startswith('.'):
+                continue
+            path = self._claim(name)
+            if path is None:
+                continue
+
+            items = []
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError:
+                        # last line of a journal whose process was killed
+                        logger.warning('Bad line in spool file %s: %r' % (
+                            path, line))
+
+            delivered = 0
+            try:
+                for i in range(0, len(items), batch_size):
+                    func(items[i:i + batch_size])
+                    delivered = i + batch_size
+            except Exception as e:
+                logger.error('Failed to deliver spooled items: %s' % e)
+                self.write(items[delivered:])
+                os.remove(path)
+                return count + delivered
+
+            os.remove(path)
+            count += len(items)
+        return count
@@ -8,7 +8,7 @@ from django.db import IntegrityError
 from pysearpc import SearpcError
 from seaserv import seafile_api
 
-from seahub.base.models import UserStarredFiles
+from seahub.base.models import UserStarredFiles, clear_starred_files_cache
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
@@ -26,6 +26,7 @@ def star_file(email, repo_id, path, is_dir, org_id=-1):
         f.save()
     except IntegrityError, e:
         logger.warn(e)
+    clear_starred_files_cache(email)
 
 def unstar_file(email, repo_id, path):
     # Should use "get", but here we use "filter" to fix the bug caused by no
@@ -35,6 +36,7 @@ def unstar_file(email, repo_id, path):
                                              path=path)
     for r in result:
         r.delete()
+    clear_starred_files_cache(email)
             
 def is_file_starred(email, repo_id, path, org_id=-1):
     # Should use "get", but here we use "filter" to fix the bug caused by no
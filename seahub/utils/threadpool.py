@@ -0,0 +1,91 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+# -*- coding: utf-8 -*-
+import logging
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RPC_FANOUT_WORKERS = getattr(settings, 'RPC_FANOUT_WORKERS', 4)
+BACKGROUND_WORKERS = getattr(settings, 'BACKGROUND_WORKERS', 2)
+BACKGROUND_MAX_PENDING = getattr(settings, 'BACKGROUND_MAX_PENDING', 100)
+
+# Pools per process, shared by all requests, created on first use.
+# name => (pid, pool)
+_pools = {}
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+_background_pending = 0
+_background_lock = threading.Lock()
+
+def _init_worker():
+    _local.in_pool = True
+
+def _get_pool(name='fanout', workers=RPC_FANOUT_WORKERS):
+    pid, pool = _pools.get(name, (None, None))
+    if pool is None or pid != os.getpid():
+        with _pool_lock:
+            pid, pool = _pools.get(name, (None, None))
+            if pool is None or pid != os.getpid():
+                # threads of a pool are not copied to forked processes
+                pool = ThreadPool(workers, initializer=_init_worker)
+                _pools[name] = (os.getpid(), pool)
+    return pool
+
+def run_concurrently(func, args_list, max_workers=None):
+    """Call ``func`` with each item of ``args_list`` in a thread pool, and
+    return results in the same order as ``args_list``.
+
+    Use this only for independent RPC calls, not for database queries, since
+    each thread would open its own database connection.
+    """
+    args_list = list(args_list)
+    if max_workers is None:
+        max_workers = RPC_FANOUT_WORKERS
+
+    workers = min(max_workers, len(args_list))
+    if workers <= 1 or getattr(_local, 'in_pool', False):
+        # called from a thread of the pool, waiting for the pool could
+        # deadlock
+        return [func(args) for args in args_list]
+
+    return _get_pool().map(func, args_list)
+
+def call_concurrently(*funcs):
+    """Call each of ``funcs`` without arguments in a thread pool, and return
+    a list of their results.
+    """
+    return run_concurrently(lambda func: func(), funcs)
+
+def run_in_background(func, *args):
+    """Call ``func`` with ``args`` later in a small pool of threads, without
+    waiting for the result. Return ``False`` if the task is dropped because
+    ``BACKGROUND_MAX_PENDING`` tasks are already queued or running.
+    """
+    global _background_pending
+    with _background_lock:
+        if _background_pending >= BACKGROUND_MAX_PENDING:
+            return False
+        _background_pending += 1
+
+    def run():
+        global _background_pending
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(e)
+        finally:
+            with _background_lock:
+                _background_pending -= 1
+
+    try:
+        _get_pool('background', BACKGROUND_WORKERS).apply_async(run)
+    except Exception:
+        with _background_lock:
+            _background_pending -= 1
+        raise
+    return True
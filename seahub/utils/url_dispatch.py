@@ -0,0 +1,192 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+# -*- coding: utf-8 -*-
+"""URL resolver which only tries patterns that can match the path.
+
+Django tries URL patterns one by one, so requests to frequently used API
+endpoints pay for hundreds of regexes listed before them. Here the URL tree
+is flattened into routes, each with the literal prefix all paths it matches
+start with, e.g. ``api2/repos/`` for ``^api2/`` + ``^repos/(?P<repo_id>...)``.
+Routes are put in a prefix trie, and a path is only tried against routes
+whose prefix it starts with, in their original order. Since other routes
+can never match, the result is the same as the standard resolver's.
+
+Number of hits of each route is counted in process, see ``get_route_hits``.
+"""
+import threading
+
+from django.core.urlresolvers import RegexURLResolver, ResolverMatch, \
+    LocaleRegexURLResolver
+
+_QUANTIFIERS = '*+?{'
+_SPECIAL_CHARS = '.^$*+?{}[]()|\\'
+
+def literal_prefix(pattern):
+    """Return ``(prefix, complete)``, where ``prefix`` is a literal string
+    that all strings matched by regex ``pattern`` start with, and
+    ``complete`` tells whether the whole regex is that literal string.
+    """
+    if not pattern.startswith('^') or '|' in pattern:
+        return '', False
+
+    prefix = []
+    i, n = 1, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 < n and not pattern[i + 1].isalnum():
+                char, step = pattern[i + 1], 2  # escaped punctuation, e.g. \.
+            else:
+                return ''.join(prefix), False
+        elif c in _SPECIAL_CHARS:
+            return ''.join(prefix), False
+        else:
+            char, step = c, 1
+
+        if i + step < n and pattern[i + step] in _QUANTIFIERS:
+            # char is optional or repeated
+            return ''.join(prefix), False
+        prefix.append(char)
+        i += step
+    return ''.join(prefix), True
+
+class Route(object):
+    def __init__(self, resolvers, pattern):
+        self.index = None
+        self.resolvers = resolvers
+        self.pattern = pattern
+        self.name = pattern.name or '/'.join(
+            [r.regex.pattern for r in resolvers] + [pattern.regex.pattern])
+
+    def resolve(self, path):
+        """Same as resolving ``path`` with the chain of resolvers down to
+        this pattern, return ``ResolverMatch`` or ``None``.
+        """
+        levels = []
+        for resolver in self.resolvers:
+            match = resolver.regex.search(path)
+            if not match:
+                return None
+            path = path[match.end():]
+            levels.append((match.groupdict(), resolver))
+
+        sub_match = self.pattern.resolve(path)
+        if not sub_match:
+            return None
+
+        for groupdict, resolver in reversed(levels):
+            kwargs = dict(groupdict, **resolver.default_kwargs)
+            kwargs.update(sub_match.kwargs)
+            sub_match = ResolverMatch(
+                sub_match.func, sub_match.args, kwargs, sub_match.url_name,
+                resolver.app_name or sub_match.app_name,
+                [resolver.namespace] + sub_match.namespaces)
+        return sub_match
+
+class _Node(object):
+    __slots__ = ('children', 'routes')
+
+    def __init__(self, routes):
+        self.children = {}
+        # routes which may match paths with prefix of this node, in order
+        self.routes = routes
+
+def _flatten(url_patterns, resolvers, prefix, routes):
+    """Append ``(prefix, route)`` for each pattern under ``url_patterns``.
+    """
+    for p in url_patterns:
+        if isinstance(p, LocaleRegexURLResolver):
+            # regex depends on active language
+            p_prefix, complete = '', False
+        else:
+            p_prefix, complete = literal_prefix(p.regex.pattern)
+
+        if isinstance(p, RegexURLResolver):
+            if complete:
+                _flatten(p.url_patterns, resolvers + [p], prefix + p_prefix,
+                         routes)
+            else:
+                # paths under it have no longer literal prefix
+                sub_routes = []
+                _flatten(p.url_patterns, resolvers + [p], '', sub_routes)
+                for _, route in sub_routes:
+                    routes.append((prefix + p_prefix, route))
+        else:
+            routes.append((prefix + p_prefix, Route(resolvers, p)))
+
+def build_trie(url_patterns):
+    routes = []
+    _flatten(url_patterns, [], '', routes)
+    for index, (_, route) in enumerate(routes):
+        route.index = index
+
+    root = _Node([])
+    for prefix, route in routes:
+        node = root
+        for char in prefix:
+            node = node.children.setdefault(char, _Node([]))
+        node.routes.append(route)
+
+    # routes of a node include routes of its ancestors
+    stack = [(root, [])]
+    while stack:
+        node, inherited = stack.pop()
+        node.routes = sorted(inherited + node.routes, key=lambda r: r.index)
+        for child in node.children.itervalues():
+            stack.append((child, node.routes))
+    return root
+
+def candidate_routes(root, path):
+    node = root
+    for char in path:
+        child = node.children.get(char)
+        if child is None:
+            break
+        node = child
+    return node.routes
+
+_route_hits = {}
+
+def _count_hit(route):
+    _route_hits[route.name] = _route_hits.get(route.name, 0) + 1
+
+def get_route_hits(n=None):
+    """Return list of ``(route name, hits)`` of this process, most hit
+    first.
+    """
+    hits = sorted(_route_hits.items(), key=lambda x: x[1], reverse=True)
+    return hits[:n] if n is not None else hits
+
+def clear_route_hits():
+    _route_hits.clear()
+
+class PrefixTrieURLResolver(RegexURLResolver):
+    def __init__(self, *args, **kwargs):
+        super(PrefixTrieURLResolver, self).__init__(*args, **kwargs)
+        self._trie = None
+        self._trie_lock = threading.Lock()
+
+    def _get_trie(self):
+        if self._trie is None:
+            with self._trie_lock:
+                if self._trie is None:
+                    self._trie = build_trie(self.url_patterns)
+        return self._trie
+
+    def resolve(self, path):
+        match = self.regex.search(path)
+        if match:
+            new_path = path[match.end():]
+            for route in candidate_routes(self._get_trie(), new_path):
+                sub_match = route.resolve(new_path)
+                if sub_match:
+                    _count_hit(route)
+                    kwargs = dict(match.groupdict(), **self.default_kwargs)
+                    kwargs.update(sub_match.kwargs)
+                    return ResolverMatch(
+                        sub_match.func, sub_match.args, kwargs,
+                        sub_match.url_name,
+                        self.app_name or sub_match.app_name,
+                        [self.namespace] + sub_match.namespaces)
+
+        # not found, let the standard resolver report what was tried
+        return super(PrefixTrieURLResolver, self).resolve(path)
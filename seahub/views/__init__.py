@@ -44,6 +44,7 @@ from seahub.utils import render_permission_error, render_error, \
     new_merge_with_no_conflict, get_max_upload_file_size, \
     is_pro_version, FILE_AUDIT_ENABLED, \
     is_org_repo_creation_allowed
+from seahub.utils.commit_diff import get_commit_diff
 from seahub.utils.star import get_dir_starred_files
 from seahub.utils.timeutils import utc_to_local
 from seahub.views.modules import MOD_PERSONAL_WIKI, enable_mod_for_user, \
@@ -685,7 +686,7 @@ def get_diff(repo_id, arg1, arg2):
     lists = {'new': [], 'removed': [], 'renamed': [], 'modified': [],
              'newdir': [], 'deldir': []}
 
-    diff_result = seafserv_threaded_rpc.get_diff(repo_id, arg1, arg2)
+    diff_result = get_commit_diff(repo_id, arg1, arg2)
     if not diff_result:
         return lists
 
@@ -1178,7 +1179,7 @@ def convert_cmmt_desc_link(request):
     if check_folder_permission(request, repo_id, '/') is None:
         raise Http404
 
-    diff_result = seafserv_threaded_rpc.get_diff(repo_id, '', cmmt_id)
+    diff_result = get_commit_diff(repo_id, '', cmmt_id)
     if not diff_result:
         raise Http404
 
@@ -5,9 +5,7 @@ import stat
 import logging
 import json
 import posixpath
-import csv
 import chardet
-import StringIO
 
 from django.core.urlresolvers import reverse
 from django.http import HttpResponse, Http404, HttpResponseBadRequest
@@ -46,19 +44,21 @@ from seahub.views.modules import get_enabled_mods_by_group, \
     disable_mod_for_group, MOD_GROUP_WIKI, MOD_PERSONAL_WIKI, \
     enable_mod_for_user, disable_mod_for_user
 from seahub.group.views import is_group_staff
-from seahub.group.utils import is_group_member, is_group_admin_or_owner, \
+from seahub.group.utils import is_group_admin_or_owner, \
     get_group_member_info
+from seahub.jobs.handlers import submit_job, JOB_GROUP_MEMBERS_IMPORT
 import seahub.settings as settings
 from seahub.settings import ENABLE_THUMBNAIL, THUMBNAIL_ROOT, \
     THUMBNAIL_DEFAULT_SIZE, ENABLE_SUB_LIBRARY, \
     ENABLE_FOLDER_PERM, SHOW_TRAFFIC, MEDIA_URL
 from constance import config
 from seahub.utils import check_filename_with_rename, EMPTY_SHA1, \
-    gen_block_get_url, TRAFFIC_STATS_ENABLED, get_user_traffic_stat,\
+    gen_block_get_url, is_traffic_stats_enabled, get_user_traffic_stat,\
     new_merge_with_no_conflict, get_commit_before_new_merge, \
     get_repo_last_modify, gen_file_upload_url, is_org_context, \
     get_org_user_events, get_user_events, get_file_type_and_ext, \
     is_valid_username, send_perm_audit_msg, get_origin_repo_info, is_pro_version
+from seahub.utils.quota import get_quota_snapshot, get_traffic_stat_snapshot
 from seahub.utils.repo import get_sub_repo_abbrev_origin_path
 from seahub.utils.star import star_file, unstar_file, get_dir_starred_files
 from seahub.base.accounts import User
@@ -1233,16 +1233,16 @@ def space_and_traffic(request):
     username = request.user.username
 
     # space & quota calculation
-    org = ccnet_threaded_rpc.get_orgs_by_user(username)
-    if not org:
-        space_quota = seafile_api.get_user_quota(username)
-        space_usage = seafile_api.get_user_self_usage(username)
+    snapshot = get_quota_snapshot(username)
+    if snapshot is None:
+        org = None
+        space_quota = space_usage = -1
+        quota_updated_at = None
     else:
-        org_id = org[0].org_id
-        space_quota = seafserv_threaded_rpc.get_org_user_quota(org_id,
-                                                               username)
-        space_usage = seafserv_threaded_rpc.get_org_user_quota_usage(
-            org_id, username)
+        org = snapshot['org']
+        space_quota = snapshot['space_quota']
+        space_usage = snapshot['space_usage']
+        quota_updated_at = snapshot['timestamp']
 
     rates = {}
     if space_quota > 0:
@@ -1252,13 +1252,10 @@ def space_and_traffic(request):
 
     # traffic calculation
     traffic_stat = 0
-    if TRAFFIC_STATS_ENABLED:
+    traffic_stats_enabled = is_traffic_stats_enabled()
+    if traffic_stats_enabled:
         # User's network traffic stat in this month
-        try:
-            stat = get_user_traffic_stat(username)
-        except Exception as e:
-            logger.error(e)
-            stat = None
+        stat = get_traffic_stat_snapshot(username)
 
         if stat:
             traffic_stat = stat['file_view'] + stat['file_download'] + stat['dir_download']
@@ -1284,7 +1281,7 @@ def space_and_traffic(request):
         "space_usage": space_usage,
         "rates": rates,
         "SHOW_TRAFFIC": SHOW_TRAFFIC,
-        "TRAFFIC_STATS_ENABLED": TRAFFIC_STATS_ENABLED,
+        "TRAFFIC_STATS_ENABLED": traffic_stats_enabled,
         "traffic_stat": traffic_stat,
         "ENABLE_PAYMENT": ENABLE_PAYMENT,
         "payment_url": payment_url,
@@ -1292,7 +1289,10 @@ def space_and_traffic(request):
 
     html = render_to_string('snippets/space_and_traffic.html', ctx,
                             context_instance=RequestContext(request))
-    return HttpResponse(json.dumps({"html": html}), content_type=content_type)
+    return HttpResponse(json.dumps({
+        "html": html,
+        "quota_updated_at": quota_updated_at,
+    }), content_type=content_type)
 
 def get_share_in_repo_list(request, start, limit):
     """List share in repos.
@@ -2021,75 +2021,32 @@ def ajax_group_members_import(request, group_id):
         encoding = chardet.detect(content)['encoding']
         if encoding != 'utf-8':
             content = content.decode(encoding, 'replace').encode('utf-8')
-
-        filestream = StringIO.StringIO(content)
-        reader = csv.reader(filestream)
     except Exception as e:
         logger.error(e)
         result['error'] = 'Internal Server Error'
         return HttpResponse(json.dumps(result), status=500,
                         content_type=content_type)
 
-    # prepare email list from uploaded file
-    emails_list = []
-    for row in reader:
-        if not row:
-            continue
-
-        email = row[0].strip().lower()
-        emails_list.append(email)
-
     org_id = None
     if is_org_context(request):
         org_id = request.user.org.org_id
 
-    result = {}
-    result['failed'] = []
-    result['success'] = []
-    emails_need_add = []
-
-    # check email validation
-    for email in emails_list:
-        try:
-            User.objects.get(email=email)
-        except User.DoesNotExist:
-            result['failed'].append({
-                'email': email,
-                'error_msg': 'User %s not found.' % email
-                })
-            continue
-
-        if is_group_member(group_id, email):
-            result['failed'].append({
-                'email': email,
-                'error_msg': _(u'User %s is already a group member.') % email
-                })
-            continue
-
-        # Can only invite organization users to group
-        if org_id and not \
-            seaserv.ccnet_threaded_rpc.org_user_exists(org_id, email):
-            result['failed'].append({
-                'email': email,
-                'error_msg': _(u'User %s not found in organization.') % email
-                })
-            continue
-
-        emails_need_add.append(email)
+    # Small files are imported at once, large ones by background worker.
+    job = submit_job(JOB_GROUP_MEMBERS_IMPORT, username,
+                     params={'group_id': group_id, 'org_id': org_id},
+                     data=content)
+    if not job.is_finished():
+        result = {
+            'job_id': job.pk,
+            'progress_url': reverse('jobs:job_progress', args=[job.pk]),
+        }
+        return HttpResponse(json.dumps(result), content_type=content_type)
 
-    # Add email to group.
-    for email in emails_need_add:
-        try:
-            seaserv.ccnet_threaded_rpc.group_add_member(group_id,
-                username, email)
-            member_info = get_group_member_info(request, group_id, email)
-            result['success'].append(member_info)
-        except SearpcError as e:
-            logger.error(e)
-            result['failed'].append({
-                'email': email,
-                'error_msg': 'Internal Server Error'
-                })
+    job_result = job.get_result()
+    result = {}
+    result['failed'] = job_result.get('failed', [])
+    result['success'] = [get_group_member_info(request, group_id, email)
+                         for email in job_result.get('success', [])]
 
     return HttpResponse(json.dumps(result), content_type=content_type)
 
@@ -10,7 +10,7 @@ import hashlib
 import json
 import stat
 import urllib2
-import chardet
+from chardet.universaldetector import UniversalDetector
 import logging
 import posixpath
 import re
@@ -19,10 +19,10 @@ import urlparse
 import datetime
 
 from django.core import signing
+from django.core.cache import cache
 from django.contrib.sites.models import RequestSite
 from django.contrib import messages
 from django.core.urlresolvers import reverse
-from django.db.models import F
 from django.http import HttpResponse, Http404, HttpResponseRedirect, HttpResponseBadRequest, HttpResponseForbidden
 from django.shortcuts import render_to_response
 from django.template import RequestContext
@@ -33,7 +33,7 @@ from django.template.defaultfilters import filesizeformat
 from django.views.decorators.csrf import csrf_exempt
 
 from seaserv import seafile_api
-from seaserv import get_repo, send_message, get_commits, \
+from seaserv import get_repo, send_message, \
     get_file_id_by_path, get_commit, get_file_size, \
     seafserv_threaded_rpc
 from pysearpc import SearpcError
@@ -41,21 +41,27 @@ from pysearpc import SearpcError
 from seahub.avatar.templatetags.group_avatar_tags import grp_avatar
 from seahub.auth.decorators import login_required
 from seahub.base.decorators import repo_passwd_set_required
-from seahub.share.models import FileShare, check_share_link_common
+from seahub.base.middleware import record_phase_timing
+from seahub.share.models import FileShare, check_share_link_common, \
+    incr_share_link_view_cnt
 from seahub.share.decorators import share_link_audit
-from seahub.wiki.utils import get_wiki_dirent
+from seahub.wiki.utils import get_wiki_page_index, find_wiki_dirent
 from seahub.wiki.models import WikiDoesNotExist, WikiPageMissing
 from seahub.utils import render_error, is_org_context, \
     get_file_type_and_ext, gen_file_get_url, gen_file_share_link, \
     render_permission_error, is_pro_version, is_textual_file, \
-    mkstemp, EMPTY_SHA1, HtmlDiff, gen_inner_file_get_url, \
+    mkstemp, EMPTY_SHA1, gen_inner_file_get_url, \
     user_traffic_over_limit, get_file_audit_events_by_path, \
-    generate_file_audit_event_type, FILE_AUDIT_ENABLED
+    generate_file_audit_event_type, FILE_AUDIT_ENABLED, normalize_cache_key
+from seahub.utils.audit import queue_file_access_msg
+from seahub.utils.content_cache import get_content, set_content
+from seahub.utils.htmldiff import HtmlDiff
 from seahub.utils.ip import get_remote_ip
 from seahub.utils.timeutils import utc_to_local
 from seahub.utils.file_types import (IMAGE, PDF, DOCUMENT, SPREADSHEET, AUDIO,
                                      MARKDOWN, TEXT, OPENDOCUMENT, VIDEO)
 from seahub.utils.star import is_file_starred
+from seahub.utils.threadpool import call_concurrently
 from seahub.utils import HAS_OFFICE_CONVERTER, FILEEXT_TYPE_MAP
 from seahub.utils.http import json_response, int_param, BadRequestException, RequestForbbiddenException
 from seahub.views import check_folder_permission, check_file_lock, \
@@ -69,7 +75,8 @@ if HAS_OFFICE_CONVERTER:
 
 import seahub.settings as settings
 from seahub.settings import FILE_ENCODING_LIST, FILE_PREVIEW_MAX_SIZE, \
-    FILE_ENCODING_TRY_LIST, USE_PDFJS, MEDIA_URL
+    FILE_ENCODING_TRY_LIST, USE_PDFJS, MEDIA_URL, \
+    FILE_CONTENT_CACHE_MAX_SIZE, FILE_CONTENT_CACHE_TIMEOUT, TEXT_DIFF_MAX_ROWS
 
 try:
     from seahub.settings import ENABLE_OFFICE_WEB_APP
@@ -94,6 +101,20 @@ except ImportError:
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+IMAGE_NAMES_CACHE_PREFIX = 'IMAGE_NAMES_'
+IMAGE_NAMES_CACHE_TIMEOUT = 24 * 60 * 60
+
+FILE_CONTENT_CACHE_PREFIX = 'FILE_CONTENT_'
+FILE_READ_CHUNK_SIZE = 64 * 1024
+# Number of leading bytes used to detect file encoding.
+FILE_ENCODING_DETECT_SIZE = 64 * 1024
+
+TEXT_DIFF_CACHE_PREFIX = 'TEXT_DIFF_'
+TEXT_DIFF_CACHE_TIMEOUT = 24 * 60 * 60
+
+MD_LINK_CACHE_PREFIX = 'MD_LINK_'
+MD_LINK_CACHE_TIMEOUT = 24 * 60 * 60
+
 def gen_path_link(path, repo_name):
     """
     Generate navigate paths and links in repo page.
@@ -119,15 +140,54 @@ def gen_path_link(path, repo_name):
 
     return zipped
 
-def get_file_content(file_type, raw_path, file_enc):
+def get_file_content(file_type, raw_path, file_enc, max_size=None,
+                     cache_id=None):
     """Get textual file content, including txt/markdown/seaf.
     """
-    return repo_file_get(raw_path, file_enc) if is_textual_file(
-        file_type=file_type) else ('', '', '')
+    return repo_file_get(raw_path, file_enc, max_size, cache_id) if \
+        is_textual_file(file_type=file_type) else ('', '', '')
 
-def repo_file_get(raw_path, file_enc):
+def get_file_content_cache_id(repo, obj_id):
+    """Return id used to cache decoded content of a file, or ``None`` if
+    content should not be cached.
+    """
+    if repo.encrypted:
+        return None
+    return '%s_%s' % (repo.store_id, obj_id)
+
+def _read_file(raw_path, max_size=None):
+    """Read file from fileserver in chunks, and feed the first
+    ``FILE_ENCODING_DETECT_SIZE`` bytes to a charset detector.
+
+    Returns (content, detected encoding), content is ``None`` if file is
+    larger than ``max_size``.
+    """
+    file_response = urllib2.urlopen(raw_path)
+    detector = UniversalDetector()
+    chunks = []
+    size = 0
+    while True:
+        chunk = file_response.read(FILE_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        if size < FILE_ENCODING_DETECT_SIZE and not detector.done:
+            detector.feed(chunk[:FILE_ENCODING_DETECT_SIZE - size])
+
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            return None, None
+        chunks.append(chunk)
+
+    detector.close()
+    return ''.join(chunks), detector.result['encoding']
+
+def repo_file_get(raw_path, file_enc, max_size=None, cache_id=None):
     """
     Get file content and encoding.
+
+    At most ``max_size`` bytes are read. If ``cache_id`` is given, decoded
+    content is cached, and served without visiting fileserver next time.
     """
     err = ''
     file_content = ''
@@ -135,9 +195,16 @@ def repo_file_get(raw_path, file_enc):
     if file_enc != 'auto':
         encoding = file_enc
 
+    if cache_id:
+        cache_key = normalize_cache_key('%s_%s' % (cache_id, file_enc),
+                                        FILE_CONTENT_CACHE_PREFIX)
+        cached = get_content(cache_key)
+        if cached is not None:
+            file_content, encoding = cached
+            return err, file_content, encoding
+
     try:
-        file_response = urllib2.urlopen(raw_path)
-        content = file_response.read()
+        content, detected_encoding = _read_file(raw_path, max_size)
     except urllib2.HTTPError, e:
         logger.error(e)
         err = _(u'HTTPError: failed to open file online')
@@ -147,6 +214,11 @@ def repo_file_get(raw_path, file_enc):
         err = _(u'URLError: failed to open file online')
         return err, '', None
     else:
+        if content is None:
+            err = _(u'File size surpasses %s, can not be opened online.') % \
+                filesizeformat(max_size)
+            return err, '', None
+
         if encoding:
             try:
                 u_content = content.decode(encoding)
@@ -163,7 +235,7 @@ def repo_file_get(raw_path, file_enc):
                     if enc != FILE_ENCODING_TRY_LIST[-1]:
                         continue
                     else:
-                        encoding = chardet.detect(content)['encoding']
+                        encoding = detected_encoding
                         if encoding:
                             try:
                                 u_content = content.decode(encoding)
@@ -176,19 +248,27 @@ def repo_file_get(raw_path, file_enc):
 
         file_content = u_content
 
+    if cache_id and len(content) <= FILE_CONTENT_CACHE_MAX_SIZE:
+        set_content(cache_key, (file_content, encoding), len(content),
+                    FILE_CONTENT_CACHE_TIMEOUT)
+
     return err, file_content, encoding
 
 
-def get_file_view_path_and_perm(request, repo_id, obj_id, path, use_onetime=True):
+def get_file_view_path_and_perm(request, repo_id, obj_id, path, use_onetime=True,
+                                user_perm=None):
     """ Get path and the permission to view file.
 
+    Permission is only checked if ``user_perm`` is not given by caller.
+
     Returns:
     	outer fileserver file url, inner fileserver file url, permission
     """
     username = request.user.username
     filename = os.path.basename(path)
 
-    user_perm = check_folder_permission(request, repo_id, '/')
+    if user_perm is None:
+        user_perm = check_folder_permission(request, repo_id, '/')
     if user_perm is None:
         return ('', '', user_perm)
     else:
@@ -199,13 +279,14 @@ def get_file_view_path_and_perm(request, repo_id, obj_id, path, use_onetime=True
         inner_url = gen_inner_file_get_url(token, filename)
         return (outer_url, inner_url, user_perm)
 
-def handle_textual_file(request, filetype, raw_path, ret_dict):
+def handle_textual_file(request, filetype, raw_path, ret_dict,
+                        cache_id=None):
     # encoding option a user chose
     file_enc = request.GET.get('file_enc', 'auto')
     if not file_enc in FILE_ENCODING_LIST:
         file_enc = 'auto'
-    err, file_content, encoding = get_file_content(filetype,
-                                                   raw_path, file_enc)
+    err, file_content, encoding = get_file_content(
+        filetype, raw_path, file_enc, FILE_PREVIEW_MAX_SIZE, cache_id)
     file_encoding_list = FILE_ENCODING_LIST
     if encoding and encoding not in FILE_ENCODING_LIST:
         file_encoding_list.append(encoding)
@@ -240,7 +321,34 @@ def handle_pdf(raw_path, obj_id, fileext, ret_dict):
         # can't preview PDF
         ret_dict['filetype'] = 'Unknown'
 
-def convert_md_link(file_content, repo_id, username):
+def convert_md_link(file_content, repo_id, username, repo=None,
+                    cache_id=None):
+    """Convert ``[[link]]`` in markdown file content to HTML.
+
+    If ``repo`` and ``cache_id`` of the content (object id and encoding) are
+    given, the result is cached for the head commit of repo, unless it
+    contains image links, which carry access tokens of the user.
+    """
+    if repo is not None and cache_id:
+        cache_key = normalize_cache_key('%s_%s_%s' % (
+            repo.id, repo.head_cmmt_id, cache_id), MD_LINK_CACHE_PREFIX)
+        converted = get_content(cache_key)
+        if converted is not None:
+            return converted
+    else:
+        cache_key = None
+
+    page_index = []
+    def get_page_index():
+        # built on first page link, shared by the rest
+        if not page_index:
+            r = repo if repo is not None else get_repo(repo_id)
+            if not r:
+                raise WikiDoesNotExist
+            page_index.append(get_wiki_page_index(r))
+        return page_index[0]
+
+    has_image = []
     def repl(matchobj):
         if matchobj.group(2):   # return origin string in backquotes
             return matchobj.group(2)
@@ -254,7 +362,9 @@ def convert_md_link(file_content, repo_id, username):
         if fileext == '':
             # convert link_name that extension is missing to a markdown page
             try:
-                dirent = get_wiki_dirent(repo_id, link_name)
+                dirent = find_wiki_dirent(get_page_index(), link_name)
+                if dirent is None:
+                    raise WikiPageMissing
                 path = "/" + dirent.obj_name
                 href = reverse('view_lib_file', args=[repo_id, path])
                 a_tag = '''<a href="%s">%s</a>'''
@@ -264,6 +374,7 @@ def convert_md_link(file_content, repo_id, username):
                 return a_tag % (link_alias)
         elif filetype == IMAGE:
             # load image to current page
+            has_image.append(True)
             path = "/" + link_name
             filename = os.path.basename(path)
             obj_id = get_file_id_by_path(repo_id, path)
@@ -283,7 +394,11 @@ def convert_md_link(file_content, repo_id, username):
             a_tag = '''<img src="%simg/file/%s" alt="%s" class="vam" /> <a href="%s" target="_blank" class="vam">%s</a>'''
             return a_tag % (MEDIA_URL, icon, icon, s, link_name)
 
-    return re.sub(r'\[\[(.+?)\]\]|(`.+?`)', repl, file_content)
+    converted = re.sub(r'\[\[(.+?)\]\]|(`.+?`)', repl, file_content)
+    if cache_key and not has_image:
+        set_content(cache_key, converted, len(converted),
+                    MD_LINK_CACHE_TIMEOUT)
+    return converted
 
 def file_size_exceeds_preview_limit(file_size, file_type):
     """Check whether file size exceeds the preview limit base on different
@@ -344,6 +459,47 @@ def send_file_access_msg_when_preview(request, repo, path, access_from):
     if filetype == PDF and USE_PDFJS:
         send_file_access_msg(request, repo, path, access_from)
 
+def get_image_names_in_dir(repo_id, parent_dir):
+    """Return names of images in a folder, sorted case-insensitively, or
+    ``None`` if folder does not exist.
+
+    Result is cached by folder id, which changes whenever folder content
+    changes.
+    """
+    dir_id = seafile_api.get_dir_id_by_path(repo_id, parent_dir)
+    if not dir_id:
+        return None
+
+    cache_key = normalize_cache_key(dir_id, IMAGE_NAMES_CACHE_PREFIX)
+    img_list = cache.get(cache_key)
+    if img_list is not None:
+        return img_list
+
+    img_list = []
+    for dirent in seafile_api.list_dir_by_dir_id(repo_id, dir_id):
+        if not stat.S_ISDIR(dirent.mode):
+            fltype, flext = get_file_type_and_ext(dirent.obj_name)
+            if fltype == IMAGE:
+                img_list.append(dirent.obj_name)
+    img_list.sort(key=lambda x: x.lower())
+
+    cache.set(cache_key, img_list, IMAGE_NAMES_CACHE_TIMEOUT)
+    return img_list
+
+def get_img_prev_next(img_list, filename, parent_dir):
+    """Return paths of previous and next image of ``filename`` in
+    ``img_list``.
+    """
+    img_prev = None
+    img_next = None
+    if len(img_list) > 1 and filename in img_list:
+        cur_img_index = img_list.index(filename)
+        if cur_img_index != 0:
+            img_prev = posixpath.join(parent_dir, img_list[cur_img_index - 1])
+        if cur_img_index != len(img_list) - 1:
+            img_next = posixpath.join(parent_dir, img_list[cur_img_index + 1])
+    return img_prev, img_next
+
 @login_required
 @repo_passwd_set_required
 def view_repo_file(request, repo_id):
@@ -378,19 +534,21 @@ def _file_view(request, repo_id, path):
     if not repo:
         raise Http404
 
-    obj_id = get_file_id_by_path(repo_id, path)
+    # Check whether file exists and user has permission to view file.
+    with record_phase_timing(request, 'file_view.check'):
+        obj_id, file_perm = call_concurrently(
+            lambda: get_file_id_by_path(repo_id, path),
+            lambda: seafile_api.check_permission_by_path(repo_id, path,
+                                                         username))
     if not obj_id:
         return render_error(request, _(u'File does not exist'))
 
     # construct some varibles
     u_filename = os.path.basename(path)
-    current_commit = get_commits(repo_id, 0, 1)[0]
     # get file type and extension
     filetype, fileext = get_file_type_and_ext(u_filename)
 
-    # Check whether user has permission to view file and get file raw path,
-    # render error page if permission deny.
-    file_perm = seafile_api.check_permission_by_path(repo_id, path, username)
+    # Render error page if permission deny.
     if not file_perm:
         return render_permission_error(request, _(u'Unable to view file'))
 
@@ -414,15 +572,37 @@ def _file_view(request, repo_id, path):
         send_file_access_msg(request, repo, path, 'web')
         return HttpResponseRedirect(raw_url)
 
-    # Get file view raw path, ``user_perm`` is not used anymore.
-    if filetype == VIDEO or filetype == AUDIO:
-        raw_path, inner_path, user_perm = get_file_view_path_and_perm(
-            request, repo_id, obj_id, path, use_onetime=False)
+    # Token of video/audio file can be used several times.
+    use_onetime = filetype not in (VIDEO, AUDIO)
+
+    # check if the user is the owner or not, for 'private share'
+    if is_org_context(request):
+        check_repo_owner = lambda: \
+            seafile_api.get_org_repo_owner(repo.id) == username
     else:
-        raw_path, inner_path, user_perm = get_file_view_path_and_perm(
-            request, repo_id, obj_id, path)
+        check_repo_owner = lambda: seafile_api.is_repo_owner(username, repo.id)
 
-    is_locked, locked_by_me = check_file_lock(repo_id, path, username)
+    def get_dirent():
+        # get real path for sub repo
+        real_path = repo.origin_path + path if repo.origin_path else path
+        try:
+            return seafile_api.get_dirent_by_path(repo.store_id, real_path)
+        except SearpcError as e:
+            logger.error(e)
+            return None
+
+    # Independent lookups are issued in parallel. Get file view raw path,
+    # with permission already checked above.
+    with record_phase_timing(request, 'file_view.fetch'):
+        (raw_path, inner_path, user_perm), (is_locked, locked_by_me), \
+            is_repo_owner, fsize, dirent = call_concurrently(
+                lambda: get_file_view_path_and_perm(
+                    request, repo_id, obj_id, path, use_onetime=use_onetime,
+                    user_perm=file_perm),
+                lambda: check_file_lock(repo_id, path, username),
+                check_repo_owner,
+                lambda: get_file_size(repo.store_id, repo.version, obj_id),
+                get_dirent)
 
     # check if use office web app to view/edit file
     if is_pro_version() and not repo.encrypted and ENABLE_OFFICE_WEB_APP:
@@ -444,59 +624,48 @@ def _file_view(request, repo_id, path):
             return render_to_response('view_wopi_file.html', wopi_dict,
                       context_instance=RequestContext(request))
 
-    # check if the user is the owner or not, for 'private share'
-    if is_org_context(request):
-        repo_owner = seafile_api.get_org_repo_owner(repo.id)
-        is_repo_owner = True if repo_owner == username else False
+    # fetch latest contributor
+    if dirent:
+        latest_contributor, last_modified = dirent.modifier, dirent.mtime
     else:
-        is_repo_owner = seafile_api.is_repo_owner(username, repo.id)
+        latest_contributor, last_modified = None, 0
 
     img_prev = None
     img_next = None
     ret_dict = {'err': '', 'file_content': '', 'encoding': '', 'file_enc': '',
                 'file_encoding_list': [], 'filetype': filetype}
 
-    fsize = get_file_size(repo.store_id, repo.version, obj_id)
     can_preview, err_msg = can_preview_file(u_filename, fsize, repo)
     if can_preview:
         send_file_access_msg_when_preview(request, repo, path, 'web')
 
         """Choose different approach when dealing with different type of file."""
-        if is_textual_file(file_type=filetype):
-            handle_textual_file(request, filetype, inner_path, ret_dict)
-            if filetype == MARKDOWN:
-                c = ret_dict['file_content']
-                ret_dict['file_content'] = convert_md_link(c, repo_id, username)
-        elif filetype == DOCUMENT:
-            handle_document(inner_path, obj_id, fileext, ret_dict)
-        elif filetype == SPREADSHEET:
-            handle_spreadsheet(inner_path, obj_id, fileext, ret_dict)
-        elif filetype == OPENDOCUMENT:
-            if fsize == 0:
-                ret_dict['err'] = _(u'Invalid file format.')
-        elif filetype == PDF:
-            handle_pdf(inner_path, obj_id, fileext, ret_dict)
-        elif filetype == IMAGE:
-            parent_dir = os.path.dirname(path)
-            dirs = seafile_api.list_dir_by_commit_and_path(current_commit.repo_id,
-                                                           current_commit.id, parent_dir)
-            if not dirs:
-                raise Http404
+        with record_phase_timing(request, 'file_view.content'):
+            if is_textual_file(file_type=filetype):
+                handle_textual_file(request, filetype, inner_path, ret_dict,
+                                    get_file_content_cache_id(repo, obj_id))
+                if filetype == MARKDOWN:
+                    c = ret_dict['file_content']
+                    ret_dict['file_content'] = convert_md_link(
+                        c, repo_id, username, repo,
+                        '%s_%s' % (obj_id, ret_dict['encoding']))
+            elif filetype == DOCUMENT:
+                handle_document(inner_path, obj_id, fileext, ret_dict)
+            elif filetype == SPREADSHEET:
+                handle_spreadsheet(inner_path, obj_id, fileext, ret_dict)
+            elif filetype == OPENDOCUMENT:
+                if fsize == 0:
+                    ret_dict['err'] = _(u'Invalid file format.')
+            elif filetype == PDF:
+                handle_pdf(inner_path, obj_id, fileext, ret_dict)
+            elif filetype == IMAGE:
+                parent_dir = os.path.dirname(path)
+                img_list = get_image_names_in_dir(repo_id, parent_dir)
+                if img_list is None:
+                    raise Http404
 
-            img_list = []
-            for dirent in dirs:
-                if not stat.S_ISDIR(dirent.props.mode):
-                    fltype, flext = get_file_type_and_ext(dirent.obj_name)
-                    if fltype == 'Image':
-                        img_list.append(dirent.obj_name)
-
-            if len(img_list) > 1:
-                img_list.sort(lambda x, y : cmp(x.lower(), y.lower()))
-                cur_img_index = img_list.index(u_filename)
-                if cur_img_index != 0:
-                    img_prev = posixpath.join(parent_dir, img_list[cur_img_index - 1])
-                if cur_img_index != len(img_list) - 1:
-                    img_next = posixpath.join(parent_dir, img_list[cur_img_index + 1])
+                img_prev, img_next = get_img_prev_next(img_list, u_filename,
+                                                       parent_dir)
 
         template = 'view_file_%s.html' % ret_dict['filetype'].lower()
     else:
@@ -517,19 +686,6 @@ def _file_view(request, repo_id, path):
     else:
         file_shared_link = ''
 
-    # fetch file contributors and latest contributor
-    try:
-        # get real path for sub repo
-        real_path = repo.origin_path + path if repo.origin_path else path
-        dirent = seafile_api.get_dirent_by_path(repo.store_id, real_path)
-        if dirent:
-            latest_contributor, last_modified = dirent.modifier, dirent.mtime
-        else:
-            latest_contributor, last_modified = None, 0
-    except SearpcError as e:
-        logger.error(e)
-        latest_contributor, last_modified = None, 0
-
     # check whether file is starred
     is_starred = False
     org_id = -1
@@ -555,7 +711,6 @@ def _file_view(request, repo_id, path):
             'filename': u_filename,
             'path': path,
             'zipped': zipped,
-            'current_commit': current_commit,
             'fileext': fileext,
             'raw_path': raw_path,
             'fileshare': fileshare,
@@ -627,7 +782,8 @@ def view_history_file_common(request, repo_id, ret_dict):
             send_file_access_msg_when_preview(request, repo, path, 'web')
             """Choose different approach when dealing with different type of file."""
             if is_textual_file(file_type=filetype):
-                handle_textual_file(request, filetype, inner_path, ret_dict)
+                handle_textual_file(request, filetype, inner_path, ret_dict,
+                                    get_file_content_cache_id(repo, obj_id))
             elif filetype == DOCUMENT:
                 handle_document(inner_path, obj_id, fileext, ret_dict)
             elif filetype == SPREADSHEET:
@@ -779,9 +935,7 @@ def view_shared_file(request, fileshare):
     filename = os.path.basename(path)
     filetype, fileext = get_file_type_and_ext(filename)
 
-    # Increase file shared link view_cnt, this operation should be atomic
-    fileshare.view_cnt = F('view_cnt') + 1
-    fileshare.save()
+    incr_share_link_view_cnt(fileshare)
 
     # send statistic messages
     file_size = seafile_api.get_file_size(repo.store_id, repo.version, obj_id)
@@ -819,7 +973,8 @@ def view_shared_file(request, fileshare):
         """Choose different approach when dealing with different type of file."""
         inner_path = gen_inner_file_get_url(access_token, filename)
         if is_textual_file(file_type=filetype):
-            handle_textual_file(request, filetype, inner_path, ret_dict)
+            handle_textual_file(request, filetype, inner_path, ret_dict,
+                                get_file_content_cache_id(repo, obj_id))
         elif filetype == DOCUMENT:
             handle_document(inner_path, obj_id, fileext, ret_dict)
         elif filetype == SPREADSHEET:
@@ -983,7 +1138,8 @@ def view_file_via_shared_dir(request, fileshare):
 
         """Choose different approach when dealing with different type of file."""
         if is_textual_file(file_type=filetype):
-            handle_textual_file(request, filetype, inner_path, ret_dict)
+            handle_textual_file(request, filetype, inner_path, ret_dict,
+                                get_file_content_cache_id(repo, obj_id))
         elif filetype == DOCUMENT:
             handle_document(inner_path, obj_id, fileext, ret_dict)
         elif filetype == SPREADSHEET:
@@ -991,28 +1147,14 @@ def view_file_via_shared_dir(request, fileshare):
         elif filetype == PDF:
             handle_pdf(inner_path, obj_id, fileext, ret_dict)
         elif filetype == IMAGE:
-            current_commit = get_commits(repo_id, 0, 1)[0]
             real_parent_dir = os.path.dirname(real_path)
             parent_dir = os.path.dirname(req_path)
-            dirs = seafile_api.list_dir_by_commit_and_path(current_commit.repo_id,
-                                                           current_commit.id, real_parent_dir)
-            if not dirs:
+            img_list = get_image_names_in_dir(repo_id, real_parent_dir)
+            if img_list is None:
                 raise Http404
 
-            img_list = []
-            for dirent in dirs:
-                if not stat.S_ISDIR(dirent.props.mode):
-                    fltype, flext = get_file_type_and_ext(dirent.obj_name)
-                    if fltype == 'Image':
-                        img_list.append(dirent.obj_name)
-
-            if len(img_list) > 1:
-                img_list.sort(lambda x, y : cmp(x.lower(), y.lower()))
-                cur_img_index = img_list.index(filename)
-                if cur_img_index != 0:
-                    img_prev = posixpath.join(parent_dir, img_list[cur_img_index - 1])
-                if cur_img_index != len(img_list) - 1:
-                    img_next = posixpath.join(parent_dir, img_list[cur_img_index + 1])
+            img_prev, img_next = get_img_prev_next(img_list, filename,
+                                                   parent_dir)
 
     else:
         ret_dict['err'] = err_msg
@@ -1260,10 +1402,11 @@ def send_file_access_msg(request, repo, path, access_from):
         (access_from, username, ip, user_agent, repo.id, path)
     msg_utf8 = msg.encode('utf-8')
 
+    # saved in background, see seahub.utils.audit
     try:
-        send_message('seahub.stats', msg_utf8)
+        queue_file_access_msg(msg_utf8, request)
     except Exception as e:
-        logger.error("Error when sending file-download-%s message: %s" %
+        logger.error("Error when queuing file-download-%s message: %s" %
                      (access_from, str(e)))
 
 @login_required
@@ -1313,22 +1456,61 @@ def get_file_content_by_commit_and_path(request, repo_id, commit_id, path, file_
         return '', None
     else:
         permission = check_folder_permission(request, repo_id, '/')
-        if permission:
-            # Get a token to visit file
-            token = seafile_api.get_fileserver_access_token(repo_id, obj_id,
-                                                            'view',
-                                                            request.user.username)
-        else:
+        if not permission:
             return None, 'permission denied'
 
-        filename = os.path.basename(path)
-        inner_path = gen_inner_file_get_url(token, filename)
+        return get_file_content_by_obj_id(request, repo_id, obj_id, path,
+                                          file_enc)
 
-        try:
-            err, file_content, encoding = repo_file_get(inner_path, file_enc)
-        except Exception, e:
-            return None, 'error when read file from fileserver: %s' % e
-        return file_content, err
+def get_file_content_by_obj_id(request, repo_id, obj_id, path, file_enc):
+    """Get file content of ``obj_id``, permission should be checked by
+    caller.
+    """
+    if not obj_id or obj_id == EMPTY_SHA1:
+        return '', None
+
+    # Get a token to visit file
+    token = seafile_api.get_fileserver_access_token(repo_id, obj_id, 'view',
+                                                    request.user.username)
+    filename = os.path.basename(path)
+    inner_path = gen_inner_file_get_url(token, filename)
+
+    try:
+        err, file_content, encoding = repo_file_get(inner_path, file_enc)
+    except Exception, e:
+        return None, 'error when read file from fileserver: %s' % e
+    return file_content, err
+
+def get_text_diff(request, repo_id, prev_obj_id, current_obj_id, path,
+                  file_enc):
+    """Return (HTML table of differences between two versions of file,
+    whether the table is truncated, error).
+
+    Result is cached by the two file ids.
+    """
+    cache_key = normalize_cache_key('%s_%s_%s' % (
+        prev_obj_id, current_obj_id, file_enc), TEXT_DIFF_CACHE_PREFIX)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        diff_result_table, truncated = cached
+        return diff_result_table, truncated, None
+
+    prev_content, err = get_file_content_by_obj_id(request, repo_id,
+                                                   prev_obj_id, path, file_enc)
+    if err:
+        return None, False, err
+
+    current_content, err = get_file_content_by_obj_id(
+        request, repo_id, current_obj_id, path, file_enc)
+    if err:
+        return None, False, err
+
+    diff = HtmlDiff(max_rows=TEXT_DIFF_MAX_ROWS)
+    diff_result_table = diff.make_table(prev_content.splitlines(),
+                                        current_content.splitlines(), True)
+    cache.set(cache_key, (diff_result_table, diff.truncated),
+              TEXT_DIFF_CACHE_TIMEOUT)
+    return diff_result_table, diff.truncated, None
 
 @login_required
 def text_diff(request, repo_id):
@@ -1356,24 +1538,28 @@ def text_diff(request, repo_id):
 
     path = path.encode('utf-8')
 
-    current_content, err = get_file_content_by_commit_and_path(request, \
-                                    repo_id, current_commit.id, path, file_enc)
-    if err:
-        return render_error(request, err)
+    if not check_folder_permission(request, repo_id, '/'):
+        return render_error(request, 'permission denied')
 
-    prev_content, err = get_file_content_by_commit_and_path(request, \
-                                    repo_id, prev_commit.id, path, file_enc)
-    if err:
-        return render_error(request, err)
+    try:
+        current_obj_id = seafserv_threaded_rpc.get_file_id_by_commit_and_path(
+            repo_id, current_commit.id, path)
+        prev_obj_id = seafserv_threaded_rpc.get_file_id_by_commit_and_path(
+            repo_id, prev_commit.id, path)
+    except:
+        return render_error(request, 'bad path')
 
     is_new_file = False
     diff_result_table = ''
-    if prev_content == '' and current_content == '':
+    diff_truncated = False
+    empty_ids = (None, '', EMPTY_SHA1)
+    if current_obj_id in empty_ids and prev_obj_id in empty_ids:
         is_new_file = True
     else:
-        diff = HtmlDiff()
-        diff_result_table = diff.make_table(prev_content.splitlines(),
-                                        current_content.splitlines(), True)
+        diff_result_table, diff_truncated, err = get_text_diff(
+            request, repo_id, prev_obj_id, current_obj_id, path, file_enc)
+        if err:
+            return render_error(request, err)
 
     zipped = gen_path_link(path, repo.name)
 
@@ -1385,6 +1571,7 @@ def text_diff(request, repo_id):
         'current_commit': current_commit,
         'prev_commit': prev_commit,
         'diff_result_table': diff_result_table,
+        'diff_truncated': diff_truncated,
         'is_new_file': is_new_file,
     }, context_instance=RequestContext(request))
 
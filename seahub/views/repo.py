@@ -5,7 +5,6 @@ import posixpath
 import logging
 
 from django.core.urlresolvers import reverse
-from django.db.models import F
 from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import render_to_response
 from django.template import RequestContext
@@ -19,7 +18,7 @@ from seahub.auth.decorators import login_required
 from seahub.options.models import UserOptions, CryptoOptionNotSetError
 from seahub.share.decorators import share_link_audit
 from seahub.share.models import FileShare, UploadLinkShare, \
-    check_share_link_common
+    check_share_link_common, incr_share_link_view_cnt
 from seahub.views import gen_path_link, get_repo_dirents, \
     check_folder_permission
 
@@ -208,10 +207,7 @@ def view_shared_dir(request, fileshare):
         zipped = gen_path_link(req_path, os.path.basename(fileshare.path[:-1]))
 
     if req_path == '/':  # When user view the root of shared dir..
-        # increase shared link view_cnt,
-        fileshare = FileShare.objects.get(token=token)
-        fileshare.view_cnt = F('view_cnt') + 1
-        fileshare.save()
+        incr_share_link_view_cnt(fileshare)
 
     traffic_over_limit = user_traffic_over_limit(fileshare.username)
 
@@ -275,8 +271,7 @@ def view_shared_upload_link(request, uploadlink):
     if not repo:
         raise Http404
 
-    uploadlink.view_cnt = F('view_cnt') + 1
-    uploadlink.save()
+    incr_share_link_view_cnt(uploadlink)
 
     no_quota = True if seaserv.check_quota(repo_id) < 0 else False
 
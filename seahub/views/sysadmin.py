@@ -7,7 +7,7 @@ import logging
 import json
 import re
 import datetime
-import csv, chardet, StringIO
+import chardet
 import time
 from constance import config
 
@@ -27,8 +27,10 @@ from seaserv import ccnet_threaded_rpc, seafserv_threaded_rpc, \
 from pysearpc import SearpcError
 
 from seahub.base.accounts import User
+from seahub.base.config_snapshot import bump_config_version
 from seahub.base.models import UserLastLogin
 from seahub.base.decorators import sys_staff_required, require_POST
+from seahub.base.middleware import clear_org_membership_cache
 from seahub.base.sudo_mode import update_sudo_mode_ts
 from seahub.base.templatetags.seahub_tags import tsstr_sec, email2nickname
 from seahub.auth import authenticate
@@ -36,6 +38,7 @@ from seahub.auth.decorators import login_required, login_required_ajax
 from seahub.constants import GUEST_USER, DEFAULT_USER
 from seahub.institutions.models import Institution, InstitutionAdmin
 from seahub.invitations.models import Invitation
+from seahub.jobs.handlers import submit_job, JOB_BATCH_ADD_USER
 from seahub.role_permissions.utils import get_available_roles
 from seahub.utils import IS_EMAIL_CONFIGURED, string2list, is_valid_username, \
     is_pro_version, send_html_email, get_user_traffic_list, get_server_id, \
@@ -45,8 +48,9 @@ from seahub.utils.file_size import get_file_size_unit
 from seahub.utils.rpc import mute_seafile_api
 from seahub.utils.licenseparse import parse_license
 from seahub.utils.sysinfo import get_platform_name
-from seahub.utils.mail import send_html_email_with_dj_template
 from seahub.utils.ms_excel import write_xls
+from seahub.utils.quota import populate_users_quota_usage, \
+    clear_quota_snapshot
 from seahub.utils.user_permissions import (get_basic_user_roles,
                                            get_user_role)
 from seahub.views import get_system_default_repo_id
@@ -56,7 +60,7 @@ from seahub.forms import SetUserQuotaForm, AddUserForm, BatchAddUserForm, \
     TermsAndConditionsForm
 from seahub.options.models import UserOptions
 from seahub.profile.models import Profile, DetailedProfile
-from seahub.signals import repo_deleted
+from seahub.signals import repo_deleted, repo_transferred
 from seahub.share.models import FileShare, UploadLinkShare
 import seahub.settings as settings
 from seahub.settings import INIT_PASSWD, SITE_NAME, SITE_ROOT, \
@@ -118,20 +122,26 @@ def _populate_user_quota_usage(user):
     Arguments:
     - `user`:
     """
-    orgs = ccnet_threaded_rpc.get_orgs_by_user(user.email)
-    try:
-        if orgs:
-            user.org = orgs[0]
-            org_id = user.org.org_id
-            user.space_usage = seafserv_threaded_rpc.get_org_user_quota_usage(org_id, user.email)
-            user.space_quota = seafserv_threaded_rpc.get_org_user_quota(org_id, user.email)
+    populate_users_quota_usage([user])
+
+def _populate_last_login_and_trial(users):
+    """Populate ``last_login`` and ``trial_info`` to each of ``users``.
+    """
+    emails = [x.email for x in users]
+    last_logins = dict([(x.username, x.last_login) for x in
+                        UserLastLogin.objects.filter(username__in=emails)])
+    if ENABLE_TRIAL_ACCOUNT:
+        trial_users = dict([(x.user_or_org, x.expire_date) for x in
+                            TrialAccount.objects.filter(user_or_org__in=emails)])
+    else:
+        trial_users = {}
+
+    for user in users:
+        user.last_login = last_logins.get(user.email, None)
+        if user.email in trial_users:
+            user.trial_info = {'expire_date': trial_users[user.email]}
         else:
-            user.space_usage = seafile_api.get_user_self_usage(user.email)
-            user.space_quota = seafile_api.get_user_quota(user.email)
-    except SearpcError as e:
-        logger.error(e)
-        user.space_usage = -1
-        user.space_quota = -1
+            user.trial_info = None
 
 @login_required
 @sys_staff_required
@@ -184,32 +194,16 @@ def sys_user_admin(request):
         page_next = False
 
     users = users_plus_one[:per_page]
-    last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in users])
-    if ENABLE_TRIAL_ACCOUNT:
-        trial_users = TrialAccount.objects.filter(user_or_org__in=[x.email for x in users])
-    else:
-        trial_users = []
+    populate_users_quota_usage(users)
+    _populate_last_login_and_trial(users)
     for user in users:
         if user.email == request.user.email:
             user.is_self = True
 
-        _populate_user_quota_usage(user)
-
         # check user's role
         user.is_guest = True if get_user_role(user) == GUEST_USER else False
         user.is_default = True if get_user_role(user) == DEFAULT_USER else False
 
-        # populate user last login time
-        user.last_login = None
-        for last_login in last_logins:
-            if last_login.username == user.email:
-                user.last_login = last_login.last_login
-
-        user.trial_info = None
-        for trial_user in trial_users:
-            if trial_user.user_or_org == user.email:
-                user.trial_info = {'expire_date': trial_user.expire_date}
-
     have_ldap = True if len(seaserv.get_emailusers('LDAP', 0, 1)) > 0 else False
 
     platform = get_platform_name()
@@ -334,12 +328,11 @@ def sys_user_admin_ldap_imported(request):
 
     users = users_plus_one[:per_page]
     last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in users])
+    populate_users_quota_usage(users)
     for user in users:
         if user.email == request.user.email:
             user.is_self = True
 
-        _populate_user_quota_usage(user)
-
         # populate user last login time
         user.last_login = None
         for last_login in last_logins:
@@ -379,12 +372,11 @@ def sys_user_admin_ldap(request):
 
     users = users_plus_one[:per_page]
     last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in users])
+    populate_users_quota_usage(users)
     for user in users:
         if user.email == request.user.email:
             user.is_self = True
 
-        _populate_user_quota_usage(user)
-
         # populate user last login time
         user.last_login = None
         for last_login in last_logins:
@@ -422,12 +414,11 @@ def sys_user_admin_admins(request):
 
     last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in admin_users])
 
+    populate_users_quota_usage(admin_users)
     for user in admin_users:
         if user.email == request.user.email:
             user.is_self = True
 
-        _populate_user_quota_usage(user)
-
         # check db user's role
         if user.source == "DB":
             if user.role == GUEST_USER:
@@ -619,6 +610,7 @@ def user_set_quota(request, email):
             result['error'] = _(u'Failed to set quota: internal server error')
             return HttpResponse(json.dumps(result), status=500, content_type=content_type)
 
+        clear_quota_snapshot(email)
         result['success'] = True
         return HttpResponse(json.dumps(result), content_type=content_type)
     else:
@@ -953,6 +945,7 @@ def user_add(request):
             org_id = request.user.org.org_id
             url_prefix = request.user.org.url_prefix
             ccnet_threaded_rpc.add_org_user(org_id, email, 0)
+            clear_org_membership_cache()
             if IS_EMAIL_CONFIGURED:
                 try:
                     send_user_add_mail(request, email, password)
@@ -1198,6 +1191,7 @@ def sys_org_remove(request, org_id):
 
     # remove org
     ccnet_threaded_rpc.remove_org(org_id)
+    clear_org_membership_cache()
 
     messages.success(request, _(u'Successfully deleted.'))
 
@@ -1419,6 +1413,34 @@ def sys_upload_link_remove(request):
     result = {'success': True}
     return HttpResponse(json.dumps(result), content_type=content_type)
 
+def _search_user_emails(q, limit):
+    """Return list of ``(email, user)`` matching ``q``, at most ``limit``
+    items. ``user`` is ``None`` for users matched from profile, which are
+    looked up only when displayed.
+    """
+    ret = []
+    seen = set()
+    # search user from ccnet db and ldap
+    for source in ('DB', 'LDAP'):
+        for user in ccnet_api.search_emailusers(source, q, 0, limit - len(ret)):
+            if user.email not in seen:
+                seen.add(user.email)
+                ret.append((user.email, user))
+        if len(ret) >= limit:
+            return ret
+
+    # search user from profile
+    profile_emails = Profile.objects.filter(
+        Q(nickname__icontains=q) | Q(contact_email__icontains=q)).values_list(
+            'user', flat=True)
+    for email in profile_emails[:limit]:
+        if email not in seen:
+            seen.add(email)
+            ret.append((email, None))
+        if len(ret) >= limit:
+            break
+    return ret
+
 @login_required
 @sys_staff_required
 def user_search(request):
@@ -1426,52 +1448,46 @@ def user_search(request):
     """
     email = request.GET.get('email', '')
 
-    # search user from ccnet db
-    users = ccnet_api.search_emailusers('DB', email, -1, -1)
+    try:
+        current_page = int(request.GET.get('page', '1'))
+        per_page = int(request.GET.get('per_page', '25'))
+    except ValueError:
+        current_page = 1
+        per_page = 25
 
-    # search user from ccnet ldap
-    ldap_users = ccnet_api.search_emailusers('LDAP', email, -1, -1)
-    users.extend(ldap_users)
+    current_page = max(current_page, 1)
+    per_page = min(max(per_page, 1), 100)
 
-    # search user from profile
-    users_from_profile = Profile.objects.filter((Q(nickname__icontains=email)) |
-            Q(contact_email__icontains=email))
+    start = per_page * (current_page - 1)
+    matches = _search_user_emails(email, start + per_page + 1)
+    page_next = len(matches) > start + per_page
 
-    for user in users_from_profile:
-        try:
-            user_obj = User.objects.get(email=user.user)
-        except User.DoesNotExist:
-            continue
-        users.append(user_obj)
+    users = []
+    for user_email, user in matches[start:start + per_page]:
+        if user is None:
+            try:
+                user = User.objects.get(email=user_email)
+            except User.DoesNotExist:
+                continue
+        users.append(user)
 
-    last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in users])
-    if ENABLE_TRIAL_ACCOUNT:
-        trial_users = TrialAccount.objects.filter(user_or_org__in=[x.email for x in users])
-    else:
-        trial_users = []
+    populate_users_quota_usage(users)
+    _populate_last_login_and_trial(users)
     for user in users:
-        _populate_user_quota_usage(user)
-
         # check user's role
         if user.role == GUEST_USER:
             user.is_guest = True
         else:
             user.is_guest = False
 
-        # populate user last login time
-        user.last_login = None
-        for last_login in last_logins:
-            if last_login.username == user.email:
-                user.last_login = last_login.last_login
-
-        user.trial_info = None
-        for trial_user in trial_users:
-            if trial_user.user_or_org == user.email:
-                user.trial_info = {'expire_date': trial_user.expire_date}
-
     return render_to_response('sysadmin/user_search.html', {
             'users': users,
             'email': email,
+            'current_page': current_page,
+            'prev_page': current_page-1,
+            'next_page': current_page+1,
+            'per_page': per_page,
+            'page_next': page_next,
             'default_user': DEFAULT_USER,
             'guest_user': GUEST_USER,
             'is_pro': is_pro_version(),
@@ -1530,6 +1546,8 @@ def sys_repo_transfer(request):
 
     # transfer repo
     seafile_api.set_repo_owner(repo_id, new_owner)
+    repo_transferred.send(sender=None, org_id=-1, repo_id=repo_id,
+                          from_user=repo_owner, to_user=new_owner)
 
     # reshare repo to user
     for shared_user in shared_users:
@@ -1750,39 +1768,13 @@ def batch_add_user(request):
         if encoding != 'utf-8':
             content = content.decode(encoding, 'replace').encode('utf-8')
 
-        filestream = StringIO.StringIO(content)
-        reader = csv.reader(filestream)
-
-        for row in reader:
-            if not row:
-                continue
-
-            username = row[0].strip()
-            password = row[1].strip()
-
-            if not is_valid_username(username):
-                continue
-
-            if password == '':
-                continue
-
-            try:
-                User.objects.get(email=username)
-                continue
-            except User.DoesNotExist:
-                User.objects.create_user(username, password, is_staff=False,
-                                         is_active=True)
-
-                send_html_email_with_dj_template(
-                    username, dj_template='sysadmin/user_batch_add_email.html',
-                    subject=_(u'You are invited to join %s') % SITE_NAME,
-                    context={
-                        'user': email2nickname(request.user.username),
-                        'email': username,
-                        'password': password,
-                    })
-
-        messages.success(request, _('Import succeeded'))
+        job = submit_job(JOB_BATCH_ADD_USER, request.user.username,
+                         data=content)
+        if job.is_finished():
+            messages.success(request, _('Import succeeded'))
+        else:
+            messages.success(request, _(u'Import is running in background, progress can be checked at %s.') %
+                             reverse('jobs:job_progress', args=[job.pk]))
     else:
         messages.error(request, _(u'Please select a csv file first.'))
 
@@ -1870,6 +1862,7 @@ def sys_settings(request):
 
         try:
             setattr(config, key, value)
+            bump_config_version()
             result['success'] = True
             return HttpResponse(json.dumps(result), content_type=content_type)
         except AttributeError as e:
@@ -2008,9 +2001,8 @@ def sys_inst_info_user(request, inst_id):
     users = [User.objects.get(x) for x in usernames[:per_page]]
 
     last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in users])
+    populate_users_quota_usage(users)
     for u in users:
-        _populate_user_quota_usage(u)
-
         if u.username in inst_admins:
             u.inst_admin = True
         else:
@@ -2055,9 +2047,8 @@ def sys_inst_search_user(request, inst_id):
 
     inst_admins = [x.user for x in InstitutionAdmin.objects.filter(institution=inst)]
     last_logins = UserLastLogin.objects.filter(username__in=[x for x in users])
+    populate_users_quota_usage(users)
     for u in users:
-        _populate_user_quota_usage(u)
-
         if u.username in inst_admins:
             u.inst_admin = True
         else:
@@ -2092,9 +2083,8 @@ def sys_inst_info_admins(request, inst_id):
     admins = [User.objects.get(x) for x in inst_admins]
 
     last_logins = UserLastLogin.objects.filter(username__in=[x.email for x in admins])
+    populate_users_quota_usage(admins)
     for u in admins:
-        _populate_user_quota_usage(u)
-
         # populate user last login time
         u.last_login = None
         for last_login in last_logins:
@@ -89,7 +89,7 @@ def personal_wiki(request, page_name="home"):
         index_pagename = 'index'
         index_content = None
         try:
-            index_content, index_repo, index_dirent = get_personal_wiki_page(username, index_pagename)
+            index_content, index_repo, index_dirent = get_personal_wiki_page(username, index_pagename, repo)
         except (WikiDoesNotExist, WikiPageMissing) as e:
             wiki_index_exists = False
 
@@ -3,7 +3,9 @@
 import os
 import stat
 import urllib2
+from collections import namedtuple
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.utils.http import urlquote
 from django.utils.encoding import smart_str
@@ -14,13 +16,22 @@ from pysearpc import SearpcError
 from seahub.utils import EMPTY_SHA1
 from seahub.utils.slugify import slugify
 from seahub.utils import render_error, render_permission_error, string2list, \
-    gen_file_get_url, get_file_type_and_ext, gen_inner_file_get_url
+    gen_file_get_url, get_file_type_and_ext, gen_inner_file_get_url, \
+    normalize_cache_key
+from seahub.utils.content_cache import get_content, set_content
 from seahub.utils.file_types import IMAGE
 from models import WikiPageMissing, WikiDoesNotExist, GroupWiki, PersonalWiki
 
 
 __all__ = ["get_wiki_dirent", "clean_page_name", "page_name_to_file_name"]
 
+WIKI_PAGE_INDEX_CACHE_PREFIX = 'WIKI_PAGE_INDEX_'
+WIKI_PAGE_CONTENT_CACHE_PREFIX = 'WIKI_PAGE_CONTENT_'
+WIKI_CACHE_TIMEOUT = 24 * 60 * 60
+# Pages larger than this are not cached.
+WIKI_PAGE_CONTENT_CACHE_MAX_SIZE = 1024 * 1024
+
+WikiDirent = namedtuple('WikiDirent', ['obj_name', 'obj_id', 'mode'])
 
 
 SLUG_OK = "!@#$%^&()_+-,.;'"
@@ -39,22 +50,64 @@ def page_name_to_file_name(page_name):
         return page_name
     return page_name + '.md'
 
-def get_wiki_dirent(repo_id, page_name):
+def get_wiki_page_index(repo):
+    """Return a dict of normalized name to ``WikiDirent`` of files in root of
+    wiki repo.
+
+    Index is built once for each head commit of the repo, and cached.
+    """
+    if not repo.head_cmmt_id:
+        return {}
+
+    key = normalize_cache_key('%s_%s' % (repo.id, repo.head_cmmt_id),
+                              WIKI_PAGE_INDEX_CACHE_PREFIX)
+    index = cache.get(key)
+    if index is not None:
+        return index
+
+    index = {}
+    dirs = seafile_api.list_dir_by_commit_and_path(repo.id, repo.head_cmmt_id,
+                                                   "/")
+    for e in dirs or []:
+        if stat.S_ISDIR(e.mode):
+            continue    # skip directories
+        index.setdefault(normalize_page_name(e.obj_name),
+                         WikiDirent(e.obj_name, e.obj_id, e.mode))
+    cache.set(key, index, WIKI_CACHE_TIMEOUT)
+    return index
+
+def find_wiki_dirent(index, page_name):
+    """Return dirent of ``page_name`` in page index, or ``None``.
+    """
     file_name = page_name_to_file_name(page_name)
-    repo = seaserv.get_repo(repo_id)
+    return index.get(normalize_page_name(file_name))
+
+def get_wiki_dirent(repo_id, page_name, repo=None):
+    if repo is None:
+        repo = seaserv.get_repo(repo_id)
     if not repo:
         raise WikiDoesNotExist
-    cmmt = seaserv.get_commits(repo.id, 0, 1)[0]
-    if cmmt is None:
+
+    dirent = find_wiki_dirent(get_wiki_page_index(repo), page_name)
+    if dirent is None:
         raise WikiPageMissing
-    dirs = seafile_api.list_dir_by_commit_and_path(cmmt.repo_id, cmmt.id, "/")
-    if dirs:
-        for e in dirs:
-            if stat.S_ISDIR(e.mode):
-                continue    # skip directories
-            if normalize_page_name(file_name) == normalize_page_name(e.obj_name):
-                return e
-    raise WikiPageMissing
+    return dirent
+
+def get_wiki_page_content(repo, dirent):
+    """Return content of a wiki page, cached by its object id.
+    """
+    key = normalize_cache_key('%s_%s' % (repo.store_id, dirent.obj_id),
+                              WIKI_PAGE_CONTENT_CACHE_PREFIX)
+    content = get_content(key)
+    if content is not None:
+        return content
+
+    url = get_inner_file_url(repo, dirent.obj_id, dirent.obj_name)
+    file_response = urllib2.urlopen(url)
+    content = file_response.read()
+    if len(content) <= WIKI_PAGE_CONTENT_CACHE_MAX_SIZE:
+        set_content(key, content, len(content), WIKI_CACHE_TIMEOUT)
+    return content
 
 def get_inner_file_url(repo, obj_id, file_name):
     repo_id = repo.id
@@ -79,40 +132,35 @@ def get_group_wiki_repo(group, username):
     except GroupWiki.DoesNotExist:
         raise WikiDoesNotExist
         
-    repos = seaserv.get_group_repos(group.id, username)
-    for repo in repos:
-        if repo.id == groupwiki.repo_id:
-            return repo
-    raise WikiDoesNotExist
-    
-def get_personal_wiki_page(username, page_name):
-    repo = get_personal_wiki_repo(username)
-    dirent = get_wiki_dirent(repo.id, page_name)
-    url = get_inner_file_url(repo, dirent.obj_id, dirent.obj_name)
-    file_response = urllib2.urlopen(url)
-    content = file_response.read()
+    # check wiki repo is still shared to the group
+    if groupwiki.repo_id not in seaserv.get_group_repoids(group.id):
+        raise WikiDoesNotExist
+
+    repo = seaserv.get_repo(groupwiki.repo_id)
+    if not repo:
+        raise WikiDoesNotExist
+    return repo
+
+def get_personal_wiki_page(username, page_name, repo=None):
+    if repo is None:
+        repo = get_personal_wiki_repo(username)
+    dirent = get_wiki_dirent(repo.id, page_name, repo)
+    content = get_wiki_page_content(repo, dirent)
     return content, repo, dirent
 
-def get_group_wiki_page(username, group, page_name):
-    repo = get_group_wiki_repo(group, username)
-    dirent = get_wiki_dirent(repo.id, page_name)
-    url = get_inner_file_url(repo, dirent.obj_id, dirent.obj_name)
-    file_response = urllib2.urlopen(url)
-    content = file_response.read()
+def get_group_wiki_page(username, group, page_name, repo=None):
+    if repo is None:
+        repo = get_group_wiki_repo(group, username)
+    dirent = get_wiki_dirent(repo.id, page_name, repo)
+    content = get_wiki_page_content(repo, dirent)
     return content, repo, dirent
 
 def get_wiki_pages(repo):
     """
     return pages in hashtable {normalized_name: page_name}
     """
-    dir_id = seaserv.seafserv_threaded_rpc.get_dir_id_by_path(repo.id, '/')
-    if not dir_id:
-        return {}
-    dirs = seafile_api.list_dir_by_dir_id(repo.id, dir_id)
     pages = {}
-    for e in dirs:
-        if stat.S_ISDIR(e.mode):
-            continue            # skip directories
+    for e in get_wiki_page_index(repo).values():
         name, ext = os.path.splitext(e.obj_name)
         if ext == '.md':
             key = normalize_page_name(name)
@@ -122,6 +170,16 @@ def get_wiki_pages(repo):
 def convert_wiki_link(content, url_prefix, repo_id, username):
     import re
 
+    page_index = []
+    def get_page_index():
+        # built on first page link, shared by the rest
+        if not page_index:
+            repo = seaserv.get_repo(repo_id)
+            if not repo:
+                raise WikiDoesNotExist
+            page_index.append(get_wiki_page_index(repo))
+        return page_index[0]
+
     def repl(matchobj):
         if matchobj.group(2):   # return origin string in backquotes
             return matchobj.group(2)
@@ -135,7 +193,8 @@ def convert_wiki_link(content, url_prefix, repo_id, username):
         if fileext == '':
             # convert page_name that extension is missing to a markdown page
             try:
-                dirent = get_wiki_dirent(repo_id, page_name)
+                if find_wiki_dirent(get_page_index(), page_name) is None:
+                    raise WikiPageMissing
                 a_tag = '''<a href="%s">%s</a>'''
                 return a_tag % (smart_str(url_prefix + normalize_page_name(page_name) + '/'), page_alias)
             except (WikiDoesNotExist, WikiPageMissing):
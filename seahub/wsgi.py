@@ -24,6 +24,9 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "seahub.settings")
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
+from seahub import import_profiler
+import_profiler.report()
+
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)
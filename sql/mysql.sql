@@ -172,6 +172,28 @@ CREATE TABLE `base_innerpubmsgreply` (
 /*!40000 ALTER TABLE `base_innerpubmsgreply` ENABLE KEYS */;
 /*!40101 SET @saved_cs_client     = @@character_set_client */;
 /*!40101 SET character_set_client = utf8 */;
+CREATE TABLE `base_repoindex` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `repo_id` varchar(36) NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `owner` varchar(255) NOT NULL,
+  `size` bigint(20) NOT NULL,
+  `file_count` bigint(20) NOT NULL,
+  `encrypted` tinyint(1) NOT NULL,
+  `is_virtual` tinyint(1) NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `repo_id` (`repo_id`),
+  KEY `base_repoindex_b068931c` (`name`),
+  KEY `base_repoindex_5e7b1936` (`owner`),
+  KEY `base_repoindex_f4ac8b5a` (`updated_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+/*!40000 ALTER TABLE `base_repoindex` DISABLE KEYS */;
+/*!40000 ALTER TABLE `base_repoindex` ENABLE KEYS */;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8 */;
 CREATE TABLE `base_userenabledmodule` (
   `id` int(11) NOT NULL AUTO_INCREMENT,
   `username` varchar(255) NOT NULL,
@@ -663,7 +685,10 @@ CREATE TABLE `share_fileshare` (
   UNIQUE KEY `token` (`token`),
   KEY `share_fileshare_14c4b06b` (`username`),
   KEY `share_fileshare_9a8c79bf` (`repo_id`),
-  KEY `share_fileshare_1abd88b5` (`s_type`)
+  KEY `share_fileshare_1abd88b5` (`s_type`),
+  KEY `share_fileshare_username_ctime_idx` (`username`,`ctime`),
+  KEY `share_fileshare_username_view_cnt_idx` (`username`,`view_cnt`),
+  KEY `share_fileshare_username_expire_date_idx` (`username`,`expire_date`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
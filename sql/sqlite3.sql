@@ -24,6 +24,7 @@ CREATE TABLE "base_innerpubmsg" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT
 CREATE TABLE "base_innerpubmsgreply" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "reply_to_id" integer NOT NULL REFERENCES "base_innerpubmsg" ("id"), "from_email" varchar(254) NOT NULL, "message" varchar(150) NOT NULL, "timestamp" datetime NOT NULL);
 CREATE TABLE "base_devicetoken" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "token" varchar(80) NOT NULL, "user" varchar(255) NOT NULL, "platform" varchar(32) NOT NULL, "version" varchar(16) NOT NULL, "pversion" varchar(16) NOT NULL, UNIQUE ("token", "user"));
 CREATE TABLE "base_clientlogintoken" ("token" varchar(32) NOT NULL PRIMARY KEY, "username" varchar(255) NOT NULL, "timestamp" datetime NOT NULL);
+CREATE TABLE "base_repoindex" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "repo_id" varchar(36) NOT NULL UNIQUE, "name" varchar(255) NOT NULL, "owner" varchar(255) NOT NULL, "size" bigint NOT NULL, "file_count" bigint NOT NULL, "encrypted" bool NOT NULL, "is_virtual" bool NOT NULL, "updated_at" datetime NOT NULL);
 CREATE TABLE "contacts_contact" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "user_email" varchar(255) NOT NULL, "contact_email" varchar(255) NOT NULL, "contact_name" varchar(255) NULL, "note" varchar(255) NULL);
 CREATE TABLE "wiki_personalwiki" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "username" varchar(255) NOT NULL UNIQUE, "repo_id" varchar(36) NOT NULL);
 CREATE TABLE "wiki_groupwiki" ("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "group_id" integer NOT NULL UNIQUE, "repo_id" varchar(36) NOT NULL);
@@ -118,6 +119,9 @@ CREATE INDEX "base_groupenabledmodule_0e939a4f" ON "base_groupenabledmodule" ("g
 CREATE INDEX "base_userlastlogin_14c4b06b" ON "base_userlastlogin" ("username");
 CREATE INDEX "base_innerpubmsgreply_6ec85d95" ON "base_innerpubmsgreply" ("reply_to_id");
 CREATE INDEX "base_clientlogintoken_14c4b06b" ON "base_clientlogintoken" ("username");
+CREATE INDEX "base_repoindex_b068931c" ON "base_repoindex" ("name");
+CREATE INDEX "base_repoindex_5e7b1936" ON "base_repoindex" ("owner");
+CREATE INDEX "base_repoindex_f4ac8b5a" ON "base_repoindex" ("updated_at");
 CREATE INDEX "contacts_contact_40c27bdc" ON "contacts_contact" ("user_email");
 CREATE INDEX "group_groupmessage_0e939a4f" ON "group_groupmessage" ("group_id");
 CREATE INDEX "group_messagereply_6ec85d95" ON "group_messagereply" ("reply_to_id");
@@ -136,6 +140,9 @@ CREATE INDEX "profile_detailedprofile_ee11cbb1" ON "profile_detailedprofile" ("u
 CREATE INDEX "share_fileshare_14c4b06b" ON "share_fileshare" ("username");
 CREATE INDEX "share_fileshare_9a8c79bf" ON "share_fileshare" ("repo_id");
 CREATE INDEX "share_fileshare_1abd88b5" ON "share_fileshare" ("s_type");
+CREATE INDEX "share_fileshare_username_ctime_idx" ON "share_fileshare" ("username", "ctime");
+CREATE INDEX "share_fileshare_username_view_cnt_idx" ON "share_fileshare" ("username", "view_cnt");
+CREATE INDEX "share_fileshare_username_expire_date_idx" ON "share_fileshare" ("username", "expire_date");
 CREATE INDEX "share_orgfileshare_9cf869aa" ON "share_orgfileshare" ("org_id");
 CREATE INDEX "share_uploadlinkshare_14c4b06b" ON "share_uploadlinkshare" ("username");
 CREATE INDEX "share_uploadlinkshare_9a8c79bf" ON "share_uploadlinkshare" ("repo_id");
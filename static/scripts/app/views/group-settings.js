@@ -109,6 +109,48 @@ define([
                 }
                 var $submitBtn = $('[type="submit"]', $(this));
                 Common.disableButton($submitBtn);
+
+                var showResult = function(failed) {
+                    if (failed.length > 0) {
+                        var err_msg = '';
+                        $(failed).each(function(index, item) {
+                            err_msg += item.email + ': ' + item.error_msg + '<br />';
+                        });
+                        $error.html(err_msg).removeClass('hide');
+                        Common.enableButton($submitBtn);
+                    } else {
+                        $.modal.close();
+                        Common.feedback(gettext("Successfully imported."), 'success');
+                    }
+                };
+                var showError = function(xhr) {
+                    var error_msg;
+                    if (xhr.responseText) {
+                        error_msg = $.parseJSON(xhr.responseText).error;
+                    } else {
+                        error_msg = gettext("Failed. Please check the network.");
+                    }
+                    $error.html(error_msg).removeClass('hide');
+                    Common.enableButton($submitBtn);
+                };
+                var pollProgress = function(url) {
+                    $.ajax({
+                        url: url,
+                        dataType: 'json',
+                        cache: false,
+                        success: function(job) {
+                            if (job.status == 'done') {
+                                showResult(job.result.failed || []);
+                            } else if (job.status == 'failed') {
+                                $error.html(gettext("Error")).removeClass('hide');
+                                Common.enableButton($submitBtn);
+                            } else {
+                                setTimeout(function() { pollProgress(url); }, 2000);
+                            }
+                        },
+                        error: showError
+                    });
+                };
                 $.ajax({
                     url: Common.getUrl({
                         'name': 'group',
@@ -166,6 +208,48 @@ define([
 
                 var $submitBtn = $('[type="submit"]', $(this));
                 Common.disableButton($submitBtn);
+
+                var showResult = function(failed) {
+                    if (failed.length > 0) {
+                        var err_msg = '';
+                        $(failed).each(function(index, item) {
+                            err_msg += item.email + ': ' + item.error_msg + '<br />';
+                        });
+                        $error.html(err_msg).removeClass('hide');
+                        Common.enableButton($submitBtn);
+                    } else {
+                        $.modal.close();
+                        Common.feedback(gettext("Successfully imported."), 'success');
+                    }
+                };
+                var showError = function(xhr) {
+                    var error_msg;
+                    if (xhr.responseText) {
+                        error_msg = $.parseJSON(xhr.responseText).error;
+                    } else {
+                        error_msg = gettext("Failed. Please check the network.");
+                    }
+                    $error.html(error_msg).removeClass('hide');
+                    Common.enableButton($submitBtn);
+                };
+                var pollProgress = function(url) {
+                    $.ajax({
+                        url: url,
+                        dataType: 'json',
+                        cache: false,
+                        success: function(job) {
+                            if (job.status == 'done') {
+                                showResult(job.result.failed || []);
+                            } else if (job.status == 'failed') {
+                                $error.html(gettext("Error")).removeClass('hide');
+                                Common.enableButton($submitBtn);
+                            } else {
+                                setTimeout(function() { pollProgress(url); }, 2000);
+                            }
+                        },
+                        error: showError
+                    });
+                };
                 $.ajax({
                     url: Common.getUrl({
                         'name': 'group',
@@ -252,6 +336,48 @@ define([
                 var $submitBtn = $('[type="submit"]', $(this));
                 Common.disableButton($submitBtn);
 
+                var showResult = function(failed) {
+                    if (failed.length > 0) {
+                        var err_msg = '';
+                        $(failed).each(function(index, item) {
+                            err_msg += item.email + ': ' + item.error_msg + '<br />';
+                        });
+                        $error.html(err_msg).removeClass('hide');
+                        Common.enableButton($submitBtn);
+                    } else {
+                        $.modal.close();
+                        Common.feedback(gettext("Successfully imported."), 'success');
+                    }
+                };
+                var showError = function(xhr) {
+                    var error_msg;
+                    if (xhr.responseText) {
+                        error_msg = $.parseJSON(xhr.responseText).error;
+                    } else {
+                        error_msg = gettext("Failed. Please check the network.");
+                    }
+                    $error.html(error_msg).removeClass('hide');
+                    Common.enableButton($submitBtn);
+                };
+                var pollProgress = function(url) {
+                    $.ajax({
+                        url: url,
+                        dataType: 'json',
+                        cache: false,
+                        success: function(job) {
+                            if (job.status == 'done') {
+                                showResult(job.result.failed || []);
+                            } else if (job.status == 'failed') {
+                                $error.html(gettext("Error")).removeClass('hide');
+                                Common.enableButton($submitBtn);
+                            } else {
+                                setTimeout(function() { pollProgress(url); }, 2000);
+                            }
+                        },
+                        error: showError
+                    });
+                };
+
                 var file = $fileInput.files[0];
                 var formData = new FormData();
                 formData.append('file', file);
@@ -267,28 +393,15 @@ define([
                     contentType: false, // tell jQuery not to set contentType
                     beforeSend: Common.prepareCSRFToken,
                     success: function(data) {
-                        if (data.failed.length > 0) {
-                            var err_msg = '';
-                            $(data.failed).each(function(index, item) {
-                                err_msg += item.email + ': ' + item.error_msg + '<br />';
-                            });
-                            $error.html(err_msg).removeClass('hide');
-                            Common.enableButton($submitBtn);
+                        if (data.progress_url) {
+                            // large files are imported in background
+                            $error.html(gettext("Importing...")).removeClass('hide');
+                            pollProgress(data.progress_url);
                         } else {
-                            $.modal.close();
-                            Common.feedback(gettext("Successfully imported."), 'success');
+                            showResult(data.failed);
                         }
                     },
-                    error: function(xhr) {
-                        var error_msg;
-                        if (xhr.responseText) {
-                            error_msg = $.parseJSON(xhr.responseText).error;
-                        } else {
-                            error_msg = gettext("Failed. Please check the network.");
-                        }
-                        $error.html(error_msg).removeClass('hide');
-                        Common.enableButton($submitBtn);
-                    }
+                    error: showError
                 });
                 return false;
             });
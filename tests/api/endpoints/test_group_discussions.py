@@ -41,6 +41,37 @@ class GroupDiscussionsTest(BaseTestCase):
         assert len(json_resp['msgs']) == 5
         assert json_resp['msgs'][-1]['content'] == 'msg 0'
 
+    def test_can_list_with_cursor(self):
+        for i in range(10):
+            GroupMessage(group_id=self.group.id, from_email=self.username,
+                         message="msg %s" % i).save()
+
+        resp = self.client.get(self.endpoint + '?before=&per_page=4')
+        self.assertEqual(200, resp.status_code)
+        json_resp = json.loads(resp.content)
+        assert len(json_resp['msgs']) == 4
+        assert json_resp['msgs'][0]['content'] == 'msg 9'
+        assert json_resp['previous_cursor'] is None
+
+        resp = self.client.get(self.endpoint + '?before=%s&per_page=4' %
+                               json_resp['next_cursor'])
+        json_resp = json.loads(resp.content)
+        assert len(json_resp['msgs']) == 4
+        assert json_resp['msgs'][0]['content'] == 'msg 5'
+
+        resp = self.client.get(self.endpoint + '?before=%s&per_page=4' %
+                               json_resp['next_cursor'])
+        json_resp = json.loads(resp.content)
+        assert len(json_resp['msgs']) == 2
+        assert json_resp['msgs'][-1]['content'] == 'msg 0'
+        assert json_resp['next_cursor'] is None
+
+        resp = self.client.get(self.endpoint + '?after=%s&per_page=4' %
+                               json_resp['previous_cursor'])
+        json_resp = json.loads(resp.content)
+        assert len(json_resp['msgs']) == 4
+        assert json_resp['msgs'][0]['content'] == 'msg 5'
+
     def test_can_not_list_when_invalid_user(self):
         self.logout()
 
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import json
+import datetime
 from mock import patch
 
 from django.core.urlresolvers import reverse
+from seaserv import seafile_api
+
 from seahub.test_utils import BaseTestCase
 from seahub.share.models import FileShare
 from seahub.api2.endpoints.share_links import ShareLinks, ShareLink
@@ -79,6 +82,85 @@ class ShareLinksTest(BaseTestCase):
 
         self._remove_share_link(token)
 
+    def test_get_links_sorted_by_view_cnt_in_pages(self):
+        self.login_as(self.user)
+        file_token = self._add_file_share_link()
+        dir_token = self._add_dir_share_link()
+        FileShare.objects.filter(token=dir_token).update(view_cnt=10)
+
+        with patch('seahub.api2.endpoints.share_links.seafile_api.get_repo',
+                   wraps=seafile_api.get_repo) as mock_get_repo:
+            resp = self.client.get(self.url + '?sort_by=view_cnt&per_page=1')
+            # one lookup of repo per page
+            assert mock_get_repo.call_count == 1
+        self.assertEqual(200, resp.status_code)
+        json_resp = json.loads(resp.content)
+        assert [x['token'] for x in json_resp['share_links']] == [dir_token]
+        assert json_resp['share_links'][0]['repo_name'] == self.repo.name
+        next_cursor = json_resp['next_cursor']
+        assert next_cursor is not None
+
+        resp = self.client.get(self.url + '?sort_by=view_cnt&per_page=1&cursor=' + next_cursor)
+        json_resp = json.loads(resp.content)
+        assert [x['token'] for x in json_resp['share_links']] == [file_token]
+        assert json_resp['next_cursor'] is None
+
+        self._remove_share_link(file_token)
+        self._remove_share_link(dir_token)
+
+    def test_get_links_sorted_by_expire_date_in_pages(self):
+        self.login_as(self.user)
+        file_token = self._add_file_share_link()
+        dir_token = self._add_dir_share_link()
+        FileShare.objects.filter(token=dir_token).update(
+            expire_date=datetime.datetime(2030, 1, 1))
+
+        tokens = []
+        cursor = ''
+        for _ in range(3):
+            resp = self.client.get(self.url + '?sort_by=expire_date&per_page=1&cursor=' + cursor)
+            self.assertEqual(200, resp.status_code)
+            json_resp = json.loads(resp.content)
+            tokens += [x['token'] for x in json_resp['share_links']]
+            cursor = json_resp['next_cursor']
+            if cursor is None:
+                break
+
+        # links never expire come last
+        assert tokens == [dir_token, file_token]
+
+        self._remove_share_link(file_token)
+        self._remove_share_link(dir_token)
+
+    def test_get_links_sorted_by_expire_date(self):
+        self.login_as(self.user)
+        file_token = self._add_file_share_link()
+        dir_token = self._add_dir_share_link()
+        FileShare.objects.filter(token=dir_token).update(
+            expire_date=datetime.datetime(2030, 1, 1))
+
+        # links never expire come last, whatever the order
+        for sort_order in ('desc', 'asc'):
+            resp = self.client.get(self.url + '?sort_by=expire_date&sort_order=' + sort_order)
+            self.assertEqual(200, resp.status_code)
+            json_resp = json.loads(resp.content)
+            assert [x['token'] for x in json_resp] == [dir_token, file_token]
+
+        self._remove_share_link(file_token)
+        self._remove_share_link(dir_token)
+
+    def test_get_links_with_invalid_cursor(self):
+        self.login_as(self.user)
+
+        resp = self.client.get(self.url + '?per_page=1&cursor=1')
+        self.assertEqual(400, resp.status_code)
+
+    def test_get_links_with_invalid_sort_by(self):
+        self.login_as(self.user)
+
+        resp = self.client.get(self.url + '?sort_by=path')
+        self.assertEqual(400, resp.status_code)
+
     @patch.object(ShareLinks, '_can_generate_shared_link')
     def test_get_link_with_invalid_user_role_permission(self, mock_can_generate_shared_link):
         self.login_as(self.user)
@@ -33,6 +33,22 @@ class StarredFileTest(BaseTestCase, Fixtures):
         json_resp = json.loads(resp.content)
         self.assertEqual(1, len(json_resp))
 
+    def test_list_removes_nonexistent_files(self):
+        UserStarredFiles(email=self.user.username, org_id=-1,
+                         repo_id=self.repo.id, path='/not-exist.txt',
+                         is_dir=False).save()
+        assert len(UserStarredFiles.objects.all()) == 2
+
+        self.login_as(self.user)
+
+        resp = self.client.get(reverse('starredfiles'))
+        self.assertEqual(200, resp.status_code)
+        json_resp = json.loads(resp.content)
+        assert len(json_resp) == 1
+        assert json_resp[0]['path'] == self.file
+        assert json_resp[0]['mtime'] > 0
+        assert len(UserStarredFiles.objects.all()) == 1
+
     def test_can_add(self):
         self.login_as(self.user)
 
@@ -1,7 +1,9 @@
+from django.utils import translation
+
 from seahub.test_utils import BaseTestCase
 
 from seahub.base.templatetags.seahub_tags import email2nickname, \
-    seahub_filesizeformat
+    seahub_filesizeformat, translate_commit_desc, translate_commit_desc_escape
 from seahub.profile.models import Profile
 
 
@@ -39,3 +41,29 @@ class SeahubFilesizeformatTest(BaseTestCase):
         assert seahub_filesizeformat(1000) == u'1.0\xa0KB'
         assert seahub_filesizeformat(1000000) == u'1.0\xa0MB'
         assert seahub_filesizeformat(1000000000) == u'1.0\xa0GB'
+
+
+class TranslateCommitDescTest(BaseTestCase):
+    def tearDown(self):
+        translation.activate('en')
+
+    def test_translate_per_language(self):
+        desc = 'Added "foo.txt" and 3 more files.\nDeleted "bar.txt".'
+
+        translation.activate('en')
+        assert translate_commit_desc(desc) == desc
+
+        translation.activate('zh-cn')
+        ret = translate_commit_desc(desc)
+        assert ret == translate_commit_desc(desc)
+        assert u'\u4ee5\u53ca\u53e6\u5916' in ret
+
+        translation.activate('en')
+        assert translate_commit_desc(desc) == desc
+
+    def test_escape(self):
+        desc = 'Deleted "<b>.txt".'
+
+        translation.activate('en')
+        assert translate_commit_desc_escape(desc) == 'Deleted &quot;&lt;b&gt;.txt&quot;.'
+        assert translate_commit_desc(desc) == desc
@@ -0,0 +1,77 @@
+from mock import patch
+
+from seahub.base.cache import TwoTierCache, make_key
+from seahub.test_utils import BaseTestCase
+
+
+class TwoTierCacheTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+        self.cache = TwoTierCache('default', {
+            'OPTIONS': {'L1_TIMEOUT': 60, 'L1_KEY_PREFIXES': ('NICKNAME_',)},
+        })
+
+    def tearDown(self):
+        self.clear_cache()
+
+    def test_l1_serves_reads(self):
+        self.cache.set('NICKNAME_foo', 'foo')
+        self.cache.shared.delete('NICKNAME_foo')
+        assert self.cache.get('NICKNAME_foo') == 'foo'
+
+        # other keys always go to the shared cache
+        self.cache.set('throttle_foo', [1])
+        self.cache.shared.delete('throttle_foo')
+        assert self.cache.get('throttle_foo') is None
+
+    def test_l1_values_are_copies(self):
+        self.cache.set('NICKNAME_foo', ['foo'])
+        self.cache.get('NICKNAME_foo').append('bar')
+        assert self.cache.get('NICKNAME_foo') == ['foo']
+
+    def test_delete(self):
+        self.cache.set('NICKNAME_foo', 'foo')
+        self.cache.delete('NICKNAME_foo')
+        assert self.cache.get('NICKNAME_foo') is None
+
+    def test_get_many(self):
+        self.cache.set('NICKNAME_foo', 'foo')
+        self.cache.shared.set('NICKNAME_bar', 'bar')
+        assert self.cache.get_many(['NICKNAME_foo', 'NICKNAME_bar', 'x']) == {
+            'NICKNAME_foo': 'foo', 'NICKNAME_bar': 'bar'}
+
+    def test_get_or_compute(self):
+        calls = []
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        assert self.cache.get_or_compute('NICKNAME_foo', compute, 60) == 'value'
+        assert self.cache.get_or_compute('NICKNAME_foo', compute, 60) == 'value'
+        assert len(calls) == 1
+
+    def test_get_or_compute_returns_stale_value_while_locked(self):
+        self.cache.set('NICKNAME_foo', ('old', 0, 0))
+        self.cache.shared.add('NICKNAME_foo_LOCK', 1)
+
+        compute = lambda: 'new'
+        assert self.cache.get_or_compute('NICKNAME_foo', compute, 60) == 'old'
+
+        self.cache.shared.delete('NICKNAME_foo_LOCK')
+        assert self.cache.get_or_compute('NICKNAME_foo', compute, 60) == 'new'
+
+    @patch('seahub.base.cache.SINGLE_FLIGHT_WAIT', 0.2)
+    def test_get_or_compute_computes_when_lock_is_not_released(self):
+        self.cache.shared.add('NICKNAME_foo_LOCK', 1)
+        assert self.cache.get_or_compute('NICKNAME_foo', lambda: 'new', 60) == 'new'
+
+
+class MakeKeyTest(BaseTestCase):
+    def test_make_key(self):
+        assert make_key('foo', '', 1) == ':1:foo'
+
+        key = make_key('foo bar', '', 1)
+        assert ' ' not in key
+        assert key == make_key('foo bar', '', 1)
+
+        assert len(make_key('a' * 300, '', 1)) < 250
@@ -0,0 +1,41 @@
+from constance import config
+from django.core.urlresolvers import reverse
+
+from seahub.base.config_snapshot import get_config_snapshot, \
+    bump_config_version
+from seahub.test_utils import BaseTestCase
+
+
+class ConfigSnapshotTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+        self.old_min_len = config.REPO_PASSWORD_MIN_LENGTH
+
+    def tearDown(self):
+        config.REPO_PASSWORD_MIN_LENGTH = self.old_min_len
+        self.clear_cache()
+
+    def test_reload_when_version_changes(self):
+        config.REPO_PASSWORD_MIN_LENGTH = 5
+        bump_config_version()
+        snapshot = get_config_snapshot()
+        assert snapshot.REPO_PASSWORD_MIN_LENGTH == 5
+        assert get_config_snapshot() is snapshot
+
+        config.REPO_PASSWORD_MIN_LENGTH = 6
+        bump_config_version()
+        assert get_config_snapshot().REPO_PASSWORD_MIN_LENGTH == 6
+
+    def test_unknown_key(self):
+        with self.assertRaises(AttributeError):
+            get_config_snapshot().NOT_A_SETTING
+
+    def test_sys_settings_bumps_version(self):
+        self.login_as(self.admin)
+        get_config_snapshot()
+
+        resp = self.client.post(reverse('sys_settings'), {
+            'key': 'REPO_PASSWORD_MIN_LENGTH', 'value': '7'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(200, resp.status_code)
+        assert get_config_snapshot().REPO_PASSWORD_MIN_LENGTH == 7
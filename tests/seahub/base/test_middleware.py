@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from mock import patch, MagicMock
+
+from seahub.base.middleware import InfobarMiddleware, \
+    MiddlewareTimingMiddleware, CachedOrg
+from seahub.notifications.models import Notification
+from seahub.test_utils import BaseTestCase
+
+
+class InfobarMiddlewareTest(BaseTestCase):
+    def setUp(self):
+        cache.delete('CUR_TOPINFO')
+        self.middleware = InfobarMiddleware()
+
+    def test_no_notification_is_cached(self):
+        self.middleware.process_request(self.fake_request)
+        assert self.fake_request.cur_note is None
+        assert cache.get('CUR_TOPINFO') == []
+
+        with patch.object(InfobarMiddleware, 'get_from_db') as mock_get:
+            self.middleware.process_request(self.fake_request)
+            assert mock_get.call_count == 0
+        assert self.fake_request.cur_note is None
+
+    def test_primary_notification(self):
+        Notification(message='test', primary=1).save()
+
+        self.middleware.process_request(self.fake_request)
+        assert self.fake_request.cur_note.message == 'test'
+
+    def test_timing_is_recorded(self):
+        self.middleware.process_request(self.fake_request)
+
+        timings = self.fake_request._middleware_timings
+        assert timings[0][0] == 'InfobarMiddleware.process_request'
+
+    @patch('seahub.base.middleware.MIDDLEWARE_TIMING_ENABLED', True)
+    def test_timing_header(self):
+        self.middleware.process_request(self.fake_request)
+
+        resp = self.client.get('/foo/')
+        resp = MiddlewareTimingMiddleware().process_response(
+            self.fake_request, resp)
+        assert 'InfobarMiddleware.process_request' in \
+            resp['X-Seahub-Middleware-Timing']
+
+
+class CachedOrgTest(BaseTestCase):
+    def test_keeps_is_staff(self):
+        org = MagicMock(org_id=1, org_name='org', url_prefix='org',
+                        creator='foo@foo.com', ctime=0, is_staff=True)
+        cached = CachedOrg(CachedOrg.to_dict(org))
+
+        assert cached.is_staff is True
+        assert cached.org_id == 1
@@ -1,6 +1,9 @@
 import hashlib
 
-from seahub.base.models import FileComment
+from mock import patch
+
+from seahub.base.models import FileComment, RepoIndex
+from seahub.signals import repo_deleted, repo_transferred
 from seahub.test_utils import BaseTestCase
 
 
@@ -75,3 +78,50 @@ class FileCommentTest(BaseTestCase):
                     comment='test comment').save()
 
         assert len(FileComment.objects.all()) == 1
+
+
+class RepoIndexTest(BaseTestCase):
+    def setUp(self):
+        RepoIndex.objects.update_repo('repo-1', 'Project Alpha', 'a@test.com')
+        RepoIndex.objects.update_repo('repo-2', 'alpha notes', 'b@test.com')
+        RepoIndex.objects.update_repo('repo-3', 'Beta', 'a@test.com',
+                                      is_virtual=True)
+
+    def test_update_repo(self):
+        RepoIndex.objects.update_repo('repo-1', 'Project Gamma', 'a@test.com',
+                                      size=10)
+
+        assert RepoIndex.objects.filter(repo_id='repo-1').count() == 1
+        r = RepoIndex.objects.get(repo_id='repo-1')
+        assert r.name == 'Project Gamma'
+        assert r.size == 10
+
+    def test_search_by_name(self):
+        ret = RepoIndex.objects.search_by_name('alpha')
+        assert [r.repo_id for r in ret] == ['repo-2', 'repo-1']
+
+        ret = RepoIndex.objects.search_by_name('alpha', prefix=True)
+        assert [r.repo_id for r in ret] == ['repo-2']
+
+        assert len(RepoIndex.objects.search_by_name('beta')) == 0
+
+    def test_get_owners(self):
+        assert RepoIndex.objects.get_owners(['repo-1', 'repo-x']) == {
+            'repo-1': 'a@test.com'}
+
+    def test_signals(self):
+        repo_transferred.send(sender=None, org_id=-1, repo_id='repo-1',
+                              from_user='a@test.com', to_user='c@test.com')
+        assert RepoIndex.objects.get(repo_id='repo-1').owner == 'c@test.com'
+
+        repo_deleted.send(sender=None, org_id=-1, usernames=[],
+                          repo_owner='c@test.com', repo_id='repo-1',
+                          repo_name='Project Alpha')
+        assert RepoIndex.objects.filter(repo_id='repo-1').count() == 0
+
+    def test_index_failure_does_not_block_signals(self):
+        with patch.object(RepoIndex.objects, 'remove_repo',
+                          side_effect=Exception('no such table')):
+            repo_deleted.send(sender=None, org_id=-1, usernames=[],
+                              repo_owner='a@test.com', repo_id='repo-1',
+                              repo_name='Project Alpha')
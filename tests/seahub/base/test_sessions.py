@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+from seahub.auth import SESSION_KEY, BACKEND_SESSION_KEY
+from seahub.base.sessions import SessionStore, session_writer, \
+    clear_expired_sessions
+from seahub.test_utils import BaseTestCase
+
+
+class SessionStoreTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+
+    def tearDown(self):
+        session_writer.flush()
+        self.clear_cache()
+
+    def _create(self):
+        s = SessionStore()
+        s['foo'] = 'bar'
+        s.save()
+        return s.session_key
+
+    def test_new_session_is_written_to_db(self):
+        key = self._create()
+        assert Session.objects.filter(session_key=key).exists()
+        assert SessionStore(key)['foo'] == 'bar'
+
+    def test_change_is_written_behind(self):
+        key = self._create()
+
+        s = SessionStore(key)
+        s['foo'] = 'baz'
+        s.save()
+        # served from cache before written to database
+        assert SessionStore(key)['foo'] == 'baz'
+
+        session_writer.flush()
+        self.clear_cache()
+        assert SessionStore(key)['foo'] == 'baz'
+
+    def test_login_is_written_through(self):
+        key = self._create()
+
+        s = SessionStore(key)
+        assert s['foo'] == 'bar'
+        s.cycle_key()
+        s[SESSION_KEY] = 'foo@foo.com'
+        s[BACKEND_SESSION_KEY] = 'seahub.base.accounts.AuthBackend'
+        s.save()
+        assert session_writer.pending_count() == 0
+
+        self.clear_cache()
+        assert SessionStore(s.session_key)[SESSION_KEY] == 'foo@foo.com'
+        assert not Session.objects.filter(session_key=key).exists()
+
+    def test_unchanged_session_is_not_saved(self):
+        key = self._create()
+        session_writer.flush()
+
+        s = SessionStore(key)
+        s['foo']
+        s.save()
+        assert session_writer.pending_count() == 0
+
+    def test_deleted_session_is_not_written_back(self):
+        key = self._create()
+        s = SessionStore(key)
+        s['foo'] = 'baz'
+        s.save()
+
+        SessionStore().delete(key)
+        session_writer.flush()
+        assert not Session.objects.filter(session_key=key).exists()
+        assert SessionStore(key).get('foo') is None
+
+
+class ClearExpiredSessionsTest(BaseTestCase):
+    def test_clear_expired_sessions(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key='expired%d' % i,
+                                   session_data='',
+                                   expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='valid', session_data='',
+                               expire_date=now + timedelta(days=1))
+
+        assert clear_expired_sessions(batch_size=2) == 5
+        assert list(Session.objects.values_list('session_key', flat=True)) \
+            == ['valid']
@@ -0,0 +1,144 @@
+import json
+import os
+from datetime import timedelta
+
+from django.utils import timezone
+from mock import patch
+
+from seahub.base.accounts import User
+from seahub.jobs.handlers import submit_job, run_job, iter_csv_batches, \
+    batch_add_user, JOB_BATCH_ADD_USER
+from seahub.jobs.models import BackgroundJob, STATUS_QUEUED, STATUS_DONE, \
+    STATUS_RUNNING
+from seahub.jobs.settings import JOB_DATA_DIR
+from seahub.test_utils import BaseTestCase
+
+
+class IterCsvBatchesTest(BaseTestCase):
+    def test_batches(self):
+        content = '\n'.join(['a%d@a.com,pwd' % i for i in range(5)]) + '\n\n'
+        batches = list(iter_csv_batches(content, batch_size=2))
+
+        assert [len(b) for b in batches] == [2, 2, 1]
+
+    def test_skip_processed_rows(self):
+        content = '\n'.join(['a%d@a.com,pwd' % i for i in range(5)])
+        batches = list(iter_csv_batches(content, batch_size=2, skip=3))
+
+        assert batches == [[['a3@a.com', 'pwd'], ['a4@a.com', 'pwd']]]
+
+
+class BatchAddUserJobTest(BaseTestCase):
+    def setUp(self):
+        self.new_users = ['job_%d@test.com' % i for i in range(3)]
+        self.content = '\n'.join(['%s,pwd' % e for e in self.new_users] +
+                                 ['invalid,pwd', '%s,pwd' % self.user.username])
+
+    def tearDown(self):
+        for u in self.new_users:
+            self.remove_user(u)
+
+    def test_run_inline(self):
+        job = submit_job(JOB_BATCH_ADD_USER, self.admin.username,
+                         data=self.content)
+
+        assert job.status == STATUS_DONE
+        assert job.total == 5
+        assert job.succeeded == 3
+        assert job.failed == 2
+        assert job.data_file == ''
+        for e in self.new_users:
+            assert User.objects.get(e) is not None
+
+    @patch('seahub.jobs.handlers.JOB_INLINE_MAX_ROWS', 1)
+    def test_queue_and_run(self):
+        job = submit_job(JOB_BATCH_ADD_USER, self.admin.username,
+                         data=self.content)
+        assert job.status == STATUS_QUEUED
+
+        claimed = BackgroundJob.objects.claim_next_job()
+        assert claimed.pk == job.pk
+        assert BackgroundJob.objects.claim_next_job() is None
+
+        # uploaded passwords are not stored in database
+        assert claimed.data_file
+        assert claimed.get_data() == self.content
+        data_path = os.path.join(JOB_DATA_DIR, claimed.data_file)
+
+        run_job(claimed)
+        job = BackgroundJob.objects.get(pk=job.pk)
+        assert job.status == STATUS_DONE
+        assert job.processed == 5
+        assert len(job.get_result()['failed']) == 2
+        assert job.data_file == ''
+        assert not os.path.exists(data_path)
+
+    @patch('seahub.jobs.handlers.JOB_INLINE_MAX_ROWS', 1)
+    def test_resume_after_crash(self):
+        job = submit_job(JOB_BATCH_ADD_USER, self.admin.username,
+                         data=self.content)
+        claimed = BackgroundJob.objects.claim_next_job()
+
+        create_user = User.objects.create_user
+        created = []
+        def crash_on_second_user(*args, **kwargs):
+            if created:
+                raise Exception('worker killed')
+            created.append(args[0])
+            return create_user(*args, **kwargs)
+
+        # worker is killed in the middle of a batch
+        with patch('seahub.jobs.handlers.User.objects.create_user',
+                   side_effect=crash_on_second_user):
+            self.assertRaises(Exception, batch_add_user, claimed)
+
+        job = BackgroundJob.objects.get(pk=job.pk)
+        # first user is recorded as soon as it is created
+        assert job.processed == 1
+        assert job.succeeded == 1
+
+        job.status = STATUS_QUEUED
+        job.save()
+        run_job(BackgroundJob.objects.claim_next_job())
+
+        job = BackgroundJob.objects.get(pk=job.pk)
+        assert job.processed == 5
+        assert job.succeeded == 3
+        assert job.failed == 2
+
+
+    @patch('seahub.jobs.handlers.JOB_INLINE_MAX_ROWS', 1)
+    def test_requeue_stale_job(self):
+        job = submit_job(JOB_BATCH_ADD_USER, self.admin.username,
+                         data=self.content)
+        claimed = BackgroundJob.objects.claim_next_job()
+        assert claimed.pk == job.pk
+
+        # worker crashed
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(days=1))
+
+        claimed = BackgroundJob.objects.claim_next_job()
+        assert claimed.pk == job.pk
+        assert claimed.status == STATUS_RUNNING
+
+
+class JobProgressTest(BaseTestCase):
+    def setUp(self):
+        self.job = BackgroundJob.objects.add_job(JOB_BATCH_ADD_USER,
+                                                 self.user.username)
+
+    def test_creator_can_get(self):
+        self.login_as(self.user)
+        resp = self.client.get('/jobs/%d/progress/' % self.job.pk,
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(200, resp.status_code)
+        assert json.loads(resp.content)['id'] == self.job.pk
+
+    def test_other_user_can_not_get(self):
+        other = self.create_user()
+        self.login_as(other)
+        resp = self.client.get('/jobs/%d/progress/' % self.job.pk,
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(403, resp.status_code)
+        self.remove_user(other.username)
@@ -0,0 +1,79 @@
+import datetime
+
+from django.core.cache import cache
+
+from seahub.share.models import FileShare, UploadLinkShare, \
+    incr_share_link_view_cnt, flush_share_link_view_cnt, _view_cnt_cache_key
+from seahub.test_utils import BaseTestCase
+
+
+class ShareLinkCacheTest(BaseTestCase):
+    def setUp(self):
+        self.fs = FileShare.objects.create_file_link(self.user.username,
+                                                     self.repo.id, self.file)
+
+    def test_link_is_cached(self):
+        assert FileShare.objects.get_valid_file_link_by_token(self.fs.token) == self.fs
+
+        with self.assertNumQueries(0):
+            fs = FileShare.objects.get_valid_file_link_by_token(self.fs.token)
+        assert fs.path == self.file
+
+    def test_missing_token_is_cached(self):
+        assert FileShare.objects.get_valid_file_link_by_token('not-exist') is None
+
+        with self.assertNumQueries(0):
+            assert FileShare.objects.get_valid_file_link_by_token('not-exist') is None
+
+    def test_cache_is_cleared_on_update_and_delete(self):
+        FileShare.objects.get_valid_file_link_by_token(self.fs.token)
+
+        self.fs.expire_date = datetime.datetime.now() - datetime.timedelta(days=1)
+        self.fs.save()
+        assert FileShare.objects.get_valid_file_link_by_token(self.fs.token) is None
+
+        FileShare.objects.filter(token=self.fs.token).delete()
+        assert FileShare.objects.get_valid_dir_link_by_token(self.fs.token) is None
+
+    def test_upload_link_is_cached(self):
+        uls = UploadLinkShare.objects.create_upload_link_share(
+            self.user.username, self.repo.id, self.folder)
+        assert UploadLinkShare.objects.get_valid_upload_link_by_token(uls.token) == uls
+
+        with self.assertNumQueries(0):
+            UploadLinkShare.objects.get_valid_upload_link_by_token(uls.token)
+
+        uls.delete()
+        assert UploadLinkShare.objects.get_valid_upload_link_by_token(uls.token) is None
+
+
+class ShareLinkViewCntTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+        self.fs = FileShare.objects.create_file_link(self.user.username,
+                                                     self.repo.id, self.file)
+
+    def _view_cnt(self):
+        return FileShare.objects.get(token=self.fs.token).view_cnt
+
+    def test_flush_links_with_buffered_views(self):
+        for i in range(3):
+            incr_share_link_view_cnt(self.fs)
+
+        assert flush_share_link_view_cnt(FileShare) == 1
+        assert self._view_cnt() == 3
+        # nothing buffered since
+        assert flush_share_link_view_cnt(FileShare) == 0
+        assert self._view_cnt() == 3
+
+    def test_views_are_written_once(self):
+        incr_share_link_view_cnt(self.fs)
+        # being written by another process
+        key = _view_cnt_cache_key(FileShare, self.fs.token)
+        cache.add(key + '_LOCK', 1)
+        assert flush_share_link_view_cnt(FileShare, [self.fs.token]) == 0
+        cache.delete(key + '_LOCK')
+
+        assert flush_share_link_view_cnt(FileShare, [self.fs.token]) == 1
+        assert flush_share_link_view_cnt(FileShare, [self.fs.token]) == 0
+        assert self._view_cnt() == 1
@@ -0,0 +1,38 @@
+import unittest
+
+from mock import patch, MagicMock
+
+import seahub.handlers
+from seahub.test_utils import BaseTestCase
+
+
+@unittest.skipUnless(hasattr(seahub.handlers, 'get_event_writer'),
+                     'seafevents is not configured')
+class RepoEventHandlersTest(BaseTestCase):
+    def test_repo_deleted_event_is_queued(self):
+        writer = MagicMock()
+        with patch('seahub.handlers.get_event_writer', return_value=writer):
+            seahub.handlers.repo_deleted_cb(
+                None, org_id=-1, usernames=['a@a.com', 'b@b.com'],
+                repo_owner='a@a.com', repo_id='repo-id', repo_name='lib')
+
+        item = writer.put.call_args[0][0]
+        assert item['etype'] == 'repo-delete'
+        assert item['users'] == ['a@a.com', 'b@b.com']
+        assert item['detail']['repo_id'] == 'repo-id'
+
+    @patch('seafevents.save_user_events')
+    @patch('seafevents.save_org_user_events')
+    @patch('seahub.utils.SeafEventsSession')
+    def test_save_events_with_one_session(self, mock_session,
+                                          mock_save_org, mock_save):
+        items = [{'org_id': -1, 'etype': 'repo-create', 'detail': {},
+                  'users': ['a@a.com'], 'timestamp': 0},
+                 {'org_id': 1, 'etype': 'repo-delete', 'detail': {},
+                  'users': ['b@b.com'], 'timestamp': 0}]
+        seahub.handlers.save_events(items)
+
+        assert mock_session.call_count == 1
+        assert mock_save.call_count == 1
+        assert mock_save_org.call_count == 1
+        mock_session.return_value.close.assert_called_once_with()
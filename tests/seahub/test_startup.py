@@ -0,0 +1,77 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.test import SimpleTestCase
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+# Milliseconds ``manage.py`` may spend importing modules, e.g. in cron jobs.
+# Timing depends on the machine, so the default is generous and catches gross
+# regressions only, set e.g. SEAHUB_TEST_STARTUP_BUDGET=3000 on a known CI
+# runner to be stricter.
+STARTUP_BUDGET = float(os.environ.get('SEAHUB_TEST_STARTUP_BUDGET', '10000'))
+
+def run_python(args, **env):
+    environ = dict(os.environ, DJANGO_SETTINGS_MODULE='seahub.test_settings')
+    environ.update(env)
+    p = subprocess.Popen([sys.executable] + list(args),
+                         cwd=TOPDIR, env=environ,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = p.communicate()
+    assert p.returncode == 0, stderr
+    return stdout, stderr
+
+def run_manage_py(*args, **env):
+    return run_python(['manage.py'] + list(args), **env)
+
+class StartupTest(SimpleTestCase):
+    def test_profile_imports(self):
+        _, stderr = run_manage_py('help', SEAHUB_PROFILE_IMPORTS='1',
+                                  SEAHUB_PROFILE_IMPORTS_TOP='1000')
+
+        assert 'seahub.settings' in stderr
+        assert 'modules imported in' in stderr
+
+    def test_manage_py_import_time(self):
+        # import time reported by the profiler, so interpreter start and
+        # process creation do not count
+        _, stderr = run_manage_py('help', SEAHUB_PROFILE_IMPORTS='1')
+        elapsed = float(re.search(r'modules imported in ([\d.]+) ms',
+                                  stderr).group(1))
+
+        assert elapsed < STARTUP_BUDGET, stderr
+
+    def _events_conf_dir(self):
+        conf_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, conf_dir)
+        with open(os.path.join(conf_dir, 'seafevents.conf'), 'w') as f:
+            f.write("[Audit]\nenabled = true\n")
+        with open(os.path.join(conf_dir, 'seahub_settings.py'), 'w') as f:
+            f.write("EVENTS_CONFIG_FILE = %r\n" %
+                    os.path.join(conf_dir, 'seafevents.conf'))
+        return conf_dir
+
+    def test_handlers_import_seafevents_lazily(self):
+        stdout, _ = run_python(
+            ['-c', 'import sys, seahub.handlers as h; '
+             'print hasattr(h, "add_event"), "seahub.utils" in sys.modules, '
+             '"seafevents" in sys.modules'],
+            SEAFILE_CENTRAL_CONF_DIR=self._events_conf_dir())
+
+        # events are enabled, but nothing heavy is imported before first one
+        assert stdout.split() == ['True', 'False', 'False'], stdout
+
+    def test_utils_import_seafevents_lazily(self):
+        stdout, _ = run_python(
+            ['-c', 'import sys, seahub.utils as u; '
+             'print u.EVENTS_ENABLED, u.FILE_AUDIT_ENABLED, '
+             'u.HAS_FILE_SEARCH, "seafevents" in sys.modules'],
+            SEAFILE_CENTRAL_CONF_DIR=self._events_conf_dir())
+
+        # features are read from the config, without importing seafevents
+        assert stdout.split() == ['True', 'True', 'False', 'False'], stdout
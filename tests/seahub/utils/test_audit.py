@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from django.core.cache import cache
+from django.test.client import RequestFactory
+from mock import patch, MagicMock
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.audit import queue_file_access_msg, save_file_access_events
+
+MSG_A = 'file-download-web\tfoo@foo.com\t127.0.0.1\tfirefox\trepo-id\t/a.md'
+MSG_B = 'file-download-web\tfoo@foo.com\t127.0.0.1\tfirefox\trepo-id\t/b.md'
+
+
+@patch('seahub.utils.audit.can_save_file_access_events', return_value=True)
+@patch('seahub.utils.audit.file_access_msg_writer')
+class QueueFileAccessMsgTest(BaseTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_msgs_are_queued_with_access_time(self, mock_writer, mock_can):
+        with patch('seahub.utils.audit.time.time', return_value=1000):
+            queue_file_access_msg(MSG_A)
+
+        assert mock_writer.put.call_args[0][0] == {
+            'msg': MSG_A, 'timestamp': 1000}
+
+    def test_identical_msgs_are_queued_once_per_window(self, mock_writer,
+                                                       mock_can):
+        queue_file_access_msg(MSG_A)
+        queue_file_access_msg(MSG_A)
+        queue_file_access_msg(MSG_B)
+        assert mock_writer.put.call_count == 2
+
+        cache.clear()
+        queue_file_access_msg(MSG_A)
+        assert mock_writer.put.call_count == 3
+
+    @patch('seahub.utils.audit.FILE_ACCESS_MSG_WINDOW', 0)
+    def test_identical_msgs_are_queued_once_per_request(self, mock_writer,
+                                                        mock_can):
+        request = RequestFactory().get('/')
+        queue_file_access_msg(MSG_A, request)
+        queue_file_access_msg(MSG_A, request)
+        queue_file_access_msg(MSG_B, request)
+        assert mock_writer.put.call_count == 2
+
+        queue_file_access_msg(MSG_A, RequestFactory().get('/'))
+        assert mock_writer.put.call_count == 3
+
+    @patch('seahub.utils.audit.seaserv.send_message')
+    def test_msgs_are_sent_at_once_without_events_db(self, mock_send,
+                                                     mock_writer, mock_can):
+        mock_can.return_value = False
+        queue_file_access_msg(MSG_A)
+
+        mock_send.assert_called_once_with('seahub.stats', MSG_A)
+        assert mock_writer.put.call_count == 0
+
+
+class SaveFileAccessEventsTest(BaseTestCase):
+    @patch('seahub.utils.audit.seafile_api.get_org_id_by_repo_id',
+           return_value=-1)
+    @patch('seahub.utils.SeafEventsSession', create=True)
+    def test_events_are_saved_with_access_time(self, mock_session_cls,
+                                               mock_get_org_id):
+        session = mock_session_cls.return_value
+        seafevents = MagicMock()
+        with patch.dict('sys.modules', {'seafevents': seafevents}):
+            save_file_access_events([
+                {'msg': MSG_A, 'timestamp': 0},
+                {'msg': MSG_B.decode('utf-8').replace(u'/b.md', u'/中.md'),
+                 'timestamp': 60},
+            ])
+
+        # one session for the batch
+        assert mock_session_cls.call_count == 1
+        assert session.close.called
+        calls = seafevents.save_file_audit_event.call_args_list
+        assert calls[0][0] == (
+            session, datetime.datetime(1970, 1, 1), 'file-download-web',
+            'foo@foo.com', '127.0.0.1', 'firefox', -1, 'repo-id', '/a.md')
+        assert calls[1][0][1] == datetime.datetime(1970, 1, 1, 0, 1)
+        assert calls[1][0][-1] == u'/中.md'.encode('utf-8')
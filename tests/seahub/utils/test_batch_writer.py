@@ -0,0 +1,142 @@
+import os
+import tempfile
+import time
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.batch_writer import BatchWriter
+from seahub.utils.spool import Spool
+
+
+class BatchWriterTest(BaseTestCase):
+    def test_coalesce_and_flush_by_batch_size(self):
+        written = []
+        writer = BatchWriter(written.append, batch_size=3, flush_interval=60)
+        writer.put('a1', key='a')
+        writer.put('a2', key='a')
+        writer.put('b', key='b')
+        assert written == []
+
+        writer.put('c')
+        assert written == [['a2', 'b', 'c']]
+        assert writer.pending_count() == 0
+
+    def test_requeue_on_failure(self):
+        written = []
+        def flush(items):
+            if not written:
+                written.append(None)
+                raise Exception('database is down')
+            written.append(items)
+
+        writer = BatchWriter(flush, batch_size=10, flush_interval=60)
+        writer.put('a')
+        writer.flush()
+        assert writer.pending_count() == 1
+
+        writer.put('b')
+        writer.flush()
+        assert written[1] == ['a', 'b']
+
+    def test_flush_in_background(self):
+        written = []
+        writer = BatchWriter(written.append, batch_size=2, flush_interval=60,
+                             background=True)
+        writer.put('a')
+        writer.put('b')
+
+        for _ in range(100):
+            if written:
+                break
+            time.sleep(0.01)
+        assert written == [['a', 'b']]
+
+    def test_spool_overflow_and_unwritten_items(self):
+        def flush(items):
+            raise Exception('database is down')
+
+        spool = Spool(tempfile.mkdtemp())
+        writer = BatchWriter(flush, batch_size=10, flush_interval=60,
+                             max_pending=2, spool=spool)
+        for i in range(3):
+            writer.put(i)
+        assert writer.pending_count() == 2
+        assert len(spool.pending_files()) == 1
+
+        writer.close()
+        assert writer.pending_count() == 0
+
+        # all items are kept in journal of this process, and drained once
+        # the process is gone, so the spooled one is written twice
+        written = []
+        writer.flush_func = written.extend
+        assert writer.drain_spool() == 1
+        self._kill_journals(spool)
+        assert writer.drain_spool() == 3
+        assert sorted(written) == [0, 0, 1, 2]
+        assert spool.pending_files() == []
+
+    def _kill_journals(self, spool):
+        suffix = '.%d' % os.getpid()
+        for name in os.listdir(spool.path):
+            if name.endswith(suffix):
+                # pid which is not in use
+                os.rename(os.path.join(spool.path, name),
+                          os.path.join(spool.path,
+                                       name[:-len(suffix)] + '.999999999'))
+
+    def test_journal_is_removed_after_flush(self):
+        spool = Spool(tempfile.mkdtemp())
+        written = []
+        writer = BatchWriter(written.extend, batch_size=10, flush_interval=60,
+                             spool=spool)
+        writer.put('a')
+        assert len(os.listdir(spool.path)) == 1
+
+        writer.flush()
+        assert written == ['a']
+        assert os.listdir(spool.path) == []
+
+    def test_items_of_killed_process_are_drained(self):
+        spool = Spool(tempfile.mkdtemp())
+        writer = BatchWriter(lambda items: None, batch_size=10,
+                             flush_interval=60, spool=spool)
+        writer.put('a')
+        writer.put('b')
+        # process is killed before flush
+        self._kill_journals(spool)
+
+        written = []
+        writer = BatchWriter(written.extend, spool=spool)
+        assert writer.drain_spool() == 2
+        assert written == ['a', 'b']
+
+    def test_background_thread_drains_spool_after_flush(self):
+        spool = Spool(tempfile.mkdtemp())
+        spool.write(['a', 'b'])
+
+        written = []
+        writer = BatchWriter(written.extend, batch_size=1, flush_interval=60,
+                             background=True, spool=spool)
+        writer.put('c')
+
+        for _ in range(100):
+            if len(written) == 3:
+                break
+            time.sleep(0.01)
+        assert written == ['c', 'a', 'b']
+        assert spool.pending_files() == []
+
+    def test_idle_background_thread_drains_spool(self):
+        spool = Spool(tempfile.mkdtemp())
+        written = []
+        writer = BatchWriter(written.extend, batch_size=1, flush_interval=0.05,
+                             background=True, spool=spool)
+        writer.put('a')
+
+        # spooled later, e.g. by a process which is gone
+        spool.write(['b'])
+        for _ in range(100):
+            if len(written) == 2:
+                break
+            time.sleep(0.01)
+        assert written == ['a', 'b']
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from mock import patch, MagicMock
+
+from seahub.utils.commit_diff import get_commit_diff, \
+    get_commit_diff_cache_stats, clear_local_commit_diff_cache, DiffEntry
+from seahub.test_utils import BaseTestCase
+
+
+class GetCommitDiffTest(BaseTestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_commit_diff_cache()
+
+    def _fake_diff(self):
+        d1 = MagicMock(status='add', name='a.md', new_name=None)
+        d1.name = 'a.md'
+        d2 = MagicMock(status='mov', new_name='c.md')
+        d2.name = 'b.md'
+        return [d1, d2]
+
+    @patch('seahub.utils.commit_diff.seafserv_threaded_rpc.get_diff')
+    def test_result_is_cached(self, mock_get_diff):
+        mock_get_diff.return_value = self._fake_diff()
+
+        for i in range(3):
+            ret = get_commit_diff(self.repo.id, '', 'commit-1')
+            assert ret == [DiffEntry('add', 'a.md', None),
+                           DiffEntry('mov', 'b.md', 'c.md')]
+
+        assert mock_get_diff.call_count == 1
+        stats = get_commit_diff_cache_stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+
+    @patch('seahub.utils.commit_diff.seafserv_threaded_rpc.get_diff')
+    def test_local_tier(self, mock_get_diff):
+        mock_get_diff.return_value = self._fake_diff()
+        get_commit_diff(self.repo.id, '', 'commit-1')
+
+        with patch('seahub.utils.commit_diff.caches') as mock_caches:
+            mock_caches.__getitem__.return_value.get.return_value = None
+            get_commit_diff(self.repo.id, '', 'commit-1')
+            assert mock_caches.__getitem__.return_value.get.call_count == 0
+
+        assert mock_get_diff.call_count == 1
+
+    @patch('seahub.utils.commit_diff.seafserv_threaded_rpc.get_diff')
+    def test_empty_diff(self, mock_get_diff):
+        mock_get_diff.return_value = []
+
+        assert get_commit_diff(self.repo.id, '', 'commit-1') == []
+        assert get_commit_diff(self.repo.id, '', 'commit-1') == []
+        assert mock_get_diff.call_count == 1
+
+    @patch('seahub.utils.commit_diff.seafserv_threaded_rpc.get_diff')
+    def test_failed_diff_is_not_cached(self, mock_get_diff):
+        mock_get_diff.return_value = None
+
+        assert get_commit_diff(self.repo.id, '', 'commit-1') == []
+        assert get_commit_diff(self.repo.id, '', 'commit-1') == []
+        assert mock_get_diff.call_count == 2
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.content_cache import LocalLRUCache, get_content, \
+    set_content, clear_local_content_cache
+
+
+class LocalLRUCacheTest(BaseTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUCache(10)
+        lru.set('a', 'aaaa', 4)
+        lru.set('b', 'bbbb', 4)
+        assert lru.get('a') == 'aaaa'
+
+        lru.set('c', 'cccc', 4)
+        assert lru.get('b') is None
+        assert lru.get('a') == 'aaaa'
+        assert lru.get('c') == 'cccc'
+        assert lru.size == 8
+
+    def test_value_larger_than_max_size_is_not_cached(self):
+        lru = LocalLRUCache(10)
+        lru.set('a', 'a' * 11, 11)
+        assert lru.get('a') is None
+        assert lru.size == 0
+
+
+class ContentCacheTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+
+    def tearDown(self):
+        self.clear_cache()
+
+    def test_get_from_shared_tier(self):
+        set_content('obj_1', u'content', 7, 60)
+        assert get_content('obj_1') == u'content'
+
+        # still served by the shared tier after the local one is cleared
+        clear_local_content_cache()
+        assert get_content('obj_1') == u'content'
+
+        # and by the local tier after the shared one is cleared
+        cache.clear()
+        assert get_content('obj_1') == u'content'
+
+        clear_local_content_cache()
+        assert get_content('obj_1') is None
@@ -0,0 +1,102 @@
+import datetime
+import pickle
+
+from mock import patch, MagicMock
+
+from seahub.utils import _enrich_repo_update_events, _events_dedup_key, \
+    _event_to_dict
+from seahub.test_utils import BaseTestCase
+
+
+class EnrichRepoUpdateEventsTest(BaseTestCase):
+    def _make_feed(self, n_events, n_repos, n_commits):
+        """A feed where few repos and commits are shared by many events,
+        which is the common case on an activity page.
+        """
+        events = []
+        for i in range(n_events):
+            e = MagicMock(spec=['etype', 'repo_id', 'commit_id', 'uuid'])
+            e.etype = 'repo-update'
+            e.repo_id = 'repo-%d' % (i % n_repos)
+            e.commit_id = 'commit-%d' % (i % n_commits)
+            events.append(e)
+        return events
+
+    def _fake_repo(self, repo_id):
+        if repo_id == 'repo-0':
+            return None     # deleted repo
+        repo = MagicMock()
+        repo.id = repo_id
+        repo.encrypted = False
+        return repo
+
+    @patch('seahub.utils.seaserv.get_commit')
+    @patch('seahub.utils.seafile_api.get_repo')
+    def test_rpc_count(self, mock_get_repo, mock_get_commit):
+        mock_get_repo.side_effect = self._fake_repo
+        mock_get_commit.side_effect = lambda r, v, c: MagicMock(id=c)
+
+        events = self._make_feed(60, 4, 20)
+        deleted = _enrich_repo_update_events(events, self.user.username, {}, {})
+
+        # one RPC per distinct repo/commit instead of one per event
+        assert mock_get_repo.call_count == 4
+        assert mock_get_commit.call_count == 15
+        assert len(deleted) == 15
+        for e in events:
+            if e not in deleted:
+                assert e.commit.id == e.commit_id
+
+    @patch('seahub.utils.seaserv.get_commit')
+    @patch('seahub.utils.seafile_api.get_repo')
+    def test_caches_are_shared_across_batches(self, mock_get_repo,
+                                              mock_get_commit):
+        mock_get_repo.side_effect = self._fake_repo
+        mock_get_commit.side_effect = lambda r, v, c: MagicMock(id=c)
+
+        repo_cache, commit_cache = {}, {}
+        _enrich_repo_update_events(self._make_feed(30, 4, 20),
+                                   self.user.username, repo_cache, commit_cache)
+        _enrich_repo_update_events(self._make_feed(30, 4, 20),
+                                   self.user.username, repo_cache, commit_cache)
+
+        assert mock_get_repo.call_count == 4
+        assert mock_get_commit.call_count == 15
+
+
+class EventsDedupKeyTest(BaseTestCase):
+    def test_dedup_key(self):
+        e1 = MagicMock(repo_id='r1')
+        e1.commit.desc = 'Added "a.md".'
+        e1.commit.creator_name = 'foo@foo.com'
+        e2 = MagicMock(repo_id='r1')
+        e2.commit.desc = 'Added "a.md".'
+        e2.commit.creator_name = 'foo@foo.com'
+        e3 = MagicMock(repo_id='r1', spec=['repo_id'])
+
+        assert _events_dedup_key(e1) == _events_dedup_key(e2)
+        assert _events_dedup_key(e3) is None
+
+
+class EventToDictTest(BaseTestCase):
+    @patch('seahub.utils.more_files_in_commit')
+    @patch('seahub.utils.convert_cmmt_desc_link')
+    def test_plain_fields(self, mock_convert, mock_more_files):
+        mock_convert.return_value = 'Added a.md'
+        mock_more_files.return_value = False
+
+        e = MagicMock(etype='repo-update', repo_id='r1',
+                      timestamp=datetime.datetime(2017, 1, 1),
+                      spec=['etype', 'repo_id', 'timestamp', 'repo',
+                            'commit'])
+        e.repo = MagicMock(id='r1', encrypted=False)
+        e.repo.name = 'lib'
+        e.commit = MagicMock(id='c1', creator_name='foo@foo.com', ctime=1,
+                             desc='Added "a.md".')
+
+        d = _event_to_dict(e)
+        assert d['repo'] == {'id': 'r1', 'name': 'lib', 'encrypted': False}
+        assert d['commit']['converted_cmmt_desc'] == 'Added a.md'
+        assert d['creator'] is None
+        # only plain values, no seaserv objects, are cached
+        assert pickle.loads(pickle.dumps(d)) == d
@@ -0,0 +1,85 @@
+import random
+
+from seahub.utils.htmldiff import HtmlDiff
+from seahub.utils.linediff import get_opcodes, mdiff
+from seahub.test_utils import BaseTestCase
+
+
+class GetOpcodesTest(BaseTestCase):
+    def _apply(self, a, b, opcodes):
+        ret = []
+        i = j = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            assert (i1, j1) == (i, j)
+            if tag == 'equal':
+                assert a[i1:i2] == b[j1:j2]
+            ret += b[j1:j2]
+            i, j = i2, j2
+        assert (i, j) == (len(a), len(b))
+        return ret
+
+    def test_random_edits(self):
+        rnd = random.Random(0)
+        for _ in range(500):
+            a = [rnd.choice('abcde') for _ in range(rnd.randint(0, 30))]
+            b = list(a)
+            for _ in range(rnd.randint(0, 10)):
+                i = rnd.randint(0, len(b))
+                if rnd.randint(0, 1) and i < len(b):
+                    del b[i]
+                else:
+                    b.insert(i, rnd.choice('xyz'))
+            assert self._apply(a, b, get_opcodes(a, b)) == b
+
+    def test_large_file(self):
+        a = ['line %d' % i for i in range(100000)]
+        b = list(a)
+        b[500] = 'changed'
+        del b[90000]
+
+        assert get_opcodes(a, b) == [
+            ('equal', 0, 500, 0, 500),
+            ('replace', 500, 501, 500, 501),
+            ('equal', 501, 90000, 501, 90000),
+            ('delete', 90000, 90001, 90000, 90000),
+            ('equal', 90001, 100000, 90000, 99999),
+        ]
+
+
+class MdiffTest(BaseTestCase):
+    def test_context(self):
+        a = ['line %d' % i for i in range(100)]
+        b = list(a)
+        b[50] = 'line 50 changed'
+
+        rows, truncated = mdiff(a, b, context=2)
+        assert truncated is False
+        assert [r[0][0] for r in rows] == [49, 50, 51, 52, 53]
+        assert rows[2][2] is True
+
+    def test_context_separator_between_hunks(self):
+        a = ['line %d' % i for i in range(100)]
+        b = list(a)
+        b[20] = 'line 20 changed'
+        b[80] = 'line 80 changed'
+
+        rows, truncated = mdiff(a, b, context=2)
+        assert rows.count((None, None, None)) == 1
+        assert rows[5] == (None, None, None)
+        assert [r[0][0] for r in rows[:5]] == [19, 20, 21, 22, 23]
+        assert [r[0][0] for r in rows[6:]] == [79, 80, 81, 82, 83]
+
+    def test_max_rows(self):
+        a = ['a%d' % i for i in range(100)]
+        b = ['b%d' % i for i in range(100)]
+
+        rows, truncated = mdiff(a, b, max_rows=10)
+        assert truncated is True
+        assert len(rows) == 10
+
+    def test_html_diff(self):
+        diff = HtmlDiff()
+        table = diff.make_table(['foo', 'foo bar'], ['foo', 'foo baz', 'qux'])
+        assert 'class=diff-chg' in table
+        assert 'class=diff-add>qux' in table
+        assert diff.truncated is False
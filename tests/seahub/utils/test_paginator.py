@@ -0,0 +1,21 @@
+import datetime
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.paginator import decode_keyset_cursor, encode_keyset_cursor
+
+
+class Obj(object):
+    def __init__(self, pk, value):
+        self.pk = pk
+        self.value = value
+
+
+class KeysetCursorTest(BaseTestCase):
+    def test_round_trip(self):
+        for value in (datetime.datetime(2017, 1, 2, 3, 4, 5, 6), 10, 0, None):
+            cursor = encode_keyset_cursor(Obj(3, value), 'value')
+            assert decode_keyset_cursor(cursor) == (value, 3)
+
+    def test_invalid(self):
+        for cursor in ('1', 'x_1', 'i1_x', 'n1_1', 't2017_1'):
+            assert decode_keyset_cursor(cursor) is None
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from mock import patch
+
+from seahub.utils.quota import get_quota_snapshot, get_quota_snapshots, \
+    clear_quota_snapshot, populate_users_quota_usage
+from seahub.test_utils import BaseTestCase
+
+
+class QuotaSnapshotTest(BaseTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_get(self):
+        snapshot = get_quota_snapshot(self.user.username)
+        assert snapshot['org'] is None
+        assert snapshot['space_usage'] >= 0
+        assert snapshot['timestamp'] > 0
+
+    @patch('seahub.utils.quota.seafile_api.get_user_self_usage')
+    def test_cached(self, mock_get_usage):
+        mock_get_usage.return_value = 100
+
+        assert get_quota_snapshot(self.user.username)['space_usage'] == 100
+        assert get_quota_snapshot(self.user.username)['space_usage'] == 100
+        assert mock_get_usage.call_count == 1
+
+        clear_quota_snapshot(self.user.username)
+        get_quota_snapshot(self.user.username)
+        assert mock_get_usage.call_count == 2
+
+    @patch('seahub.utils.quota.run_in_background')
+    @patch('seahub.utils.quota.time.time')
+    def test_stale_refreshed_in_background(self, mock_time,
+                                           mock_run_in_background):
+        mock_time.return_value = 1000
+        get_quota_snapshot(self.user.username)
+
+        mock_time.return_value = 2000
+        mock_run_in_background.return_value = True
+        assert get_quota_snapshot(self.user.username)['timestamp'] == 1000
+        # only one refresh queued for a user at a time
+        get_quota_snapshot(self.user.username)
+        assert mock_run_in_background.call_count == 1
+
+        mock_run_in_background.call_args[0][0]()
+        assert get_quota_snapshot(self.user.username)['timestamp'] == 2000
+
+    def test_bulk_get(self):
+        get_quota_snapshot(self.user.username)
+
+        snapshots = get_quota_snapshots([self.user.username,
+                                         self.admin.username])
+        assert len(snapshots) == 2
+        assert snapshots[self.admin.username]['space_usage'] >= 0
+
+    def test_populate_users_quota_usage(self):
+        users = [self.user, self.admin]
+        populate_users_quota_usage(users)
+        for u in users:
+            assert u.space_usage >= 0
+            assert u.quota_updated_at > 0
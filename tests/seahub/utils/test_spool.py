@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.spool import Spool
+
+
+class SpoolTest(BaseTestCase):
+    def setUp(self):
+        self.spool = Spool(os.path.join(tempfile.mkdtemp(), 'events'))
+
+    def test_write_and_drain_in_order(self):
+        self.spool.write([1, 2])
+        self.spool.write([{'a': 'b'}])
+        assert len(self.spool.pending_files()) == 2
+
+        delivered = []
+        assert self.spool.drain(delivered.append, batch_size=10) == 3
+        assert delivered == [[1, 2], [{'a': 'b'}]]
+        assert self.spool.pending_files() == []
+
+    def test_undelivered_items_are_kept(self):
+        self.spool.write(range(5))
+
+        delivered = []
+        def deliver(items):
+            if delivered:
+                raise Exception('database is down')
+            delivered.append(items)
+
+        assert self.spool.drain(deliver, batch_size=2) == 2
+        assert delivered == [[0, 1]]
+
+        delivered = []
+        assert self.spool.drain(delivered.extend) == 3
+        assert delivered == [2, 3, 4]
+
+    def test_take_over_file_of_dead_process(self):
+        self.spool.write([1])
+        name = self.spool.pending_files()[0]
+        # pid which is not in use
+        os.rename(os.path.join(self.spool.path, name),
+                  os.path.join(self.spool.path, name + '.999999999'))
+        assert self.spool.pending_files() == [name + '.999999999']
+
+        delivered = []
+        assert self.spool.drain(delivered.extend) == 1
+        assert delivered == [1]
+
+    def test_journal_is_drained_after_its_process_is_gone(self):
+        f, path = self.spool.open_journal()
+        self.spool.append(f, 1)
+        f.write('{"partial')
+        f.close()
+        assert self.spool.pending_files() == []
+
+        os.rename(path, path.rsplit('.', 1)[0] + '.999999999')
+        delivered = []
+        assert self.spool.drain(delivered.extend) == 1
+        assert delivered == [1]
@@ -0,0 +1,50 @@
+import threading
+
+from mock import patch
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.threadpool import run_concurrently, call_concurrently, \
+    run_in_background
+
+
+class RunConcurrentlyTest(BaseTestCase):
+    def test_results_in_order(self):
+        assert run_concurrently(lambda x: x * 2, range(10)) == \
+            [x * 2 for x in range(10)]
+
+    def test_nested_calls(self):
+        ret = run_concurrently(
+            lambda x: sum(run_concurrently(lambda y: x * y, range(3))),
+            range(10))
+        assert ret == [x * 3 for x in range(10)]
+
+    def test_call_concurrently(self):
+        assert call_concurrently(lambda: 1, lambda: 2) == [1, 2]
+
+
+class RunInBackgroundTest(BaseTestCase):
+    def test_run(self):
+        done = threading.Event()
+        assert run_in_background(done.set) is True
+        assert done.wait(5)
+
+    @patch('seahub.utils.threadpool.BACKGROUND_MAX_PENDING', 1)
+    def test_drop_when_too_many_pending(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        assert run_in_background(block) is True
+        started.wait(5)
+        assert run_in_background(lambda: None) is False
+
+        release.set()
+        done = threading.Event()
+        for _ in range(100):
+            if run_in_background(done.set):
+                break
+            release.wait(0.01)
+        assert done.wait(5)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.urlresolvers import RegexURLResolver, Resolver404
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils.url_dispatch import literal_prefix, PrefixTrieURLResolver, \
+    get_route_hits, clear_route_hits
+
+
+class LiteralPrefixTest(BaseTestCase):
+    def test_literal_prefix(self):
+        assert literal_prefix(r'^api2/') == ('api2/', True)
+        assert literal_prefix(r'^repos/$') == ('repos/', False)
+        assert literal_prefix(r'^repos/(?P<repo_id>[-0-9a-f]{36})/dir/$') == \
+            ('repos/', False)
+        assert literal_prefix(r'^api/v2.1/') == ('api/v2', False)
+        assert literal_prefix(r'^foo\.txt$') == ('foo.txt', False)
+        assert literal_prefix(r'^starredfiles?/') == ('starredfile', False)
+        assert literal_prefix(r'^a\d') == ('a', False)
+        assert literal_prefix(r'^(foo|bar)/') == ('', False)
+        assert literal_prefix(r'foo/') == ('', False)
+
+
+class PrefixTrieURLResolverTest(BaseTestCase):
+    def setUp(self):
+        site_root = r'^%s' % settings.SITE_ROOT[1:]
+        self.django_resolver = RegexURLResolver(r'^/', [
+            RegexURLResolver(site_root, settings.SITE_ROOT_URLCONF)])
+        self.trie_resolver = RegexURLResolver(r'^/', [
+            PrefixTrieURLResolver(site_root, settings.SITE_ROOT_URLCONF)])
+        clear_route_hits()
+
+    def _resolve(self, resolver, path):
+        try:
+            m = resolver.resolve(path)
+        except Resolver404:
+            return None
+        return (m.func, m.args, m.kwargs, m.url_name, m.namespaces)
+
+    def test_same_as_django_resolver(self):
+        repo_id = self.repo.id
+        paths = [
+            '/',
+            '/api2/repos/',
+            '/api2/repos/%s/' % repo_id,
+            '/api2/repos/%s/dir/' % repo_id,
+            '/api2/repos/%s/file/' % repo_id,
+            '/api2/unseen_messages/',
+            '/api/v2.1/repos/%s/dir/' % repo_id,
+            '/thumbnail/%s/48/foo/bar.jpg' % repo_id,
+            '/lib/%s/file/foo.md' % repo_id,
+            '/repo/history/%s/' % repo_id,
+            '/no/such/path/',
+        ]
+        for path in paths:
+            assert self._resolve(self.trie_resolver, path) == \
+                self._resolve(self.django_resolver, path), path
+
+    def test_route_hits(self):
+        self.trie_resolver.resolve('/api2/repos/')
+        self.trie_resolver.resolve('/api2/repos/')
+        assert get_route_hits(1) == [('api2-repos', 2)]
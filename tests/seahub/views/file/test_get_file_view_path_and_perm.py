@@ -1,3 +1,4 @@
+from mock import patch
 from django.test import RequestFactory
 
 from seaserv import seafile_api
@@ -24,3 +25,12 @@ class GetFileViewPathAndPermTest(BaseTestCase):
         assert '8082' in rst[0]
         assert '8082' in rst[1]
         assert rst[2] == 'rw'
+
+    @patch('seahub.views.file.check_folder_permission')
+    def test_known_perm_is_not_checked_again(self, mock_check):
+        obj_id = seafile_api.get_file_id_by_path(self.repo.id, self.file)
+
+        rst = get_file_view_path_and_perm(self.request, self.repo.id, obj_id,
+                                          self.file, user_perm='r')
+        assert rst[2] == 'r'
+        assert not mock_check.called
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import StringIO
+
+from mock import patch
+
+from seahub.test_utils import BaseTestCase
+from seahub.views.file import repo_file_get
+
+
+class RepoFileGetTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+
+    def tearDown(self):
+        self.clear_cache()
+
+    @patch('seahub.views.file.urllib2.urlopen')
+    def test_detect_encoding(self, mock_urlopen):
+        # neither utf-8 nor gbk
+        content = (u'Съешь же ещё этих мягких французских булок, да выпей чаю. ' * 50).encode('windows-1251')
+        mock_urlopen.return_value = StringIO.StringIO(content)
+
+        err, file_content, encoding = repo_file_get('http://raw', 'auto')
+        assert err == ''
+        assert encoding not in ('utf-8', 'gbk')
+        assert file_content == content.decode(encoding)
+
+    @patch('seahub.views.file.urllib2.urlopen')
+    def test_exceeds_max_size(self, mock_urlopen):
+        mock_urlopen.return_value = StringIO.StringIO('a' * 100)
+
+        err, file_content, encoding = repo_file_get('http://raw', 'auto',
+                                                    max_size=10)
+        assert err != ''
+        assert file_content == ''
+
+    @patch('seahub.views.file.urllib2.urlopen')
+    def test_decoded_content_is_cached(self, mock_urlopen):
+        mock_urlopen.return_value = StringIO.StringIO('abc')
+
+        ret = repo_file_get('http://raw', 'auto', cache_id='store_obj')
+        assert ret == ('', u'abc', 'utf-8')
+
+        assert repo_file_get('http://raw', 'auto', cache_id='store_obj') == ret
+        assert mock_urlopen.call_count == 1
@@ -5,6 +5,7 @@ from mock import patch
 from django.core.urlresolvers import reverse
 
 from seahub.test_utils import BaseTestCase
+from seahub.views.file import get_image_names_in_dir, get_img_prev_next
 
 class ViewLibFileTest(BaseTestCase):
     def setUp(self):
@@ -203,6 +204,21 @@ class ViewLibFileTest(BaseTestCase):
         r = requests.get(raw_path)
         self.assertEqual(400, r.status_code)
 
+    def test_image_names_are_cached(self):
+        self.create_file(repo_id=self.repo.id, parent_dir='/',
+                         filename="foo.jpg", username=self.user.email)
+        self.create_file(repo_id=self.repo.id, parent_dir='/',
+                         filename="Bar.png", username=self.user.email)
+
+        img_list = get_image_names_in_dir(self.repo.id, '/')
+        assert img_list == ['Bar.png', 'foo.jpg']
+
+        with patch('seahub.views.file.seafile_api.list_dir_by_dir_id') as mock_list:
+            assert get_image_names_in_dir(self.repo.id, '/') == img_list
+            assert mock_list.call_count == 0
+
+        assert get_img_prev_next(img_list, 'foo.jpg', '/') == ('/Bar.png', None)
+
     def test_video_file(self):
         self.login_as(self.user)
 
@@ -3,9 +3,10 @@ import os
 
 from django.core.urlresolvers import reverse
 from django.test import TestCase
+from mock import patch
 import requests
 
-from seahub.share.models import FileShare
+from seahub.share.models import FileShare, flush_share_link_view_cnt
 from seahub.test_utils import Fixtures
 
 
@@ -69,18 +70,36 @@ class ViewSharedFileTest(TestCase, Fixtures):
         """
         resp = self.client.get(reverse('view_shared_file', args=[self.fs.token]))
         self.assertEqual(200, resp.status_code)
+        flush_share_link_view_cnt(FileShare, [self.fs.token])
         self.assertEqual(1, FileShare.objects.get(token=self.fs.token).view_cnt)
 
         dl_url = reverse('view_shared_file', args=[self.fs.token]) + '?raw=1'
         resp = self.client.get(dl_url)
         self.assertEqual(302, resp.status_code)
+        flush_share_link_view_cnt(FileShare, [self.fs.token])
         self.assertEqual(2, FileShare.objects.get(token=self.fs.token).view_cnt)
 
         dl_url = reverse('view_shared_file', args=[self.fs.token]) + '?dl=1'
         resp = self.client.get(dl_url)
         self.assertEqual(302, resp.status_code)
+        flush_share_link_view_cnt(FileShare, [self.fs.token])
         self.assertEqual(3, FileShare.objects.get(token=self.fs.token).view_cnt)
 
+    def test_view_count_is_buffered(self):
+        url = reverse('view_shared_file', args=[self.fs.token])
+        with patch('seahub.share.models.SHARE_LINK_VIEW_CNT_FLUSH_THRESHOLD', 3):
+            for i in range(2):
+                self.client.get(url)
+            # no write before threshold
+            self.assertEqual(0, FileShare.objects.get(token=self.fs.token).view_cnt)
+
+            self.client.get(url)
+            self.assertEqual(3, FileShare.objects.get(token=self.fs.token).view_cnt)
+
+            self.client.get(url)
+            flush_share_link_view_cnt(FileShare, [self.fs.token])
+            self.assertEqual(4, FileShare.objects.get(token=self.fs.token).view_cnt)
+
     def test_can_render_when_remove_parent_dir(self):
         """Issue https://github.com/haiwen/seafile/issues/1283
         """
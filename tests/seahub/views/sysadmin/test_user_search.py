@@ -1,5 +1,7 @@
 from django.core.urlresolvers import reverse
+from mock import patch
 
+from seahub.base.accounts import User
 from seahub.profile.models import Profile
 from seahub.test_utils import BaseTestCase
 
@@ -50,3 +52,40 @@ class UserResetTest(BaseTestCase):
                 '?email=%s' % self.user_name)
 
         self.assertEqual(404, resp.status_code)
+
+    def test_search_result_is_paginated(self):
+        self.login_as(self.admin)
+
+        users = [self.create_user('paged%d@test.com' % i) for i in range(3)]
+        for u in users:
+            Profile.objects.add_or_update(u.username, nickname='paged-nickname')
+
+        with patch('seahub.views.sysadmin.User.objects.get',
+                   wraps=User.objects.get) as mock_get:
+            resp = self.client.get(reverse('user_search') +
+                                   '?email=paged-nickname&per_page=2')
+
+        self.assertEqual(200, resp.status_code)
+        assert len(resp.context['users']) == 2
+        assert resp.context['page_next'] is True
+        # only users on the page are looked up
+        looked_up = [c for c in mock_get.call_args_list
+                     if c[1].get('email', '').startswith('paged')]
+        assert len(looked_up) == 2
+
+        for u in users:
+            self.remove_user(u.username)
+
+    def test_page_and_per_page_are_clamped(self):
+        self.login_as(self.admin)
+
+        resp = self.client.get(reverse('user_search') +
+                               '?email=%s&page=-1&per_page=0' % self.user_name)
+        self.assertEqual(200, resp.status_code)
+        assert resp.context['current_page'] == 1
+        assert resp.context['per_page'] == 1
+        self.assertContains(resp, self.user_name)
+
+        resp = self.client.get(reverse('user_search') +
+                               '?email=%s&per_page=100000' % self.user_name)
+        assert resp.context['per_page'] == 100
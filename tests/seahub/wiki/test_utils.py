@@ -0,0 +1,54 @@
+import stat
+
+from mock import patch, MagicMock
+
+from seahub.test_utils import BaseTestCase
+from seahub.wiki.utils import get_wiki_page_index, convert_wiki_link, \
+    get_wiki_pages
+
+
+class WikiPageIndexTest(BaseTestCase):
+    def _fake_repo(self, head_cmmt_id):
+        repo = MagicMock()
+        repo.id = self.repo.id
+        repo.head_cmmt_id = head_cmmt_id
+        return repo
+
+    def _fake_dirents(self, *names):
+        dirents = []
+        for name in names:
+            d = MagicMock(obj_id='obj-' + name, mode=stat.S_IFREG)
+            d.obj_name = name
+            dirents.append(d)
+        return dirents
+
+    @patch('seahub.wiki.utils.seafile_api.list_dir_by_commit_and_path')
+    def test_index_is_cached_by_head_commit(self, mock_list_dir):
+        mock_list_dir.return_value = self._fake_dirents('Home.md', 'Foo Bar.md')
+
+        repo = self._fake_repo('commit-a')
+        index = get_wiki_page_index(repo)
+        assert index['foo-bar.md'].obj_name == 'Foo Bar.md'
+        get_wiki_page_index(repo)
+        assert mock_list_dir.call_count == 1
+
+        # new commit, index is rebuilt
+        get_wiki_page_index(self._fake_repo('commit-b'))
+        assert mock_list_dir.call_count == 2
+
+        assert get_wiki_pages(repo) == {'home': 'Home', 'foo-bar': 'Foo Bar'}
+
+    @patch('seahub.wiki.utils.seaserv.get_repo')
+    @patch('seahub.wiki.utils.seafile_api.list_dir_by_commit_and_path')
+    def test_convert_wiki_link(self, mock_list_dir, mock_get_repo):
+        mock_list_dir.return_value = self._fake_dirents('Home.md')
+        mock_get_repo.return_value = self._fake_repo('commit-c')
+
+        content = '[[Home]] [[Missing]] ' * 100
+        ret = convert_wiki_link(content, '/wiki/', self.repo.id,
+                                self.user.username)
+
+        assert ret.count('<a href="/wiki/home/">Home</a>') == 100
+        assert ret.count('class="wiki-page-missing"') == 100
+        assert mock_get_repo.call_count == 1
+        assert mock_list_dir.call_count == 1
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Benchmark of cache backends with the key mix of seahub.
+
+Runs nickname and avatar lookups, API throttling, login attempt counters and
+``image_view`` blobs against each of the given aliases of ``CACHES``:
+
+    DJANGO_SETTINGS_MODULE=seahub.settings \\
+        python tools/bench_cache.py default shared [--ops 100000] [--threads 8]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'seahub.settings')
+
+import django
+django.setup()
+from django.core.cache import caches
+
+N_USERS = 10000
+N_IMAGES = 500
+IMAGE_SIZE = 30 * 1024
+
+def pick(rnd, n):
+    # a few users and images are much more popular than the rest
+    return min(int(rnd.paretovariate(1.2)) - 1, n - 1)
+
+def op_nickname(cache, rnd):
+    key = 'NICKNAME_user%d%%40example.com' % pick(rnd, N_USERS)
+    if cache.get(key) is None:
+        cache.set(key, 'user', 14 * 24 * 60 * 60)
+
+def op_avatar(cache, rnd):
+    key = 'avatar_url_user%d%%40example.com_36' % pick(rnd, N_USERS)
+    if cache.get(key) is None:
+        cache.set(key, '/media/avatars/default.png', 60 * 60)
+
+def op_throttle(cache, rnd):
+    key = 'throttle_user_%d' % pick(rnd, N_USERS)
+    history = cache.get(key, [])
+    now = time.time()
+    history = [t for t in history if t > now - 60][:100]
+    history.insert(0, now)
+    cache.set(key, history, 60)
+
+def op_login_attempt(cache, rnd):
+    key = 'UserLoginAttempt_user%d@example.com' % rnd.randrange(N_USERS)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, 15 * 60)
+
+IMAGE = 'x' * IMAGE_SIZE
+def op_image_view(cache, rnd):
+    key = 'image_view__%032x' % pick(rnd, N_IMAGES)
+    if cache.get(key) is None:
+        cache.set(key, IMAGE, 365 * 24 * 60 * 60)
+
+# (operation, weight)
+KEY_MIX = [
+    (op_nickname, 45),
+    (op_avatar, 25),
+    (op_throttle, 15),
+    (op_login_attempt, 5),
+    (op_image_view, 10),
+]
+
+def run_worker(cache, n_ops, seed, latencies):
+    rnd = random.Random(seed)
+    ops = [op for op, weight in KEY_MIX for _ in range(weight)]
+    for _ in xrange(n_ops):
+        op = rnd.choice(ops)
+        start = time.time()
+        op(cache, rnd)
+        latencies.setdefault(op.__name__, []).append(time.time() - start)
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+def bench(alias, n_ops, n_threads):
+    cache = caches[alias]
+    cache.clear()
+    results = [{} for _ in range(n_threads)]
+    threads = [threading.Thread(target=run_worker,
+                                args=(cache, n_ops // n_threads, i, results[i]))
+               for i in range(n_threads)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    latencies = {}
+    for r in results:
+        for name, values in r.iteritems():
+            latencies.setdefault(name, []).extend(values)
+    return elapsed, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('aliases', nargs='+', help='aliases in CACHES')
+    parser.add_argument('--ops', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    fmt = '%-10s %-18s %10s %10s %10s'
+    print fmt % ('alias', 'op', 'count', 'p50(ms)', 'p99(ms)')
+    for alias in args.aliases:
+        elapsed, latencies = bench(alias, args.ops, args.threads)
+        for name, values in sorted(latencies.items()):
+            print fmt % (alias, name[3:], len(values),
+                         '%.3f' % (percentile(values, 0.5) * 1000),
+                         '%.3f' % (percentile(values, 0.99) * 1000))
+        print '%s: %d ops/s' % (alias, args.ops / elapsed)
+
+if __name__ == '__main__':
+    main()
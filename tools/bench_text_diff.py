@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Benchmark of diff engines used by file modification details page.
+
+Compare ``seahub.utils.linediff.mdiff`` with difflib's ``_mdiff`` (which the
+vendored ``seahub.utils.htmldiff`` is based on) on a corpus of large diffs
+built from files in this repository:
+
+    python tools/bench_text_diff.py [--ndiff-timeout 60] [--context 5]
+"""
+import argparse
+import difflib
+import os
+import random
+import signal
+import sys
+import time
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(TOPDIR, 'seahub', 'utils'))
+import linediff
+
+def read_lines(*path):
+    with open(os.path.join(TOPDIR, *path)) as f:
+        return f.read().splitlines()
+
+def scattered_edits(lines, n_edits, seed=0):
+    rnd = random.Random(seed)
+    lines = list(lines)
+    for _ in range(n_edits):
+        i = rnd.randrange(len(lines))
+        op = rnd.randint(0, 2)
+        if op == 0:
+            lines[i] = lines[i] + ' // edited'
+        elif op == 1:
+            lines.insert(i, 'inserted line %d' % i)
+        else:
+            del lines[i]
+    return lines
+
+def move_blocks(lines, n_blocks, seed=0):
+    rnd = random.Random(seed)
+    lines = list(lines)
+    for _ in range(n_blocks):
+        size = rnd.randint(10, 100)
+        i = rnd.randrange(len(lines) - size)
+        block = lines[i:i + size]
+        del lines[i:i + size]
+        j = rnd.randrange(len(lines))
+        lines[j:j] = block
+    return lines
+
+def log_lines(n, seed=0):
+    rnd = random.Random(seed)
+    levels = ['INFO', 'DEBUG', 'WARNING', 'ERROR']
+    return ['2016-10-%02d %02d:%02d:%02d [%s] request %d finished in %dms' % (
+        i % 28 + 1, i % 24, i % 60, rnd.randrange(60), rnd.choice(levels),
+        rnd.randrange(100000), rnd.randrange(1000)) for i in range(n)]
+
+def build_corpus():
+    api_views = read_lines('seahub', 'api2', 'views.py')
+    pdf_worker = read_lines('media', 'js', 'pdf.worker.js')
+    sysadmin = read_lines('seahub', 'views', 'sysadmin.py')
+    log = log_lines(50000)
+
+    return [
+        ('po translations (de -> fr)',
+         read_lines('locale', 'de', 'LC_MESSAGES', 'django.po'),
+         read_lines('locale', 'fr', 'LC_MESSAGES', 'django.po')),
+        ('pdf.worker.js, 500 scattered edits',
+         pdf_worker, scattered_edits(pdf_worker, 500)),
+        ('api2/views.py re-indented',
+         api_views, ['  ' + line for line in api_views]),
+        ('sysadmin.py, 20 moved blocks',
+         sysadmin, move_blocks(sysadmin, 20)),
+        ('log, 20% rotated', log, log[10000:] + log_lines(10000, seed=1)),
+    ]
+
+class Timeout(Exception):
+    pass
+
+def _alarm(signum, frame):
+    raise Timeout()
+
+def run_ndiff(a, b, context, timeout):
+    signal.signal(signal.SIGALRM, _alarm)
+    signal.alarm(timeout)
+    try:
+        start = time.time()
+        rows = list(difflib._mdiff(a, b, context))
+        return time.time() - start, len(rows)
+    except Timeout:
+        return None, None
+    finally:
+        signal.alarm(0)
+
+def run_linediff(a, b, context):
+    start = time.time()
+    rows, truncated = linediff.mdiff(a, b, context)
+    return time.time() - start, len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--context', type=int, default=5,
+                        help='number of context lines, as used by text_diff')
+    parser.add_argument('--ndiff-timeout', type=int, default=60,
+                        help='seconds to wait for difflib on each diff')
+    args = parser.parse_args()
+
+    fmt = '%-36s %8s %8s %12s %12s'
+    print fmt % ('diff', 'old', 'new', 'difflib(s)', 'linediff(s)')
+    for name, a, b in build_corpus():
+        new_time, _ = run_linediff(a, b, args.context)
+        old_time, _ = run_ndiff(a, b, args.context, args.ndiff_timeout)
+        old = '%.2f' % old_time if old_time is not None else \
+            '>%d' % args.ndiff_timeout
+        print fmt % (name, len(a), len(b), old, '%.2f' % new_time)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Benchmark of URL resolution of seahub's most requested paths.
+
+Compare Django's resolver with ``seahub.utils.url_dispatch``, and check that
+both resolve every path to the same view:
+
+    DJANGO_SETTINGS_MODULE=seahub.settings \\
+        python tools/bench_url_resolve.py [--rounds 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'seahub.settings')
+
+import django
+django.setup()
+from django.conf import settings
+from django.core.urlresolvers import RegexURLResolver, Resolver404
+
+from seahub.utils.url_dispatch import PrefixTrieURLResolver, get_route_hits
+
+REPO_ID = '9f3e5c2a-6a1b-4d0e-8c3f-1b2a3c4d5e6f'
+PATHS = [
+    '/api2/repos/',
+    '/api2/repos/%s/' % REPO_ID,
+    '/api2/repos/%s/dir/' % REPO_ID,
+    '/api2/repos/%s/file/' % REPO_ID,
+    '/api2/repos/%s/thumbnail/' % REPO_ID,
+    '/api2/unseen_messages/',
+    '/api2/events/',
+    '/api2/starredfiles/',
+    '/api/v2.1/repos/%s/dir/' % REPO_ID,
+    '/thumbnail/%s/48/foo/bar.jpg' % REPO_ID,
+    '/lib/%s/file/foo/bar.md' % REPO_ID,
+    '/repo/history/%s/' % REPO_ID,
+    '/ajax/repo/%s/dir/' % REPO_ID,
+    '/f/1234567890/',
+    '/',
+]
+
+def resolve(resolver, path):
+    try:
+        return resolver.resolve(path)
+    except Resolver404:
+        return None
+
+def bench(resolver, rounds):
+    start = time.time()
+    for _ in xrange(rounds):
+        for path in PATHS:
+            resolve(resolver, path)
+    return time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=10000)
+    args = parser.parse_args()
+
+    site_root = r'^%s' % settings.SITE_ROOT[1:]
+    django_resolver = RegexURLResolver(r'^/', [
+        RegexURLResolver(site_root, settings.SITE_ROOT_URLCONF)])
+    trie_resolver = RegexURLResolver(r'^/', [
+        PrefixTrieURLResolver(site_root, settings.SITE_ROOT_URLCONF)])
+
+    for path in PATHS:
+        a = resolve(django_resolver, path)
+        b = resolve(trie_resolver, path)
+        same = (a is None and b is None) or (a is not None and b is not None and
+            (a.func, a.args, a.kwargs, a.url_name) ==
+            (b.func, b.args, b.kwargs, b.url_name))
+        print '%-60s %s' % (path, 'ok' if same else 'MISMATCH')
+
+    n = args.rounds * len(PATHS)
+    for name, resolver in (('django', django_resolver),
+                           ('prefix trie', trie_resolver)):
+        elapsed = bench(resolver, args.rounds)
+        print '%-12s %8.1f us/resolve' % (name, elapsed / n * 1000000)
+
+    print
+    print 'Top routes:'
+    for name, hits in get_route_hits(10):
+        print '%10d  %s' % (hits, name)
+
+if __name__ == '__main__':
+    main()